@@ -6,6 +6,7 @@ from flask_limiter.util import get_remote_address
 from flask_migrate import Migrate
 from flask_mail import Mail
 from config import config
+from app.json_provider import AppJSONProvider
 
 db = SQLAlchemy()
 jwt = JWTManager()
@@ -17,6 +18,7 @@ mail = Mail()
 def create_app(config_name="default"):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
+    app.json = AppJSONProvider(app)
 
     # Initialize extensions
     db.init_app(app)
@@ -47,6 +49,7 @@ def create_app(config_name="default"):
     from app.routes.shipping import shipping_bp
     from app.routes.cart import cart_bp
     from app.routes.reviews import reviews_bp
+    from app.routes.reports import reports_bp
     from app.admin.routes import admin_bp as admin_dashboard_bp
 
     app.register_blueprint(auth_bp)
@@ -57,8 +60,17 @@ def create_app(config_name="default"):
     app.register_blueprint(shipping_bp)
     app.register_blueprint(cart_bp)
     app.register_blueprint(reviews_bp)
+    app.register_blueprint(reports_bp)
     app.register_blueprint(admin_dashboard_bp, name="admin_dashboard")
 
+    from app.commands import register_commands
+
+    register_commands(app)
+
+    from app.utils.compression import compress_response
+
+    app.after_request(compress_response)
+
     # Error handlers
     @app.errorhandler(400)
     def bad_request(e):
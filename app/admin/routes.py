@@ -5,6 +5,7 @@ from functools import wraps
 from app.models import User, Order, Product
 from app import db
 from sqlalchemy import func
+from sqlalchemy.orm import joinedload
 from datetime import datetime, timedelta
 
 import os
@@ -129,7 +130,9 @@ def orders_chart_data():
 @admin_required
 def recent_orders():
     """Get recent orders for dashboard."""
-    orders = Order.query.order_by(Order.created_at.desc()).limit(10).all()
+    orders = Order.query.options(
+        joinedload(Order.user).load_only(User.email)
+    ).order_by(Order.created_at.desc()).limit(10).all()
     return jsonify({
         "orders": [{
             "id": o.id,
@@ -0,0 +1,141 @@
+"""Flask CLI commands for scheduled maintenance jobs."""
+import time
+import click
+
+
+def register_commands(app):
+    @app.cli.command('expire-reservations')
+    @click.option('--hold-minutes', type=int, help='Override RESERVATION_HOLD_MINUTES.')
+    @click.option('--batch-size', type=int, help='Override RESERVATION_SWEEP_BATCH_SIZE.')
+    @click.option('--loop', is_flag=True,
+                  help='Keep sweeping every RESERVATION_SWEEP_INTERVAL seconds.')
+    def expire_reservations(hold_minutes, batch_size, loop):
+        """Cancel stale pending orders and release their reserved stock.
+        
+        Also deletes expired Idempotency-Key records.
+        """
+        from app.services.reservation_sweeper import reservation_sweeper
+        from app.utils.idempotency import purge_expired
+        
+        while True:
+            freed = reservation_sweeper.sweep(hold_minutes, batch_size)
+            click.echo(f"Expired {freed['orders']} orders, released {freed['units']} units")
+            click.echo(f"Purged {purge_expired()} expired idempotency keys")
+            if not loop:
+                break
+            time.sleep(app.config['RESERVATION_SWEEP_INTERVAL'])
+    
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index():
+        """Create the product full-text index if missing and re-index all products."""
+        from app.services.search import product_search
+        
+        product_search.rebuild()
+        click.echo('Product search index rebuilt')
+    
+    @app.cli.command('rebuild-facets')
+    def rebuild_facets():
+        """Install the facet triggers if missing and recount product_facets."""
+        from app import db
+        from app.models import ProductFacet
+        
+        with db.engine.begin() as connection:
+            ProductFacet.create_triggers(connection)
+            ProductFacet.rebuild(connection)
+        click.echo('Product facets rebuilt')
+    
+    @app.cli.command('import-products')
+    @click.argument('csv_file', type=click.File('r', encoding='utf-8-sig'))
+    @click.option('--batch-size', type=int, help='Override PRODUCT_IMPORT_BATCH_SIZE.')
+    def import_products(csv_file, batch_size):
+        """Upsert products by SKU from a CSV in the inventory export format."""
+        from app.services.product_import import product_importer
+        
+        try:
+            result = product_importer.import_csv(
+                csv_file, batch_size or app.config['PRODUCT_IMPORT_BATCH_SIZE']
+            )
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        click.echo(f"Inserted {result['inserted']}, updated {result['updated']}, "
+                   f"rejected {result['rejected']}")
+        for error in result['errors']:
+            click.echo(f"  line {error['line']} ({error['sku']}): {error['error']}")
+        if 'stopped' in result:
+            stopped = result['stopped']
+            raise click.ClickException(
+                f"{stopped['error']}; stopped at line {stopped['line']}, earlier rows were imported"
+            )
+    
+    @app.cli.command('fold-stock-shards')
+    @click.option('--loop', is_flag=True,
+                  help='Keep folding every STOCK_SHARD_FOLD_INTERVAL seconds.')
+    def fold_stock_shards(loop):
+        """Fold sharded reservation counters back into products.reserved_stock."""
+        from app.services.stock_service import stock_service
+        
+        while True:
+            folded = stock_service.fold_shards()
+            click.echo(f"Folded {folded['products']} products, returned {folded['units']} units")
+            if not loop:
+                break
+            time.sleep(app.config['STOCK_SHARD_FOLD_INTERVAL'])
+    
+    @app.cli.command('run-report-jobs')
+    @click.option('--loop', is_flag=True,
+                  help='Keep polling every REPORT_JOB_POLL_INTERVAL seconds.')
+    def run_report_jobs(loop):
+        """Build queued report jobs into REPORT_STORAGE_DIR."""
+        from app.services.report_jobs import report_jobs
+        
+        while True:
+            ran = report_jobs.run_pending()
+            click.echo(f'Ran {ran} report jobs')
+            if not loop:
+                break
+            time.sleep(app.config['REPORT_JOB_POLL_INTERVAL'])
+    
+    @app.cli.command('create-indexes')
+    def create_indexes():
+        """Add columns and create indexes declared on the models that the database lacks.
+        
+        ``db.create_all()`` only creates missing tables, so this is the
+        upgrade step for tables created by an older release.
+        """
+        from sqlalchemy import inspect, text
+        from sqlalchemy.schema import CreateColumn
+        from app import db
+        
+        added = created = 0
+        with db.engine.begin() as connection:
+            inspector = inspect(connection)
+            for table in db.metadata.sorted_tables:
+                if not inspector.has_table(table.name):
+                    continue
+                columns = {c['name'] for c in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if column.name in columns:
+                        continue
+                    if not column.nullable and column.server_default is None:
+                        raise click.ClickException(
+                            f'{table.name}.{column.name} is NOT NULL without a server default'
+                        )
+                    spec = CreateColumn(column).compile(dialect=connection.dialect)
+                    connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {spec}'))
+                    click.echo(f'Added {table.name}.{column.name}')
+                    added += 1
+                
+                if connection.dialect.name == 'sqlite':
+                    # Reflection skips expression indexes here; read the catalog
+                    existing = set(connection.execute(text(
+                        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :t"
+                    ), {'t': table.name}).scalars())
+                else:
+                    existing = {ix['name'] for ix in inspector.get_indexes(table.name)}
+                for index in sorted(table.indexes, key=lambda ix: ix.name):
+                    if index.name not in existing:
+                        index.create(connection)
+                        click.echo(f'Created {index.name}')
+                        created += 1
+        click.echo(f'{added} columns added')
+        click.echo(f'{created} indexes created')
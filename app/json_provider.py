@@ -0,0 +1,79 @@
+"""Flask JSON provider: orjson when it is installed, the stdlib otherwise.
+
+Models hand raw Decimal and datetime values to the encoder. Both
+providers write Decimals as JSON numbers and datetimes as ISO 8601, which
+is what the API returned when to_dict converted them itself.
+"""
+import dataclasses
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from uuid import UUID
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional speedup, see requirements.txt
+    orjson = None
+
+
+def _default(o):
+    """Encode the types the encoders leave to us."""
+    if isinstance(o, Decimal):
+        return float(o)
+    if isinstance(o, (datetime, date, time)):
+        return o.isoformat()
+    if isinstance(o, UUID):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+
+class StdlibJSONProvider(JSONProvider):
+    """The json module with the API's Decimal and datetime encoding."""
+    
+    sort_keys = True
+    mimetype = 'application/json'
+    
+    def dumps(self, obj, **kwargs):
+        kwargs.setdefault('default', _default)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        return json.dumps(obj, **kwargs)
+    
+    def loads(self, s, **kwargs):
+        return json.loads(s, **kwargs)
+
+
+class OrjsonProvider(StdlibJSONProvider):
+    """orjson-backed provider; encodes datetimes and dataclasses natively.
+    
+    Calls with json-module keyword arguments (indent, separators, ...)
+    fall back to the stdlib encoder.
+    """
+    
+    def _encode(self, obj):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=_default, option=option)
+    
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._encode(obj).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        # Skip the bytes -> str -> bytes round trip of the base class
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._encode(obj) + b'\n', mimetype=self.mimetype)
+
+
+AppJSONProvider = OrjsonProvider if orjson is not None else StdlibJSONProvider
@@ -0,0 +1,25 @@
+from datetime import datetime
+from app import db
+
+class IdempotencyKey(db.Model):
+    """First response to a mutation, replayed for retries with the same key."""
+    __tablename__ = 'idempotency_keys'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'key', name='uq_idempotency_keys_user_key'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    key = db.Column(db.String(255), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)
+    
+    # NULL until the first request finishes
+    status_code = db.Column(db.Integer)
+    response_body = db.Column(db.Text)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    
+    @property
+    def in_flight(self):
+        return self.status_code is None
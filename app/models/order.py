@@ -1,12 +1,19 @@
-import random
-import string
 from datetime import datetime
-from decimal import Decimal
-from sqlalchemy import Numeric
+from sqlalchemy import Numeric, func
 from app import db
+from app.models.product import Product
+from app.services.pricing import from_cents, line_cents, price_order
+from app.utils.fields import FieldSet
 
 class Order(db.Model):
     __tablename__ = 'orders'
+    __table_args__ = (
+        # Keyset pagination over all orders and over one customer's orders
+        db.Index('ix_orders_created_at_id', 'created_at', 'id'),
+        db.Index('ix_orders_user_created_at_id', 'user_id', 'created_at', 'id'),
+        # Status scans (reservation sweeper, bulk transitions) walk ids in order
+        db.Index('ix_orders_status_id', 'status', 'id'),
+    )
     
     STATUS_PENDING = 'pending'
     STATUS_CONFIRMED = 'confirmed'
@@ -14,6 +21,14 @@ class Order(db.Model):
     STATUS_DELIVERED = 'delivered'
     STATUS_CANCELLED = 'cancelled'
     
+    # Cancelling returns a pending order's reservation; confirmed and
+    # shipped orders already took their units out of stock
+    CANCEL_STOCK_UPDATES = {
+        STATUS_PENDING: Product.release_many,
+        STATUS_CONFIRMED: Product.restock_many,
+        STATUS_SHIPPED: Product.restock_many,
+    }
+    
     id = db.Column(db.Integer, primary_key=True)
     order_number = db.Column(db.String(20), unique=True, nullable=False, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -40,86 +55,99 @@ class Order(db.Model):
     
     @staticmethod
     def generate_order_number():
-        """Generate unique order number: ORD-XXXXXX"""
-        prefix = 'ORD'
-        suffix = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-        return f"{prefix}-{suffix}"
-    
-    def calculate_totals(self):
-        """Recalculate all totals from items."""
-        subtotal = sum(item.subtotal for item in self.items)
-        self.subtotal = Decimal(str(subtotal))
-        
-        # Calculate tax (e.g., 19%)
-        tax_rate = Decimal('0.19')
-        self.tax_amount = self.subtotal * tax_rate
-        
-        # Calculate total
-        self.total_amount = (
-            self.subtotal + 
-            self.tax_amount + 
-            self.shipping_cost - 
-            self.discount_amount
-        )
-        db.session.commit()
+        """Allocate a unique order number: ORD-XXXXXXX"""
+        from app.services.order_numbers import order_numbers
+        return order_numbers.next()
+    
+    def calculate_totals(self, items=None, commit=True):
+        """Recalculate all totals from items.
+
+        Pass ``items`` to price lines that are already staged in memory
+        instead of re-querying the relationship.
+        """
+        if items is None:
+            items = self.items
+        totals = price_order(items, self.shipping_cost, self.discount_amount)
+        self.subtotal = totals.subtotal
+        self.tax_amount = totals.tax_amount
+        self.total_amount = totals.total_amount
+        if commit:
+            db.session.commit()
     
     def confirm(self):
         """Confirm order and finalize stock."""
         if self.status != self.STATUS_PENDING:
             raise ValueError(f"Cannot confirm order with status: {self.status}")
         
-        for item in self.items:
-            item.product.confirm_stock_removal(item.quantity)
+        Product.confirm_many(OrderItem.quantities_by_product([self.id]))
         
         self.status = self.STATUS_CONFIRMED
         self.confirmed_at = datetime.utcnow()
         db.session.commit()
     
     def cancel(self):
-        """Cancel order and release reserved stock."""
-        if self.status in [self.STATUS_DELIVERED, self.STATUS_CANCELLED]:
+        """Cancel order and give its stock back."""
+        if self.status not in self.CANCEL_STOCK_UPDATES:
             raise ValueError(f"Cannot cancel order with status: {self.status}")
         
-        # Release reserved stock
-        for item in self.items:
-            item.product.release_stock(item.quantity)
+        self.CANCEL_STOCK_UPDATES[self.status](OrderItem.quantities_by_product([self.id]))
         
         self.status = self.STATUS_CANCELLED
         self.cancelled_at = datetime.utcnow()
         db.session.commit()
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'order_number': self.order_number,
-            'user_id': self.user_id,
-            'status': self.status,
-            'items': [item.to_dict() for item in self.items],
-            'subtotal': float(self.subtotal),
-            'tax_amount': float(self.tax_amount),
-            'shipping_cost': float(self.shipping_cost),
-            'discount_amount': float(self.discount_amount),
-            'total_amount': float(self.total_amount),
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+    def to_dict(self, items=None, fields=None):
+        """Serialize the order; ``items`` takes pre-loaded OrderItems.
+        
+        ``fields`` limits the keys (see FIELDS).
+        """
+        data = self.FIELDS.dump(self, fields)
+        if fields is None or 'items' in fields:
+            if items is None:
+                items = self.items
+            data['items'] = [item.to_dict() for item in items]
+        return data
+    
+    FIELDS = FieldSet({
+        'id': (('id',), lambda o: o.id),
+        'order_number': (('order_number',), lambda o: o.order_number),
+        'user_id': (('user_id',), lambda o: o.user_id),
+        'status': (('status',), lambda o: o.status),
+        'items': ((), None),
+        'subtotal': (('subtotal',), lambda o: o.subtotal),
+        'tax_amount': (('tax_amount',), lambda o: o.tax_amount),
+        'shipping_cost': (('shipping_cost',), lambda o: o.shipping_cost),
+        'discount_amount': (('discount_amount',), lambda o: o.discount_amount),
+        'total_amount': (('total_amount',), lambda o: o.total_amount),
+        'created_at': (('created_at',), lambda o: o.created_at),
+    })
 
 class OrderItem(db.Model):
     __tablename__ = 'order_items'
     
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False, index=True)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
     unit_price = db.Column(Numeric(10, 2), nullable=False)
     discount = db.Column(Numeric(10, 2), default=0)
     
+    @classmethod
+    def quantities_by_product(cls, order_ids):
+        """Total ordered quantity per product across ``order_ids``."""
+        if not order_ids:
+            return {}
+        rows = db.session.query(
+            cls.product_id, func.sum(cls.quantity)
+        ).filter(
+            cls.order_id.in_(order_ids)
+        ).group_by(cls.product_id)
+        return {product_id: int(quantity) for product_id, quantity in rows}
+    
     @property
     def subtotal(self):
-        """Calculate item subtotal."""
-        unit_price = float(self.unit_price)
-        quantity = self.quantity
-        discount = float(self.discount) if self.discount else 0
-        return (unit_price * quantity) - discount
+        """Calculate item subtotal as an exact Decimal."""
+        return from_cents(line_cents(self.unit_price, self.quantity, self.discount))
     
     def to_dict(self):
         return {
@@ -127,7 +155,18 @@ class OrderItem(db.Model):
             'product_id': self.product_id,
             'product_name': self.product.name if self.product else None,
             'quantity': self.quantity,
-            'unit_price': float(self.unit_price),
-            'discount': float(self.discount) if self.discount else 0,
+            'unit_price': self.unit_price,
+            'discount': self.discount or 0,
             'subtotal': self.subtotal
         }
+
+
+class OrderNumberSequence(db.Model):
+    """Single-row counter that order numbers are allocated from in blocks."""
+    __tablename__ = 'order_number_sequence'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    next_value = db.Column(db.BigInteger, nullable=False, default=0)
+    # Permutation key; stored with the counter so numbers stay unique
+    # even if application secrets are rotated.
+    key = db.Column(db.String(64), nullable=False)
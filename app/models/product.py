@@ -1,10 +1,18 @@
+import random
 from datetime import datetime
 from decimal import Decimal
-from sqlalchemy import Numeric
+from flask import current_app
+from sqlalchemy import Numeric, and_, case, delete, func, or_, update
 from app import db
+from app.utils.fields import FieldSet
+from app.models.stock_shard import StockShard
 
 class Product(db.Model):
     __tablename__ = 'products'
+    __table_args__ = (
+        # Active catalog, by category, in name order
+        db.Index('ix_products_active_category_name', 'is_active', 'category', 'name'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     sku = db.Column(db.String(50), unique=True, nullable=False, index=True)
@@ -17,32 +25,260 @@ class Product(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     low_stock_threshold = db.Column(db.Integer, default=10)
     weight_kg = db.Column(Numeric(8, 3), default=0)  # Weight in kilograms
+    # > 0 spreads reservations over this many stock_shards rows (hot SKUs)
+    reservation_shards = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, onupdate=datetime.utcnow)
+    # Also bumped by the set-based stock UPDATEs; the catalog polls it
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     order_items = db.relationship('OrderItem', backref='product', lazy='dynamic')
     
     @property
     def available_stock(self):
-        """Calculate available stock (total - reserved)."""
-        return self.stock - self.reserved_stock
+        """Calculate available stock (total - reserved).
+        
+        For sharded products, stock moved into shards but not yet taken by
+        an order is added back.
+        """
+        available = self.stock - self.reserved_stock
+        if self.reservation_shards:
+            available += StockShard.unused(self.id)
+        return available
+    
+    @property
+    def version(self):
+        """Changes whenever the serialized product can; used for ETags.
+        
+        Sharded reservations only write shard rows, so their newest change
+        counts as well.
+        """
+        if self.reservation_shards:
+            stamps = [self.updated_at, StockShard.last_change(self.id)]
+            return max((s for s in stamps if s), default=None)
+        return self.updated_at
     
     @property
     def is_low_stock(self):
         """Check if stock is below threshold."""
         return self.available_stock <= self.low_stock_threshold
     
+    @classmethod
+    def unused_shard_stock(cls):
+        """Correlated subquery: allotted but unreserved units in the product's shards."""
+        return db.select(
+            func.coalesce(func.sum(StockShard.allotment - StockShard.reserved), 0)
+        ).where(StockShard.product_id == cls.id).scalar_subquery()
+    
+    @classmethod
+    def available_stock_expr(cls):
+        """SQL counterpart of ``available_stock``; only sharded rows hit the subquery."""
+        return cls.stock - cls.reserved_stock + case(
+            (cls.reservation_shards > 0, cls.unused_shard_stock()), else_=0
+        )
+    
+    @classmethod
+    def low_stock_condition(cls):
+        """SQL counterpart of ``is_low_stock``.
+        
+        The headroom test can use ix_products_stock_headroom; sharded
+        products, whose unused shard stock is not on the product row, are
+        checked against their shards as well.
+        """
+        unused = cls.unused_shard_stock()
+        return and_(
+            STOCK_HEADROOM <= 0,
+            or_(cls.reservation_shards == 0, STOCK_HEADROOM + unused <= 0)
+        )
+    
     def reserve_stock(self, quantity):
         """Atomically reserve stock for an order."""
-        if quantity > self.available_stock:
+        shards = {self.id: self.reservation_shards} if self.reservation_shards else None
+        if Product.reserve_many({self.id: quantity}, shards):
             raise ValueError(f"Insufficient stock. Available: {self.available_stock}")
-        
-        # Use with_for_update() for race condition protection
-        product = Product.query.with_for_update().get(self.id)
-        product.reserved_stock += quantity
         db.session.commit()
         return True
     
+    @classmethod
+    def reserve_many(cls, quantities, shards=None):
+        """Reserve {product_id: quantity} with one guarded UPDATE.
+        
+        The stock check runs inside the UPDATE (reserved + q <= stock), so
+        concurrent reservations can neither oversell nor need a row lock
+        held across a read. Products listed in ``shards`` ({product_id:
+        reservation_shards}) reserve from their shard rows instead.
+        Returns the ids that could not be reserved; those rows are left
+        untouched. Does not commit.
+        """
+        if not quantities:
+            return []
+        
+        shards = shards or {}
+        failed = [
+            pid for pid in sorted(quantities)
+            if shards.get(pid) and not cls._reserve_sharded(pid, shards[pid], quantities[pid])
+        ]
+        central = {pid: q for pid, q in quantities.items() if not shards.get(pid)}
+        if not central:
+            return failed
+        
+        requested = case(central, value=cls.id)
+        stmt = update(cls).where(
+            cls.id.in_(central),
+            cls.reserved_stock + requested <= cls.stock
+        ).values(
+            reserved_stock=cls.reserved_stock + requested
+        ).returning(cls.id).execution_options(synchronize_session='fetch')
+        
+        reserved = set(db.session.execute(stmt).scalars())
+        return sorted(failed + [pid for pid in central if pid not in reserved])
+    
+    @classmethod
+    def _reserve_sharded(cls, product_id, shards, quantity):
+        """Reserve from a random shard, refilling it from the product row.
+        
+        The product row is only written when a shard runs dry, once per
+        STOCK_SHARD_REFILL units instead of once per order.
+        """
+        shard = random.randrange(shards)
+        if StockShard.take(product_id, shard, quantity):
+            return True
+        
+        refill = max(quantity, current_app.config['STOCK_SHARD_REFILL'])
+        for amount in dict.fromkeys((refill, quantity)):
+            if cls.reserve_many({product_id: amount}):
+                continue
+            if not StockShard.refill(product_id, shard, amount, quantity):
+                # Sharding was just switched off: keep a plain reservation
+                cls.release_many({product_id: amount - quantity})
+            return True
+        
+        # Sold out centrally; use what is left in the other shards
+        if any(StockShard.take(product_id, other, quantity)
+               for other in range(shards) if other != shard):
+            return True
+        
+        # The rest is split across shards: pull it back and try once more
+        if not cls.fold_shards(product_id):
+            return False
+        return not cls.reserve_many({product_id: quantity})
+    
+    def set_reservation_shards(self, shards):
+        """Switch sharded reservations on (shards > 0) or off (0).
+        
+        Unused allotments are returned to the product first. Does not commit.
+        """
+        self.fold_shards(self.id)
+        db.session.execute(delete(StockShard).where(
+            StockShard.product_id == self.id,
+            StockShard.shard >= shards,
+            StockShard.allotment == 0
+        ))
+        existing = set(db.session.execute(
+            db.select(StockShard.shard).where(StockShard.product_id == self.id)
+        ).scalars())
+        db.session.add_all(
+            StockShard(product_id=self.id, shard=i, allotment=0, reserved=0)
+            for i in range(shards) if i not in existing
+        )
+        self.reservation_shards = shards
+    
+    @classmethod
+    def fold_shards(cls, product_id):
+        """Fold a product's shards back into reserved_stock.
+        
+        Returns the unused units given back. Does not commit.
+        """
+        unused = StockShard.drain(product_id)
+        if unused:
+            cls.release_many({product_id: unused})
+        return unused
+    
+    @classmethod
+    def release_many(cls, quantities):
+        """Release {product_id: quantity} reservations with one UPDATE.
+        
+        Never drops reserved_stock below zero. Does not commit.
+        """
+        if not quantities:
+            return
+        
+        released = case(quantities, value=cls.id)
+        db.session.execute(update(cls).where(
+            cls.id.in_(quantities)
+        ).values(
+            reserved_stock=case(
+                (cls.reserved_stock > released, cls.reserved_stock - released),
+                else_=0
+            )
+        ).execution_options(synchronize_session='fetch'))
+    
+    @classmethod
+    def confirm_many(cls, quantities):
+        """Turn {product_id: quantity} reservations into removals, one UPDATE.
+        
+        Does not commit.
+        """
+        if not quantities:
+            return
+        
+        removed = case(quantities, value=cls.id)
+        db.session.execute(update(cls).where(
+            cls.id.in_(quantities)
+        ).values(
+            stock=cls.stock - removed,
+            reserved_stock=cls.reserved_stock - removed
+        ).execution_options(synchronize_session='fetch'))
+    
+    @classmethod
+    def restock_many(cls, quantities):
+        """Put {product_id: quantity} units back into stock, one UPDATE.
+        
+        For lines of confirmed orders, whose units already left stock.
+        Does not commit.
+        """
+        if not quantities:
+            return
+        
+        db.session.execute(update(cls).where(
+            cls.id.in_(quantities)
+        ).values(
+            stock=cls.stock + case(quantities, value=cls.id)
+        ).execution_options(synchronize_session='fetch'))
+    
+    @classmethod
+    def adjust_many(cls, adjustments):
+        """Apply {product_id: delta} stock changes with one guarded UPDATE.
+        
+        A row is only changed if its new stock still covers the units held
+        by orders, so available stock never goes negative. Sharded products
+        being decremented have their unused allotments folded back first;
+        those units count as reserved_stock until then but are free.
+        Returns the ids that were left untouched. Does not commit.
+        """
+        if not adjustments:
+            return []
+        
+        decremented = [pid for pid, delta in adjustments.items() if delta < 0]
+        if decremented:
+            sharded = db.session.execute(
+                db.select(StockShard.product_id)
+                .where(StockShard.product_id.in_(decremented), StockShard.allotment > 0)
+                .distinct()
+            ).scalars().all()
+            for product_id in sharded:
+                cls.fold_shards(product_id)
+        
+        delta = case(adjustments, value=cls.id)
+        stmt = update(cls).where(
+            cls.id.in_(adjustments),
+            cls.stock + delta >= cls.reserved_stock
+        ).values(
+            stock=cls.stock + delta
+        ).returning(cls.id).execution_options(synchronize_session='fetch')
+        
+        adjusted = set(db.session.execute(stmt).scalars())
+        return sorted(pid for pid in adjustments if pid not in adjusted)
+    
     def release_stock(self, quantity):
         """Release reserved stock (e.g., on cancel)."""
         self.reserved_stock = max(0, self.reserved_stock - quantity)
@@ -54,18 +290,32 @@ class Product(db.Model):
         self.reserved_stock -= quantity
         db.session.commit()
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'sku': self.sku,
-            'name': self.name,
-            'description': self.description,
-            'price': float(self.price),
-            'stock': self.stock,
-            'available_stock': self.available_stock,
-            'reserved_stock': self.reserved_stock,
-            'category': self.category,
-            'is_active': self.is_active,
-            'is_low_stock': self.is_low_stock,
-            'weight_kg': float(self.weight_kg) if self.weight_kg else 0
-        }
+    def to_dict(self, fields=None):
+        """Serialize the product; ``fields`` limits the keys (see FIELDS)."""
+        return self.FIELDS.dump(self, fields)
+    
+    FIELDS = FieldSet({
+        'id': (('id',), lambda p: p.id),
+        'sku': (('sku',), lambda p: p.sku),
+        'name': (('name',), lambda p: p.name),
+        'description': (('description',), lambda p: p.description),
+        'price': (('price',), lambda p: p.price),
+        'stock': (('stock',), lambda p: p.stock),
+        'available_stock': (
+            ('stock', 'reserved_stock', 'reservation_shards'),
+            lambda p: p.available_stock
+        ),
+        'reserved_stock': (('reserved_stock',), lambda p: p.reserved_stock),
+        'category': (('category',), lambda p: p.category),
+        'is_active': (('is_active',), lambda p: p.is_active),
+        'is_low_stock': (
+            ('stock', 'reserved_stock', 'reservation_shards', 'low_stock_threshold'),
+            lambda p: p.is_low_stock
+        ),
+        'weight_kg': (('weight_kg',), lambda p: p.weight_kg or 0),
+    })
+
+# Free stock above the low-stock threshold; <= 0 means low stock. Queries
+# must use this exact expression for ix_products_stock_headroom to apply.
+STOCK_HEADROOM = Product.stock - Product.reserved_stock - Product.low_stock_threshold
+db.Index('ix_products_stock_headroom', STOCK_HEADROOM)
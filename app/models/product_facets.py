@@ -0,0 +1,192 @@
+"""Facet counts for active products by category, price band and stock.
+
+``product_facets`` holds one row per (category, price_band, in_stock)
+bucket. Triggers on ``products`` move a product between buckets when its
+price, category, availability or active flag changes, and triggers on
+``stock_shards`` when a sharded reservation changes its availability, so
+the counts stay current without recounting the catalog on every request.
+"""
+from sqlalchemy import DDL, event, text
+from app import db
+
+# Upper bounds of the price bands; the last band is open-ended
+PRICE_BANDS = (10, 25, 50, 100, 250)
+
+
+def band_labels():
+    bounds = (0,) + PRICE_BANDS
+    labels = [f'{low}-{high}' for low, high in zip(bounds, bounds[1:])]
+    return labels + [f'{PRICE_BANDS[-1]}+']
+
+
+def _band_sql(row):
+    labels = band_labels()
+    whens = ' '.join(
+        f"WHEN {row}.price < {bound} THEN '{label}'"
+        for bound, label in zip(PRICE_BANDS, labels)
+    )
+    return f"CASE {whens} ELSE '{labels[-1]}' END"
+
+
+def _available(row):
+    """SQL for the free units of product ``row``.
+    
+    Stock moved into reservation shards but not yet taken by an order is
+    still available (see Product.available_stock).
+    """
+    return (
+        f"coalesce({row}.stock, 0) - coalesce({row}.reserved_stock, 0) + "
+        "(SELECT coalesce(sum(allotment - reserved), 0) FROM stock_shards "
+        f"WHERE stock_shards.product_id = {row}.id)"
+    )
+
+
+def _bucket(row):
+    """SQL for (category, price_band, in_stock) of trigger row ``row``."""
+    return (
+        f"coalesce({row}.category, '')",
+        _band_sql(row),
+        f"({_available(row)} > 0)",
+    )
+
+
+def _key_match(row):
+    category, band, in_stock = _bucket(row)
+    return f"category = {category} AND price_band = {band} AND in_stock = {in_stock}"
+
+
+def _changed(distinct):
+    pairs = list(zip(_bucket('old'), _bucket('new'))) + [('old.is_active', 'new.is_active')]
+    return ' OR '.join(f'{old} {distinct} {new}' for old, new in pairs)
+
+
+def _upsert(row, where):
+    category, band, in_stock = _bucket(row)
+    return (
+        "INSERT INTO product_facets (category, price_band, in_stock, product_count) "
+        f"SELECT {category}, {band}, {in_stock}, 1 WHERE {where} "
+        "ON CONFLICT (category, price_band, in_stock) "
+        "DO UPDATE SET product_count = product_facets.product_count + 1"
+    )
+
+
+def _decrement(row, where):
+    return (
+        "UPDATE product_facets SET product_count = product_count - 1 "
+        f"WHERE {where} AND {_key_match(row)}"
+    )
+
+
+def _shard_changed(old, new):
+    return f"({old}.allotment - {old}.reserved) <> ({new}.allotment - {new}.reserved)"
+
+
+def _shard_moves(old, new):
+    """Statements moving a shard's product between in-stock buckets.
+    
+    Sharded reservations only update ``stock_shards``; the product's
+    availability before the update is recovered from the shard's delta.
+    """
+    category, band, in_stock = _bucket('products')
+    delta = f"({old}.allotment - {old}.reserved) - ({new}.allotment - {new}.reserved)"
+    was_in_stock = f"({_available('products')} + {delta} > 0)"
+    source = (
+        f"FROM products WHERE products.id = {new}.product_id AND products.is_active "
+        f"AND {was_in_stock} <> {in_stock}"
+    )
+    return (
+        "UPDATE product_facets SET product_count = product_count - 1 "
+        "WHERE (category, price_band, in_stock) IN "
+        f"(SELECT {category}, {band}, {was_in_stock} {source})",
+        "INSERT INTO product_facets (category, price_band, in_stock, product_count) "
+        f"SELECT {category}, {band}, {in_stock}, 1 {source} "
+        "ON CONFLICT (category, price_band, in_stock) "
+        "DO UPDATE SET product_count = product_facets.product_count + 1",
+    )
+
+
+# Only the columns that decide the bucket fire the update trigger
+TRACKED_COLUMNS = 'price, stock, reserved_stock, category, is_active'
+
+# Dropped first so existing databases pick up changed trigger bodies
+SQLITE_DDL = [
+    "DROP TRIGGER IF EXISTS product_facets_ai",
+    "CREATE TRIGGER product_facets_ai AFTER INSERT ON products BEGIN "
+    f"{_upsert('new', 'new.is_active')}; END",
+    "DROP TRIGGER IF EXISTS product_facets_ad",
+    "CREATE TRIGGER product_facets_ad AFTER DELETE ON products BEGIN "
+    f"{_decrement('old', 'old.is_active')}; END",
+    "DROP TRIGGER IF EXISTS product_facets_au",
+    f"CREATE TRIGGER product_facets_au AFTER UPDATE OF {TRACKED_COLUMNS} "
+    f"ON products WHEN {_changed('IS NOT')} BEGIN "
+    f"{_decrement('old', 'old.is_active')}; "
+    f"{_upsert('new', 'new.is_active')}; END",
+    "DROP TRIGGER IF EXISTS product_facets_shard_au",
+    "CREATE TRIGGER product_facets_shard_au AFTER UPDATE OF allotment, reserved "
+    f"ON stock_shards WHEN {_shard_changed('old', 'new')} BEGIN "
+    + '; '.join(_shard_moves('old', 'new')) + "; END",
+]
+
+POSTGRES_DDL = [
+    "CREATE OR REPLACE FUNCTION product_facets_sync() RETURNS trigger AS $$ BEGIN "
+    "IF TG_OP <> 'INSERT' THEN "
+    f"{_decrement('OLD', 'OLD.is_active')}; "
+    "END IF; "
+    "IF TG_OP <> 'DELETE' THEN "
+    f"{_upsert('NEW', 'NEW.is_active')}; "
+    "END IF; "
+    "RETURN NULL; END $$ LANGUAGE plpgsql",
+    "DROP TRIGGER IF EXISTS product_facets_insert_delete ON products",
+    "CREATE TRIGGER product_facets_insert_delete AFTER INSERT OR DELETE ON products "
+    "FOR EACH ROW EXECUTE FUNCTION product_facets_sync()",
+    "DROP TRIGGER IF EXISTS product_facets_update ON products",
+    f"CREATE TRIGGER product_facets_update AFTER UPDATE OF {TRACKED_COLUMNS} ON products "
+    f"FOR EACH ROW WHEN ({_changed('IS DISTINCT FROM')}) "
+    "EXECUTE FUNCTION product_facets_sync()",
+    "CREATE OR REPLACE FUNCTION product_facets_shard_sync() RETURNS trigger AS $$ BEGIN "
+    + '; '.join(_shard_moves('OLD', 'NEW')) + "; "
+    "RETURN NULL; END $$ LANGUAGE plpgsql",
+    "DROP TRIGGER IF EXISTS product_facets_shard_update ON stock_shards",
+    "CREATE TRIGGER product_facets_shard_update AFTER UPDATE OF allotment, reserved "
+    f"ON stock_shards FOR EACH ROW WHEN ({_shard_changed('OLD', 'NEW')}) "
+    "EXECUTE FUNCTION product_facets_shard_sync()",
+]
+
+
+class ProductFacet(db.Model):
+    """Number of active products in one (category, price band, in stock) bucket."""
+    __tablename__ = 'product_facets'
+    
+    category = db.Column(db.String(100), primary_key=True)  # '' = uncategorized
+    price_band = db.Column(db.String(20), primary_key=True)
+    in_stock = db.Column(db.Boolean, primary_key=True)
+    product_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    @staticmethod
+    def create_triggers(connection):
+        """Install the maintenance triggers for ``connection``'s dialect."""
+        statements = {
+            'sqlite': SQLITE_DDL,
+            'postgresql': POSTGRES_DDL,
+        }.get(connection.dialect.name, [])
+        for statement in statements:
+            connection.execute(DDL(statement))
+    
+    @staticmethod
+    def rebuild(connection):
+        """Recount every bucket from the products table."""
+        category, band, in_stock = _bucket('products')
+        connection.execute(text('DELETE FROM product_facets'))
+        connection.execute(text(
+            "INSERT INTO product_facets (category, price_band, in_stock, product_count) "
+            f"SELECT {category}, {band}, {in_stock}, count(*) FROM products "
+            "WHERE products.is_active GROUP BY 1, 2, 3"
+        ))
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_facet_triggers(target, connection, tables=None, **kw):
+    # Runs once products, stock_shards and product_facets exist
+    names = {table.name for table in tables} if tables is not None else None
+    if names is None or {'products', 'stock_shards', 'product_facets'} & names:
+        ProductFacet.create_triggers(connection)
@@ -0,0 +1,61 @@
+"""Full-text index over product name, SKU and description.
+
+SQLite gets an FTS5 external-content table kept in sync by triggers;
+PostgreSQL gets a GIN index on a weighted tsvector expression, which it
+maintains itself. Both are created together with the products table.
+"""
+from sqlalchemy import DDL, event
+from app.models.product import Product
+
+FTS_TABLE = 'products_fts'
+
+# Name and SKU weigh more than description. The search query must use
+# exactly this expression for PostgreSQL to pick the index.
+PG_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(name, '') || ' ' || coalesce(sku, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+)
+
+SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "name, sku, description, content='products', content_rowid='id', "
+    "tokenize='porter unicode61')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON products BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, name, sku, description) "
+    "VALUES (new.id, new.name, new.sku, new.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON products BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, sku, description) "
+    "VALUES ('delete', old.id, old.name, old.sku, old.description); END",
+    # Only text changes touch the index, not the frequent stock updates
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, sku, description "
+    "ON products BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, sku, description) "
+    "VALUES ('delete', old.id, old.name, old.sku, old.description); "
+    f"INSERT INTO {FTS_TABLE}(rowid, name, sku, description) "
+    "VALUES (new.id, new.name, new.sku, new.description); END",
+]
+
+POSTGRES_DDL = [
+    f"CREATE INDEX IF NOT EXISTS ix_products_search ON products USING GIN (({PG_DOCUMENT}))",
+]
+
+
+def create_search_index(connection):
+    """Create the index for ``connection``'s dialect if it is missing."""
+    statements = {
+        'sqlite': SQLITE_DDL,
+        'postgresql': POSTGRES_DDL,
+    }.get(connection.dialect.name, [])
+    for statement in statements:
+        connection.execute(DDL(statement))
+
+
+@event.listens_for(Product.__table__, 'after_create')
+def _create_search_index(target, connection, **kw):
+    create_search_index(connection)
+
+
+event.listen(
+    Product.__table__, 'before_drop',
+    DDL(f'DROP TABLE IF EXISTS {FTS_TABLE}').execute_if(dialect='sqlite')
+)
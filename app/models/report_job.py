@@ -0,0 +1,58 @@
+from datetime import datetime
+from sqlalchemy import text
+from app import db
+
+ACTIVE_STATUSES = ('pending', 'running')
+
+
+class ReportJob(db.Model):
+    """A report requested over the API and built by `flask run-report-jobs`.
+    
+    ``params_hash`` identifies the request (kind plus normalized
+    parameters). At most one pending or running job exists per hash, so
+    identical requests made while one is in flight share it.
+    """
+    __tablename__ = 'report_jobs'
+    __table_args__ = (
+        db.Index(
+            'uq_report_jobs_active_hash', 'params_hash', unique=True,
+            sqlite_where=text("status IN ('pending', 'running')"),
+            postgresql_where=text("status IN ('pending', 'running')")
+        ),
+        # Workers claim the oldest pending job
+        db.Index('ix_report_jobs_status_id', 'status', 'id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    params = db.Column(db.Text, nullable=False)  # normalized JSON
+    params_hash = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, running, done, failed
+    progress = db.Column(db.Integer, nullable=False, default=0)  # rows written so far
+    total = db.Column(db.Integer)  # rows expected, once known
+    file_name = db.Column(db.String(255))
+    error = db.Column(db.Text)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    # Bumped with every progress update; a running job that stops
+    # heartbeating is handed to another worker
+    heartbeat_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    @property
+    def in_flight(self):
+        return self.status in ACTIVE_STATUSES
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': self.progress,
+            'total': self.total,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
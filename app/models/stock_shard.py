@@ -0,0 +1,97 @@
+from datetime import datetime
+from sqlalchemy import func, update
+from app import db
+
+class StockShard(db.Model):
+    """One of several reservation counters for a hot product.
+    
+    Escrow model: ``allotment`` units of the product's free stock have been
+    moved into this shard (and are counted in Product.reserved_stock);
+    ``reserved`` of them are held by orders. Reservations only touch a
+    shard row, so concurrent orders for the same product spread over
+    several rows instead of queueing on one.
+    """
+    __tablename__ = 'stock_shards'
+    
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), primary_key=True)
+    shard = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    allotment = db.Column(db.Integer, nullable=False, default=0)
+    reserved = db.Column(db.Integer, nullable=False, default=0)
+    # Bumped by every balance change; the catalog polls it alongside
+    # products.updated_at, which shard reservations do not touch
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    
+    @classmethod
+    def take(cls, product_id, shard, quantity):
+        """Reserve ``quantity`` from the shard's allotment. Does not commit."""
+        return db.session.execute(
+            update(cls).where(
+                cls.product_id == product_id,
+                cls.shard == shard,
+                cls.reserved + quantity <= cls.allotment
+            ).values(
+                reserved=cls.reserved + quantity
+            ).returning(cls.shard).execution_options(synchronize_session=False)
+        ).first() is not None
+    
+    @classmethod
+    def refill(cls, product_id, shard, amount, quantity):
+        """Add ``amount`` to the allotment and reserve ``quantity`` of it.
+        
+        Returns False if the shard no longer exists. Does not commit.
+        """
+        return db.session.execute(
+            update(cls).where(
+                cls.product_id == product_id,
+                cls.shard == shard
+            ).values(
+                allotment=cls.allotment + amount,
+                reserved=cls.reserved + quantity
+            ).returning(cls.shard).execution_options(synchronize_session=False)
+        ).first() is not None
+    
+    @classmethod
+    def last_change(cls, product_id):
+        """Newest ``updated_at`` among the product's shards, or None."""
+        return db.session.execute(
+            db.select(func.max(cls.updated_at)).where(cls.product_id == product_id)
+        ).scalar()
+    
+    @classmethod
+    def unused(cls, product_id):
+        """Allotted units not yet reserved, summed over the product's shards."""
+        return db.session.execute(
+            db.select(func.coalesce(func.sum(cls.allotment - cls.reserved), 0))
+            .where(cls.product_id == product_id)
+        ).scalar()
+    
+    @classmethod
+    def drain(cls, product_id):
+        """Zero the product's shards; returns the unused allotment.
+        
+        Reserved units stay accounted for in Product.reserved_stock, so the
+        caller only has to release the returned amount. Each shard is reset
+        only if it still holds the values read, so a reservation racing
+        with the drain just leaves that shard for the next run.
+        Does not commit.
+        """
+        rows = db.session.execute(
+            db.select(cls.shard, cls.allotment, cls.reserved)
+            .where(cls.product_id == product_id, cls.allotment > 0)
+        ).all()
+        unused = 0
+        for shard, allotment, reserved in rows:
+            drained = db.session.execute(
+                update(cls).where(
+                    cls.product_id == product_id,
+                    cls.shard == shard,
+                    cls.allotment == allotment,
+                    cls.reserved == reserved
+                ).values(
+                    allotment=0,
+                    reserved=0
+                ).returning(cls.shard).execution_options(synchronize_session=False)
+            ).first()
+            if drained is not None:
+                unused += allotment - reserved
+        return unused
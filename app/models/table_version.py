@@ -0,0 +1,60 @@
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app import db
+
+class TableVersion(db.Model):
+    """Per-table change counter, used to build ETags for small tables."""
+    __tablename__ = 'table_versions'
+    
+    name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    
+    _tracked = set()
+    DIALECTS = {'sqlite': sqlite, 'postgresql': postgresql}
+    
+    @classmethod
+    def track(cls, *models):
+        """Bump the counter of ``models``' tables whenever the ORM flushes
+        changes to them. Bulk UPDATE/DELETE statements are not seen.
+        """
+        cls._tracked.update(model.__tablename__ for model in models)
+    
+    @classmethod
+    def current(cls, name):
+        version = db.session.execute(
+            db.select(cls.version).where(cls.name == name)
+        ).scalar()
+        return version or 0
+    
+    @classmethod
+    def bump(cls, connection, names):
+        """Increment the counters of ``names``, creating missing rows.
+        
+        A single upsert, so concurrent first writers cannot both insert.
+        """
+        dialect = cls.DIALECTS[connection.dialect.name]
+        stmt = dialect.insert(cls.__table__).values([
+            {'name': name, 'version': 1} for name in sorted(names)
+        ])
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=[cls.name],
+            set_={'version': cls.version + 1}
+        ))
+
+
+@event.listens_for(Session, 'before_flush')
+def _bump_table_versions(session, flush_context, instances):
+    changed = {
+        obj.__tablename__
+        for obj in list(session.new) + list(session.deleted)
+        if getattr(obj, '__tablename__', None) in TableVersion._tracked
+    }
+    changed.update(
+        obj.__tablename__
+        for obj in session.dirty
+        if getattr(obj, '__tablename__', None) in TableVersion._tracked
+        and session.is_modified(obj)
+    )
+    if changed:
+        TableVersion.bump(session.connection(), changed)
@@ -1,6 +1,7 @@
 from datetime import datetime, timedelta
 import bcrypt
 from app import db
+from app.utils.fields import FieldSet
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -76,13 +77,16 @@ class User(db.Model):
         )
         return {'access_token': access, 'refresh_token': refresh}
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'email': self.email,
-            'first_name': self.first_name,
-            'last_name': self.last_name,
-            'role': self.role,
-            'is_active': self.is_active,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+    def to_dict(self, fields=None):
+        """Serialize the user; ``fields`` limits the keys (see FIELDS)."""
+        return self.FIELDS.dump(self, fields)
+    
+    FIELDS = FieldSet({
+        'id': (('id',), lambda u: u.id),
+        'email': (('email',), lambda u: u.email),
+        'first_name': (('first_name',), lambda u: u.first_name),
+        'last_name': (('last_name',), lambda u: u.last_name),
+        'role': (('role',), lambda u: u.role),
+        'is_active': (('is_active',), lambda u: u.is_active),
+        'created_at': (('created_at',), lambda u: u.created_at),
+    })
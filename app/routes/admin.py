@@ -2,7 +2,9 @@ from flask import Blueprint, request, jsonify
 from app import db
 from app.models import User, Product, Order
 from app.routes.auth import admin_required
-from sqlalchemy import func
+from app.services.order_service import order_service
+from app.services.search import product_search
+from sqlalchemy import false, func
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/api/v1/admin')
 
@@ -19,7 +21,8 @@ def list_users():
     sort_by = request.args.get('sort_by', 'created_at')  # created_at, email, name
     sort_order = request.args.get('sort_order', 'desc')  # asc, desc
     
-    query = User.query
+    fields = User.FIELDS.requested()
+    query = User.query.options(*User.FIELDS.options(fields))
     
     # Apply search filter (email or name)
     if search:
@@ -58,7 +61,7 @@ def list_users():
     )
     
     return jsonify({
-        'users': [u.to_dict() for u in pagination.items],
+        'users': [u.to_dict(fields) for u in pagination.items],
         'pagination': {
             'page': page,
             'per_page': per_page,
@@ -102,13 +105,16 @@ def update_user_status(user_id):
 @admin_required
 def get_user_detail(user_id):
     """Get detailed user information with orders."""
-    user = User.query.get_or_404(user_id)
+    fields = User.FIELDS.requested()
+    user = User.query.options(*User.FIELDS.options(fields)).get_or_404(user_id)
     
     # Get user's orders
-    orders = [o.to_dict() for o in user.orders.order_by(Order.created_at.desc()).limit(10)]
+    orders = order_service.serialize_orders(
+        user.orders.order_by(Order.created_at.desc()).limit(10)
+    )
     
     return jsonify({
-        'user': user.to_dict(),
+        'user': user.to_dict(fields),
         'orders': orders,
         'order_count': user.orders.count()
     })
@@ -131,18 +137,17 @@ def search_products():
     sort_by = request.args.get('sort_by', 'name')
     sort_order = request.args.get('sort_order', 'asc')
     
-    query = Product.query
+    fields = Product.FIELDS.requested()
+    query = Product.query.options(*Product.FIELDS.options(fields))
     
-    # Search in name, SKU, description
+    # Search in name, SKU, description via the full-text index, plus SKU
+    # fragments; a term without any words matches nothing
+    rank = None
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            db.or_(
-                Product.name.ilike(search_term),
-                Product.sku.ilike(search_term),
-                Product.description.ilike(search_term)
-            )
-        )
+        if product_search.tokens(search):
+            query, rank = product_search.apply(query, search, sku_substring=True)
+        else:
+            query = query.filter(false())
     
     # Category filter
     if category:
@@ -171,7 +176,10 @@ def search_products():
     }
     sort_column = sort_columns.get(sort_by, Product.name)
     
-    if sort_order == 'desc':
+    if rank is not None and 'sort_by' not in request.args:
+        # Best matches first unless an explicit sort was requested
+        query = query.order_by(rank, Product.id)
+    elif sort_order == 'desc':
         query = query.order_by(sort_column.desc())
     else:
         query = query.order_by(sort_column.asc())
@@ -181,7 +189,7 @@ def search_products():
     )
     
     return jsonify({
-        'products': [p.to_dict() for p in pagination.items],
+        'products': [p.to_dict(fields) for p in pagination.items],
         'pagination': {
             'page': page,
             'per_page': per_page,
@@ -114,9 +114,10 @@ def logout():
 @jwt_required()
 def get_current_user():
     user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
+    fields = User.FIELDS.requested()
+    user = User.query.options(*User.FIELDS.options(fields)).get(user_id)
     
     if not user:
         return jsonify({'error': 'User not found'}), 404
     
-    return jsonify({'user': user.to_dict()})
+    return jsonify({'user': user.to_dict(fields)})
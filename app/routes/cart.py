@@ -3,6 +3,7 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from app.models import Product, CartItem, User
+from app.utils.idempotency import idempotent
 
 cart_bp = Blueprint('cart', __name__, url_prefix='/api/v1/cart')
 
@@ -38,6 +39,7 @@ def get_cart():
 
 @cart_bp.route('/add', methods=['POST'])
 @jwt_required()
+@idempotent
 def add_to_cart():
     """Add product to cart."""
     user_id = int(get_jwt_identity())
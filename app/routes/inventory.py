@@ -1,27 +1,61 @@
-from flask import Blueprint, request, jsonify
+import io
+from flask import Blueprint, Response, current_app, request, jsonify
 from app import db
-from app.models import Product
+from app.models import Product, ProductFacet
+from app.models.product_facets import band_labels
 from app.routes.auth import jwt_required, manager_required
+from app.services.catalog import catalog
+from app.services.product_import import product_importer
+from app.services.search import product_search
+from app.services.stock_service import stock_service
+from app.utils.caching import etag_for, not_modified, with_etag
 
 inventory_bp = Blueprint('inventory', __name__, url_prefix='/api/v1/inventory')
 
 @inventory_bp.route('/products', methods=['GET'])
 @jwt_required()
 def list_products():
-    page = request.args.get('page', 1, type=int)
+    page = max(request.args.get('page', 1, type=int), 1)
     per_page = request.args.get('per_page', 20, type=int)
     category = request.args.get('category')
+    limit = max(min(per_page, 100), 1)
     
-    query = Product.query.filter_by(is_active=True)
+    fields = Product.FIELDS.requested()
+    if fields is not None:
+        return _list_sparse_products(page, per_page, limit, category, fields)
+    
+    # Served from the in-memory catalog; the product JSON is already encoded
+    entries, total = catalog.page(page, limit, category)
+    etag = etag_for('products', page, per_page, category, total,
+                    *(f'{e.id}@{e.version}' for e in entries))
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    pagination = {
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'pages': -(-total // limit)
+    }
+    body = '{"products":[%s],"pagination":%s}' % (
+        ','.join(entry.json for entry in entries),
+        current_app.json.dumps(pagination)
+    )
+    return with_etag(Response(body, mimetype='application/json'), etag)
+
+def _list_sparse_products(page, per_page, limit, category, fields):
+    """?fields= pages read only the requested columns from the database."""
+    query = Product.query.options(*Product.FIELDS.options(fields)).filter(
+        Product.is_active.is_(True)
+    )
     if category:
         query = query.filter_by(category=category)
-    
-    pagination = query.order_by(Product.name).paginate(
-        page=page, per_page=min(per_page, 100), error_out=False
+    pagination = query.order_by(Product.name, Product.id).paginate(
+        page=page, per_page=limit, error_out=False
     )
-    
     return jsonify({
-        'products': [p.to_dict() for p in pagination.items],
+        'products': [p.to_dict(fields) for p in pagination.items],
         'pagination': {
             'page': page,
             'per_page': per_page,
@@ -33,8 +67,66 @@ def list_products():
 @inventory_bp.route('/products/<int:product_id>', methods=['GET'])
 @jwt_required()
 def get_product(product_id):
-    product = Product.query.get_or_404(product_id)
-    return jsonify({'product': product.to_dict()})
+    fields = Product.FIELDS.requested()
+    if fields is not None:
+        product = Product.query.options(*Product.FIELDS.options(fields)).get_or_404(product_id)
+        return jsonify({'product': product.to_dict(fields)})
+    
+    entry = catalog.get(product_id)
+    if entry is not None:
+        version, product = entry.version, None
+    else:
+        # Inactive, or created since the last refresh
+        product = Product.query.get_or_404(product_id)
+        version = product.version
+    
+    etag = etag_for('product', product_id, version)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    encoded = entry.json if product is None else current_app.json.dumps(product.to_dict())
+    return with_etag(Response('{"product":%s}' % encoded, mimetype='application/json'), etag)
+
+@inventory_bp.route('/search', methods=['GET'])
+@jwt_required()
+def search_products():
+    """Full-text search over active products, best matches first."""
+    term = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = max(min(request.args.get('per_page', 20, type=int), 100), 1)
+    category = request.args.get('category')
+    
+    fields = Product.FIELDS.requested()
+    
+    ids, total = product_search.search_ids(term, page, per_page, category)
+    
+    # Encoded JSON comes from the catalog; rows it has not seen yet (or all
+    # of them, for a ?fields= projection) are loaded
+    encoded = {}
+    if fields is None:
+        for product_id in ids:
+            entry = catalog.get(product_id)
+            if entry is not None:
+                encoded[product_id] = entry.json
+    missing = [i for i in ids if i not in encoded]
+    if missing:
+        query = Product.query.options(*Product.FIELDS.options(fields))
+        for product in query.filter(Product.id.in_(missing)):
+            encoded[product.id] = current_app.json.dumps(product.to_dict(fields))
+    
+    pagination = {
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'pages': -(-total // per_page)
+    }
+    body = '{"products":[%s],"pagination":%s,"query":%s}' % (
+        ','.join(encoded[i] for i in ids if i in encoded),
+        current_app.json.dumps(pagination),
+        current_app.json.dumps(term)
+    )
+    return Response(body, mimetype='application/json')
 
 @inventory_bp.route('/products', methods=['POST'])
 @manager_required
@@ -60,12 +152,39 @@ def create_product():
     
     db.session.add(product)
     db.session.commit()
+    catalog.mark_stale()
     
     return jsonify({
         'message': 'Product created',
         'product': product.to_dict()
     }), 201
 
+@inventory_bp.route('/products/import', methods=['POST'])
+@manager_required
+def import_products():
+    """Upsert products by SKU from a CSV body (export_inventory_csv columns).
+    
+    The body is read as a stream and written in batches of
+    PRODUCT_IMPORT_BATCH_SIZE rows, one commit per batch. A body that
+    stops decoding or parsing part way answers 400 with the counts of
+    what was written before ``stopped.line``.
+    """
+    lines = io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline='')
+    try:
+        result = product_importer.import_csv(
+            lines, current_app.config['PRODUCT_IMPORT_BATCH_SIZE']
+        )
+    except UnicodeDecodeError:
+        return jsonify({'error': 'CSV must be UTF-8'}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    finally:
+        catalog.mark_stale()
+    
+    if 'stopped' in result:
+        return jsonify({'error': result['stopped']['error'], **result}), 400
+    return jsonify(result)
+
 @inventory_bp.route('/products/<int:product_id>', methods=['PUT'])
 @manager_required
 def update_product(product_id):
@@ -78,6 +197,7 @@ def update_product(product_id):
             setattr(product, field, data[field])
     
     db.session.commit()
+    catalog.mark_stale()
     
     return jsonify({
         'message': 'Product updated',
@@ -87,12 +207,48 @@ def update_product(product_id):
 @inventory_bp.route('/categories', methods=['GET'])
 @jwt_required()
 def list_categories():
-    categories = db.session.query(Product.category).distinct().all()
-    return jsonify({'categories': [c[0] for c in categories if c[0]]})
+    # Categories with active products, read from the facet summary table
+    categories = db.session.query(ProductFacet.category).filter(
+        ProductFacet.product_count > 0,
+        ProductFacet.category != ''
+    ).distinct().order_by(ProductFacet.category).all()
+    return jsonify({'categories': [c[0] for c in categories]})
+
+@inventory_bp.route('/facets', methods=['GET'])
+@jwt_required()
+def get_facets():
+    """Counts of active products per category, price band and availability."""
+    category = request.args.get('category')
+    
+    query = ProductFacet.query.filter(ProductFacet.product_count > 0)
+    if category:
+        query = query.filter_by(category=category)
+    
+    categories = {}
+    bands = dict.fromkeys(band_labels(), 0)
+    total = in_stock = 0
+    for facet in query:
+        counts = categories.setdefault(facet.category, {'count': 0, 'in_stock': 0})
+        counts['count'] += facet.product_count
+        bands[facet.price_band] = bands.get(facet.price_band, 0) + facet.product_count
+        total += facet.product_count
+        if facet.in_stock:
+            counts['in_stock'] += facet.product_count
+            in_stock += facet.product_count
+    
+    return jsonify({
+        'categories': [
+            {'name': name or None, **counts} for name, counts in sorted(categories.items())
+        ],
+        'price_bands': [{'band': band, 'count': count} for band, count in bands.items()],
+        'total': total,
+        'in_stock': in_stock
+    })
 
 @inventory_bp.route('/products/<int:product_id>/stock', methods=['PATCH'])
 @manager_required
 def adjust_stock(product_id):
+    """Apply one stock delta; same rule as the batch endpoint (Product.adjust_many)."""
     product = Product.query.get_or_404(product_id)
     data = request.get_json()
     
@@ -100,14 +256,74 @@ def adjust_stock(product_id):
     if adjustment is None:
         return jsonify({'error': 'adjustment required'}), 400
     
-    new_stock = product.stock + adjustment
-    if new_stock < 0:
+    if Product.adjust_many({product.id: adjustment}):
+        db.session.rollback()
         return jsonify({'error': 'Insufficient stock for adjustment'}), 400
     
-    product.stock = new_stock
     db.session.commit()
+    catalog.mark_stale()
     
     return jsonify({
         'message': 'Stock adjusted',
         'product': product.to_dict()
     })
+
+@inventory_bp.route('/products/<int:product_id>/shards', methods=['PUT'])
+@manager_required
+def set_reservation_shards(product_id):
+    """Spread a hot product's reservations over N counter rows (0 turns it off)."""
+    product = Product.query.get_or_404(product_id)
+    data = request.get_json() or {}
+    
+    shards = data.get('shards')
+    if not isinstance(shards, int) or isinstance(shards, bool) or not 0 <= shards <= 64:
+        return jsonify({'error': 'shards must be an integer between 0 and 64'}), 400
+    
+    product.set_reservation_shards(shards)
+    db.session.commit()
+    catalog.mark_stale()
+    
+    return jsonify({
+        'message': 'Reservation shards updated',
+        'product': product.to_dict(),
+        'reservation_shards': product.reservation_shards
+    })
+
+@inventory_bp.route('/stock/batch', methods=['POST'])
+@manager_required
+def adjust_stock_batch():
+    """Apply many stock deltas at once.
+    
+    Body: {"adjustments": [{"sku": "...", "adjustment": 5}, {"id": 3, "adjustment": -2}]}
+    Valid lines are applied in one transaction; failed lines are listed.
+    A product's summed delta is rejected if it would leave fewer units in
+    stock than its orders hold; unused shard allotments count as free.
+    """
+    data = request.get_json() or {}
+    lines = data.get('adjustments')
+    max_lines = current_app.config['STOCK_ADJUST_MAX_LINES']
+    
+    if not isinstance(lines, list) or not lines:
+        return jsonify({'error': 'adjustments must be a non-empty list'}), 400
+    if len(lines) > max_lines:
+        return jsonify({'error': f'At most {max_lines} adjustments per request'}), 400
+    for index, line in enumerate(lines):
+        valid = (
+            isinstance(line, dict)
+            and (isinstance(line.get('sku'), str)) != (isinstance(line.get('id'), int))
+            and isinstance(line.get('adjustment'), int)
+            and not isinstance(line.get('adjustment'), bool)
+            and not isinstance(line.get('id'), bool)
+        )
+        if not valid:
+            return jsonify({
+                'error': 'Each adjustment needs either sku or id, and an integer adjustment',
+                'line': index
+            }), 400
+    
+    result = stock_service.adjust([
+        {key: line[key] for key in ('sku', 'id', 'adjustment') if key in line}
+        for line in lines
+    ])
+    catalog.mark_stale()
+    return jsonify(result)
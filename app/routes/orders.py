@@ -1,8 +1,11 @@
-from flask import Blueprint, request, jsonify
+from datetime import datetime
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
-from app import db
-from app.models import Order, OrderItem, Product
+from app.models import Order
 from app.routes.auth import admin_required
+from app.services.order_service import order_service, OrderError
+from app.utils.idempotency import idempotent
+from app.utils.pagination import keyset_page
 
 orders_bp = Blueprint('orders', __name__, url_prefix='/api/v1/orders')
 
@@ -16,20 +19,26 @@ def list_orders():
     per_page = request.args.get('per_page', 20, type=int)
     status = request.args.get('status')
     
-    if claims.get('role') == 'admin':
-        query = Order.query
-    else:
-        query = Order.query.filter_by(user_id=user_id)
+    fields = Order.FIELDS.requested()
+    # The sort key is loaded too; keyset cursors are built from it
+    query = Order.query.options(*Order.FIELDS.options(fields, Order.created_at))
+    if claims.get('role') != 'admin':
+        query = query.filter_by(user_id=user_id)
     
     if status:
         query = query.filter_by(status=status)
     
+    # Keyset mode: ?cursor= (empty for the first page) skips OFFSET scans
+    cursor = request.args.get('cursor')
+    if cursor is not None:
+        return _list_orders_by_cursor(query, cursor, max(min(per_page, 100), 1), fields)
+    
     pagination = query.order_by(Order.created_at.desc()).paginate(
         page=page, per_page=per_page, error_out=False
     )
     
     return jsonify({
-        'orders': [o.to_dict() for o in pagination.items],
+        'orders': order_service.serialize_orders(pagination.items, fields),
         'pagination': {
             'page': page,
             'per_page': per_page,
@@ -37,78 +46,76 @@ def list_orders():
         }
     })
 
+def _list_orders_by_cursor(query, cursor, per_page, fields):
+    try:
+        orders, next_cursor = keyset_page(
+            query, [Order.created_at, Order.id], cursor, per_page
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    pagination = {'per_page': per_page, 'next_cursor': next_cursor}
+    if request.args.get('include_total', 'false').lower() == 'true':
+        pagination['total'] = query.order_by(None).count()
+    
+    return jsonify({
+        'orders': order_service.serialize_orders(orders, fields),
+        'pagination': pagination
+    })
+
 @orders_bp.route('', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_order():
     user_id = int(get_jwt_identity())
     data = request.get_json()
     
-    items_data = data.get('items', [])
-    if not items_data:
-        return jsonify({'error': 'Order must contain items'}), 400
-    
-    # Validate and reserve stock
-    order_items = []
-    for item in items_data:
-        product = Product.query.get(item.get('product_id'))
-        if not product:
-            return jsonify({'error': f"Product {item.get('product_id')} not found"}), 404
-        
-        quantity = item.get('quantity', 0)
-        if quantity <= 0:
-            return jsonify({'error': 'Quantity must be positive'}), 400
-        
-        if quantity > product.available_stock:
-            return jsonify({
-                'error': f'Insufficient stock for {product.name}',
-                'available': product.available_stock
-            }), 400
-        
-        order_items.append({'product': product, 'quantity': quantity})
-    
-    # Create order
-    order = Order(
-        order_number=Order.generate_order_number(),
-        user_id=user_id
-    )
-    db.session.add(order)
-    db.session.flush()
-    
-    # Create items and reserve stock
-    for item_data in order_items:
-        product = item_data['product']
-        quantity = item_data['quantity']
-        
-        product.reserve_stock(quantity)
-        
-        order_item = OrderItem(
-            order_id=order.id,
-            product_id=product.id,
-            quantity=quantity,
-            unit_price=product.price
-        )
-        db.session.add(order_item)
-    
-    order.calculate_totals()
-    db.session.commit()
+    try:
+        order = order_service.create_order(user_id, data.get('items', []))
+    except OrderError as e:
+        return jsonify(e.to_dict()), e.status_code
     
     return jsonify({
         'message': 'Order created',
-        'order': order.to_dict()
+        'order': order_service.serialize_order(order)
     }), 201
 
+@orders_bp.route('/bulk', methods=['POST'])
+@jwt_required()
+def bulk_create_orders():
+    """Create orders from an NDJSON body, one order object per line.
+    
+    Lines are processed in chunks of ``chunk_size`` with one transaction
+    per chunk; per-order results are streamed back as NDJSON.
+    """
+    user_id = int(get_jwt_identity())
+    chunk_size = request.args.get(
+        'chunk_size', current_app.config['BULK_ORDER_CHUNK_SIZE'], type=int
+    )
+    chunk_size = max(1, min(chunk_size, 1000))
+    
+    def generate():
+        for result in order_service.ingest(user_id, request.stream, chunk_size):
+            yield current_app.json.dumps(result) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @orders_bp.route('/<int:order_id>', methods=['GET'])
 @jwt_required()
 def get_order(order_id):
     user_id = int(get_jwt_identity())
     claims = get_jwt()
     
-    order = Order.query.get_or_404(order_id)
+    fields = Order.FIELDS.requested()
+    # user_id is always loaded for the access check
+    order = Order.query.options(
+        *Order.FIELDS.options(fields, Order.user_id)
+    ).get_or_404(order_id)
     
     if claims.get('role') != 'admin' and order.user_id != user_id:
         return jsonify({'error': 'Access denied'}), 403
     
-    return jsonify({'order': order.to_dict()})
+    return jsonify({'order': order_service.serialize_order(order, fields)})
 
 @orders_bp.route('/<int:order_id>/cancel', methods=['POST'])
 @jwt_required()
@@ -125,7 +132,7 @@ def cancel_order(order_id):
         order.cancel()
         return jsonify({
             'message': 'Order cancelled',
-            'order': order.to_dict()
+            'order': order_service.serialize_order(order)
         })
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
@@ -138,10 +145,50 @@ def confirm_order(order_id):
     if order.status != Order.STATUS_PENDING:
         return jsonify({'error': f'Cannot confirm order with status: {order.status}'}), 400
     
-    order.status = Order.STATUS_CONFIRMED
-    db.session.commit()
+    order.confirm()
     
     return jsonify({
         'message': 'Order confirmed',
-        'order': order.to_dict()
+        'order': order_service.serialize_order(order)
     })
+
+@orders_bp.route('/bulk-status', methods=['POST'])
+@admin_required
+def bulk_transition_orders():
+    """Apply confirm/cancel/ship to a list of order ids or to a filter.
+    
+    Body: {"action": ..., "order_ids": [...]} or
+    {"action": ..., "filter": {"status", "created_after", "created_before"}}.
+    """
+    data = request.get_json() or {}
+    action = data.get('action')
+    order_ids = data.get('order_ids')
+    filters = data.get('filter')
+    
+    if (order_ids is None) == (filters is None):
+        return jsonify({'error': 'Provide either order_ids or filter'}), 400
+    if order_ids is not None and (
+        not isinstance(order_ids, list)
+        or not all(isinstance(i, int) and not isinstance(i, bool) for i in order_ids)
+    ):
+        return jsonify({'error': 'order_ids must be a list of integers'}), 400
+    if filters is not None:
+        if not isinstance(filters, dict):
+            return jsonify({'error': 'filter must be an object'}), 400
+        filters = dict(filters)
+        for field in ('created_after', 'created_before'):
+            if filters.get(field):
+                try:
+                    filters[field] = datetime.fromisoformat(filters[field])
+                except (TypeError, ValueError):
+                    return jsonify({'error': f'Invalid {field}'}), 400
+    
+    try:
+        result = order_service.bulk_transition(
+            action, order_ids=order_ids, filters=filters,
+            batch_size=current_app.config['BULK_STATUS_BATCH_SIZE']
+        )
+    except OrderError as e:
+        return jsonify(e.to_dict()), e.status_code
+    
+    return jsonify(result)
@@ -1,7 +1,10 @@
-from flask import Blueprint, request, jsonify, Response
+from flask import (Blueprint, Response, current_app, request, jsonify, send_from_directory,
+                   stream_with_context, url_for)
+from flask_jwt_extended import get_jwt_identity
 from app.utils.decorators import manager_required
-from app.services.report_service import report_service
-from app.models import Order, Product
+from app.models import ReportJob
+from app.services.report_jobs import report_jobs
+from app.services.report_service import parse_end, report_service
 from datetime import datetime
 
 reports_bp = Blueprint('reports', __name__, url_prefix='/api/v1/reports')
@@ -16,7 +19,7 @@ def sales_report():
     if start:
         start = datetime.fromisoformat(start)
     if end:
-        end = datetime.fromisoformat(end)
+        end = parse_end(end)
     
     summary = report_service.get_sales_summary(start, end)
     return jsonify(summary)
@@ -24,8 +27,11 @@ def sales_report():
 @reports_bp.route('/inventory', methods=['GET'])
 @manager_required
 def inventory_report():
-    """Get inventory status."""
-    report = report_service.get_inventory_report()
+    """Get inventory status with a page of low-stock items."""
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = max(min(request.args.get('per_page', 50, type=int), 100), 1)
+    
+    report = report_service.get_inventory_report(page, per_page)
     return jsonify(report)
 
 @reports_bp.route('/top-products', methods=['GET'])
@@ -41,18 +47,21 @@ def top_products():
 @reports_bp.route('/export/orders', methods=['GET'])
 @manager_required
 def export_orders():
-    """Export orders to CSV."""
+    """Stream orders as CSV (?status=, ?start=, ?end= ISO dates; end is inclusive)."""
     status = request.args.get('status')
+    try:
+        start = request.args.get('start')
+        start = datetime.fromisoformat(start) if start else None
+        end = request.args.get('end')
+        end = parse_end(end) if end else None
+    except ValueError:
+        return jsonify({'error': 'start and end must be ISO dates'}), 400
     
-    query = Order.query
-    if status:
-        query = query.filter_by(status=status)
-    
-    orders = query.order_by(Order.created_at.desc()).all()
-    csv_data = report_service.export_orders_csv(orders)
-    
+    chunks = report_service.export_orders_csv(
+        status, start, end, current_app.config['REPORT_EXPORT_CHUNK_SIZE']
+    )
     return Response(
-        csv_data,
+        stream_with_context(chunks),
         mimetype='text/csv',
         headers={
             'Content-Disposition': f'attachment; filename=orders_{datetime.now().date()}.csv'
@@ -62,14 +71,58 @@ def export_orders():
 @reports_bp.route('/export/inventory', methods=['GET'])
 @manager_required
 def export_inventory():
-    """Export inventory to CSV."""
-    products = Product.query.all()
-    csv_data = report_service.export_inventory_csv(products)
-    
+    """Stream inventory as CSV."""
+    chunks = report_service.export_inventory_csv(
+        current_app.config['REPORT_EXPORT_CHUNK_SIZE']
+    )
     return Response(
-        csv_data,
+        stream_with_context(chunks),
         mimetype='text/csv',
         headers={
             'Content-Disposition': f'attachment; filename=inventory_{datetime.now().date()}.csv'
         }
     )
+
+def _job_dict(job):
+    data = job.to_dict()
+    data['status_url'] = url_for('reports.report_job_status', job_id=job.id)
+    if job.status == 'done':
+        data['download_url'] = url_for('reports.download_report', job_id=job.id)
+    return data
+
+@reports_bp.route('/jobs', methods=['POST'])
+@manager_required
+def create_report_job():
+    """Queue a report ({"kind": ..., "params": {...}}) for the report worker.
+    
+    Returns 202 for a new job, or 200 with the job already pending or
+    running for the same kind and parameters.
+    """
+    data = request.get_json() or {}
+    try:
+        job, created = report_jobs.submit(
+            data.get('kind'), data.get('params'), int(get_jwt_identity())
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({'job': _job_dict(job)}), 202 if created else 200
+
+@reports_bp.route('/jobs/<int:job_id>', methods=['GET'])
+@manager_required
+def report_job_status(job_id):
+    job = ReportJob.query.get_or_404(job_id)
+    return jsonify({'job': _job_dict(job)})
+
+@reports_bp.route('/jobs/<int:job_id>/download', methods=['GET'])
+@manager_required
+def download_report(job_id):
+    job = ReportJob.query.get_or_404(job_id)
+    if job.status != 'done':
+        return jsonify({'error': 'Report is not ready', 'status': job.status}), 409
+    
+    extension = report_jobs.KINDS[job.kind][0]
+    return send_from_directory(
+        report_jobs.storage_dir(), job.file_name, as_attachment=True,
+        download_name=f'{job.kind}_{job.finished_at.date()}.{extension}'
+    )
@@ -3,8 +3,9 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy import func
 from app import db
-from app.models import Review, Product
+from app.models import Review, Product, TableVersion
 from app.routes.auth import admin_required
+from app.utils.caching import etag_for, not_modified, with_etag
 
 reviews_bp = Blueprint('reviews', __name__, url_prefix='/api/v1/reviews')
 
@@ -18,6 +19,11 @@ def get_product_reviews(product_id):
     # Check if product exists
     product = Product.query.get_or_404(product_id)
     
+    etag = etag_for('reviews', TableVersion.current('reviews'), product_id, page, per_page)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
     # Get reviews
     reviews = Review.query.filter_by(
         product_id=product_id,
@@ -44,7 +50,7 @@ def get_product_reviews(product_id):
     for rating, count in rating_counts:
         distribution[str(rating)] = count
     
-    return jsonify({
+    return with_etag(jsonify({
         'reviews': [r.to_dict() for r in reviews.items],
         'pagination': {
             'page': page,
@@ -57,7 +63,7 @@ def get_product_reviews(product_id):
             'total_reviews': reviews.total,
             'distribution': distribution
         }
-    })
+    }), etag)
 
 
 @reviews_bp.route('', methods=['POST'])
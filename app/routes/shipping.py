@@ -2,8 +2,9 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from app import db
-from app.models import ShippingRate, Product
+from app.models import ShippingRate, Product, TableVersion
 from app.routes.auth import admin_required
+from app.utils.caching import etag_for, not_modified, with_etag
 
 shipping_bp = Blueprint('shipping', __name__, url_prefix='/api/v1/shipping')
 
@@ -49,8 +50,13 @@ def calculate_shipping():
 @shipping_bp.route('/rates', methods=['GET'])
 def list_rates():
     """Get all active shipping rates."""
+    etag = etag_for('shipping_rates', TableVersion.current('shipping_rates'))
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
     rates = ShippingRate.query.filter_by(is_active=True).all()
-    return jsonify({'rates': [r.to_dict() for r in rates]})
+    return with_etag(jsonify({'rates': [r.to_dict() for r in rates]}), etag)
 
 
 @shipping_bp.route('/rates', methods=['POST'])
@@ -0,0 +1,171 @@
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import namedtuple
+from datetime import timedelta
+from flask import current_app
+from sqlalchemy import or_
+from app import db
+from app.models import Product, StockShard
+
+CatalogEntry = namedtuple('CatalogEntry', 'id sort_key category version json')
+
+
+class CatalogSnapshot:
+    """In-memory view of the active catalog, sorted by name.
+    
+    ``entries`` holds every active product in (name, id) order; each entry
+    carries the product's pre-serialized JSON. Built once in full, then
+    patched in place by ``apply`` under the catalog lock. Each patch step
+    is a single list or dict operation, so concurrent readers see every
+    entry either before or after its change.
+    """
+    
+    def __init__(self, by_id):
+        self.by_id = by_id
+        self.entries = sorted(by_id.values(), key=_sort_key)
+        self.by_category = {}
+        for entry in self.entries:
+            self.by_category.setdefault(entry.category, []).append(entry)
+    
+    def apply(self, changed, removed):
+        """Patch in the ``changed`` {id: entry} and drop the ``removed`` ids.
+        
+        Only the affected positions of ``entries`` and of the touched
+        category lists are located (by bisection) and rewritten.
+        """
+        for product_id in removed:
+            old = self.by_id.pop(product_id, None)
+            if old is not None:
+                self._remove(old)
+        for product_id, entry in changed.items():
+            old = self.by_id.get(product_id)
+            if old is not None and old.sort_key == entry.sort_key and old.category == entry.category:
+                # Same place (e.g. a stock change): swap the entry where it is
+                self.entries[_position(self.entries, old)] = entry
+                bucket = self.by_category[old.category]
+                bucket[_position(bucket, old)] = entry
+            else:
+                if old is not None:
+                    self._remove(old)
+                insort(self.entries, entry, key=_sort_key)
+                insort(self.by_category.setdefault(entry.category, []), entry, key=_sort_key)
+            self.by_id[product_id] = entry
+    
+    def _remove(self, entry):
+        del self.entries[_position(self.entries, entry)]
+        bucket = self.by_category[entry.category]
+        del bucket[_position(bucket, entry)]
+        if not bucket:
+            del self.by_category[entry.category]
+
+
+def _sort_key(entry):
+    return entry.sort_key
+
+
+def _position(entries, entry):
+    """Index of ``entry`` in the sorted ``entries`` (sort keys are unique)."""
+    return bisect_left(entries, entry.sort_key, key=_sort_key)
+
+
+class _CatalogState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.snapshot = None
+        self.watermark = None
+        self.checked_at = float('-inf')
+
+
+class ProductCatalog:
+    """Per-worker, incrementally refreshed snapshot of active products.
+    
+    The first read loads the whole active catalog. After that, at most
+    once every CATALOG_REFRESH_SECONDS, one query fetches only products
+    whose ``updated_at`` (or reservation shards) moved past the newest
+    value already seen; all other reads are served from memory without
+    touching the database.
+    """
+    
+    # Re-read rows this far behind the watermark so a transaction that
+    # committed late, or a worker with a slightly slow clock, is not missed.
+    OVERLAP = timedelta(seconds=5)
+    
+    def _state(self):
+        return current_app.extensions.setdefault('catalog', _CatalogState())
+    
+    def _entry(self, product):
+        return CatalogEntry(
+            id=product.id,
+            sort_key=(product.name, product.id),
+            category=product.category,
+            version=product.version,
+            json=current_app.json.dumps(product.to_dict())
+        )
+    
+    def _fetch(self, since=None):
+        query = db.select(Product).execution_options(populate_existing=True)
+        if since is None:
+            query = query.where(Product.is_active.is_(True))
+        else:
+            cutoff = since - self.OVERLAP
+            # Sharded reservations change availability without touching
+            # the product row
+            sharded = db.select(StockShard.product_id).where(StockShard.updated_at >= cutoff)
+            query = query.where(or_(Product.updated_at >= cutoff, Product.id.in_(sharded)))
+        return db.session.execute(query).scalars().all()
+    
+    def _refresh(self, state):
+        products = self._fetch(state.watermark)
+        stamps = [stamp for stamp in (p.version for p in products) if stamp]
+        if state.watermark is not None:
+            stamps.append(state.watermark)
+        
+        if state.snapshot is None or state.watermark is None:
+            # Full load (also when no product has an updated_at yet)
+            snapshot = CatalogSnapshot({p.id: self._entry(p) for p in products})
+        else:
+            snapshot = state.snapshot
+            snapshot.apply(
+                {p.id: self._entry(p) for p in products if p.is_active},
+                [p.id for p in products if not p.is_active]
+            )
+        
+        state.snapshot = snapshot
+        state.watermark = max(stamps) if stamps else None
+        state.checked_at = time.monotonic()
+    
+    def snapshot(self):
+        """Return the current snapshot, refreshing it first if it is due."""
+        state = self._state()
+        interval = current_app.config['CATALOG_REFRESH_SECONDS']
+        due = time.monotonic() - state.checked_at >= interval
+        if state.snapshot is None or due:
+            # Only one thread refreshes; the others keep reading the
+            # snapshot while it is patched, unless there is none yet.
+            if state.lock.acquire(blocking=state.snapshot is None):
+                try:
+                    if state.snapshot is None or time.monotonic() - state.checked_at >= interval:
+                        self._refresh(state)
+                finally:
+                    state.lock.release()
+        return state.snapshot
+    
+    def mark_stale(self):
+        """Make this worker's next read poll for changes (call after writes)."""
+        self._state().checked_at = float('-inf')
+    
+    def page(self, page, per_page, category=None):
+        """Return (entries, total) for one page of the name-ordered catalog."""
+        snapshot = self.snapshot()
+        entries = snapshot.by_category.get(category, []) if category else snapshot.entries
+        start = (page - 1) * per_page
+        return entries[start:start + per_page], len(entries)
+    
+    def get(self, product_id):
+        """Return the CatalogEntry of an active product, or None."""
+        return self.snapshot().by_id.get(product_id)
+
+
+# Global instance
+catalog = ProductCatalog()
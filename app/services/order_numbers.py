@@ -0,0 +1,123 @@
+import hashlib
+import os
+import secrets
+import string
+import threading
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import OrderNumberSequence
+
+ALPHABET = string.digits + string.ascii_uppercase
+
+
+class OrderNumberAllocator:
+    """Allocate order numbers from per-process blocks of a DB counter.
+    
+    Each process claims a block of ORDER_NUMBER_BLOCK_SIZE values with one
+    UPDATE on the counter row, in its own short transaction, and then
+    hands numbers out from memory. Blocks never overlap, so no uniqueness
+    probe or retry is needed when creating an order.
+    
+    Counter values go through a keyed 4-round Feistel permutation over 36
+    bits before being written in base 36 (ORD-XXXXXXX), which keeps the
+    numbers short and non-sequential while staying collision-free.
+    """
+    
+    PREFIX = 'ORD'
+    BITS = 36
+    ROUNDS = 4
+    WIDTH = 7  # 36 ** 7 > 2 ** 36
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+    
+    def _reset(self):
+        self._pid = os.getpid()
+        self._next = self._end = 0
+        self._key = None
+    
+    def _claim_block(self, size):
+        """Claim [start, start + size) from the counter row."""
+        table = OrderNumberSequence.__table__
+        for _ in range(2):
+            try:
+                with db.engine.begin() as conn:
+                    row = conn.execute(
+                        table.update().where(table.c.id == 1).values(
+                            next_value=table.c.next_value + size
+                        ).returning(table.c.next_value, table.c.key)
+                    ).first()
+                    if row is None:
+                        key = secrets.token_hex(16)
+                        conn.execute(table.insert().values(id=1, next_value=size, key=key))
+                        return 0, key
+                    return row.next_value - size, row.key
+            except IntegrityError:
+                # Another process created the counter row first
+                continue
+        raise RuntimeError('Could not initialise order number sequence')
+    
+    def take(self, count):
+        """Return ``count`` new order numbers."""
+        values = []
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked worker: never reuse the parent's block
+                self._reset()
+            while len(values) < count:
+                if self._next >= self._end:
+                    size = max(current_app.config['ORDER_NUMBER_BLOCK_SIZE'], count - len(values))
+                    self._next, self._key = self._claim_block(size)
+                    self._end = self._next + size
+                n = min(count - len(values), self._end - self._next)
+                values.extend(range(self._next, self._next + n))
+                self._next += n
+            key = self._key
+        return [self.format(value, key) for value in values]
+    
+    def next(self):
+        return self.take(1)[0]
+    
+    def _round(self, key, i, half):
+        digest = hashlib.blake2b(
+            half.to_bytes(3, 'big'), key=key.encode('ascii'),
+            salt=i.to_bytes(16, 'big'), digest_size=3
+        ).digest()
+        return int.from_bytes(digest, 'big') & ((1 << self.BITS // 2) - 1)
+    
+    def permute(self, value, key, inverse=False):
+        """Keyed bijection on [0, 2**36)."""
+        if not 0 <= value < 1 << self.BITS:
+            raise ValueError('Order number sequence exhausted')
+        half = self.BITS // 2
+        mask = (1 << half) - 1
+        left, right = value >> half, value & mask
+        rounds = range(self.ROUNDS)
+        if inverse:
+            left, right = right, left
+            rounds = reversed(rounds)
+        for i in rounds:
+            left, right = right, left ^ self._round(key, i, right)
+        if inverse:
+            left, right = right, left
+        return (left << half) | right
+    
+    def format(self, value, key):
+        n = self.permute(value, key)
+        digits = []
+        for _ in range(self.WIDTH):
+            n, r = divmod(n, 36)
+            digits.append(ALPHABET[r])
+        return f"{self.PREFIX}-{''.join(reversed(digits))}"
+    
+    def parse(self, order_number, key):
+        """Recover the counter value behind an order number."""
+        prefix, _, body = order_number.partition('-')
+        if prefix != self.PREFIX or len(body) != self.WIDTH:
+            raise ValueError(f'Not an allocated order number: {order_number}')
+        return self.permute(int(body, 36), key, inverse=True)
+
+# Global instance
+order_numbers = OrderNumberAllocator()
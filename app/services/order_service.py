@@ -0,0 +1,314 @@
+import json
+from datetime import datetime
+from sqlalchemy import insert, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import joinedload
+from app import db
+from app.models import Order, OrderItem, Product
+from app.services.order_numbers import order_numbers
+
+
+class OrderError(ValueError):
+    """Order request rejected before anything was written."""
+
+    def __init__(self, message, status_code=400, **details):
+        super().__init__(message)
+        self.status_code = status_code
+        self.details = details
+
+    def to_dict(self):
+        return {'error': str(self), **self.details}
+
+
+class OrderService:
+    """Create orders in a single round trip and a single commit."""
+
+    # action -> (new status, timestamp column,
+    #            {status it applies to: set-based stock update for its lines})
+    TRANSITIONS = {
+        'confirm': (Order.STATUS_CONFIRMED, 'confirmed_at',
+                    {Order.STATUS_PENDING: Product.confirm_many}),
+        'cancel': (Order.STATUS_CANCELLED, 'cancelled_at',
+                   Order.CANCEL_STOCK_UPDATES),
+        'ship': (Order.STATUS_SHIPPED, 'shipped_at', {Order.STATUS_CONFIRMED: None}),
+    }
+    
+    def _merge_lines(self, items_data):
+        """Validate line items and merge quantities per product."""
+        if not items_data:
+            raise OrderError('Order must contain items')
+        if not isinstance(items_data, list):
+            raise OrderError('items must be a list')
+
+        quantities = {}
+        for item in items_data:
+            if not isinstance(item, dict):
+                raise OrderError('Each item must be an object')
+            quantity = item.get('quantity', 0)
+            if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity <= 0:
+                raise OrderError('Quantity must be positive')
+            product_id = item.get('product_id')
+            if not isinstance(product_id, int) or isinstance(product_id, bool):
+                raise OrderError('product_id must be an integer')
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+        return quantities
+
+    def _load_products(self, product_ids):
+        """Load all ordered products with one select, in primary-key order."""
+        return Product.query.filter(
+            Product.id.in_(product_ids)
+        ).order_by(Product.id).all()
+
+    def _insufficient(self, products, quantities, failed_ids):
+        failed = [p for p in products if p.id in failed_ids]
+        first = failed[0]
+        return OrderError(
+            f'Insufficient stock for {first.name}',
+            available=first.available_stock,
+            failed=[{
+                'product_id': p.id,
+                'requested': quantities[p.id],
+                'available': p.available_stock
+            } for p in failed]
+        )
+
+    def create_order(self, user_id, items_data, commit=True, order_number=None):
+        """Reserve stock for every line and persist the order.
+
+        Raises OrderError if any line is invalid or cannot be reserved; in
+        that case nothing is reserved. With ``commit=False`` the caller owns
+        the transaction and can keep creating orders in it.
+        """
+        quantities = self._merge_lines(items_data)
+        # Allocate before writing anything: a new block is claimed on a
+        # separate connection, which must not wait on our own locks.
+        if order_number is None:
+            order_number = Order.generate_order_number()
+        products = self._load_products(list(quantities))
+
+        try:
+            found = {p.id for p in products}
+            for product_id in quantities:
+                if product_id not in found:
+                    raise OrderError(f"Product {product_id} not found", 404)
+
+            short = {p.id for p in products if quantities[p.id] > p.available_stock}
+            if short:
+                raise self._insufficient(products, quantities, short)
+
+            # The stock check is repeated inside the UPDATE, so a concurrent
+            # order that got there first is caught here without row locks.
+            shards = {p.id: p.reservation_shards for p in products if p.reservation_shards}
+            failed = set(Product.reserve_many(quantities, shards))
+            if failed:
+                # Undo the lines that did get reserved so a caller batching
+                # several orders in one transaction keeps the others intact.
+                Product.release_many({
+                    pid: qty for pid, qty in quantities.items() if pid not in failed
+                })
+                for product in products:
+                    if product.id in failed:
+                        db.session.expire(product)
+                raise self._insufficient(products, quantities, failed)
+        except OrderError:
+            if commit:
+                db.session.rollback()
+            raise
+
+        order = Order(
+            order_number=order_number,
+            user_id=user_id
+        )
+        db.session.add(order)
+
+        lines = []
+        for product in products:
+            quantity = quantities[product.id]
+            lines.append(OrderItem(
+                product_id=product.id,
+                quantity=quantity,
+                unit_price=product.price
+            ))
+        order.calculate_totals(items=lines, commit=False)
+
+        # One INSERT for the order, then every line in a single
+        # executemany (no per-row RETURNING).
+        db.session.flush()
+        db.session.execute(insert(OrderItem), [{
+            'order_id': order.id,
+            'product_id': line.product_id,
+            'quantity': line.quantity,
+            'unit_price': line.unit_price
+        } for line in lines])
+
+        if commit:
+            db.session.commit()
+        return order
+
+    def _transition_batch(self, action, order_ids, now):
+        """Apply ``action`` to eligible orders among ``order_ids``; one commit.
+        
+        Returns (transitioned_ids, units_moved).
+        """
+        new_status, timestamp, stock_updates = self.TRANSITIONS[action]
+        changed, units = [], 0
+        # One UPDATE per source status: the stock effect depends on it
+        for from_status, stock_update in stock_updates.items():
+            ids = db.session.execute(
+                update(Order).where(
+                    Order.id.in_(order_ids),
+                    Order.status == from_status
+                ).values(
+                    {'status': new_status, timestamp: now}
+                ).returning(Order.id).execution_options(synchronize_session='fetch')
+            ).scalars().all()
+            changed.extend(ids)
+            if stock_update and ids:
+                quantities = OrderItem.quantities_by_product(ids)
+                stock_update(quantities)
+                units += sum(quantities.values())
+        db.session.commit()
+        return changed, units
+    
+    def bulk_transition(self, action, order_ids=None, filters=None, batch_size=500):
+        """Apply ``action`` to many orders, one transaction per batch.
+        
+        Targets either explicit ``order_ids`` or every order matching
+        ``filters`` (status, created_after, created_before). Orders whose
+        status does not allow the action are skipped.
+        """
+        if action not in self.TRANSITIONS:
+            raise OrderError(f'Unknown action: {action}')
+        from_statuses = list(self.TRANSITIONS[action][2])
+        now = datetime.utcnow()
+        result = {'action': action, 'updated': 0, 'units': 0}
+        
+        if order_ids is not None:
+            wanted = list(dict.fromkeys(order_ids))
+            changed = set()
+            for start in range(0, len(wanted), batch_size):
+                ids, units = self._transition_batch(action, wanted[start:start + batch_size], now)
+                changed.update(ids)
+                result['units'] += units
+            result['updated'] = len(changed)
+            result['skipped'] = [oid for oid in wanted if oid not in changed]
+            return result
+        
+        query = db.select(Order.id).where(Order.status.in_(from_statuses))
+        filters = filters or {}
+        if filters.get('status'):
+            query = query.where(Order.status == filters['status'])
+        if filters.get('created_after'):
+            query = query.where(Order.created_at >= filters['created_after'])
+        if filters.get('created_before'):
+            query = query.where(Order.created_at < filters['created_before'])
+        
+        last_id = 0
+        while True:
+            ids = db.session.execute(
+                query.where(Order.id > last_id).order_by(Order.id).limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                break
+            changed, units = self._transition_batch(action, ids, now)
+            result['updated'] += len(changed)
+            result['units'] += units
+            last_id = ids[-1]
+        return result
+    
+    def load_items(self, orders):
+        """Load the lines of all ``orders`` with their product names.
+        
+        One query regardless of how many orders are passed; returns
+        {order_id: [OrderItem, ...]}.
+        """
+        items = {order.id: [] for order in orders}
+        if items:
+            rows = OrderItem.query.options(
+                joinedload(OrderItem.product).load_only(Product.name)
+            ).filter(
+                OrderItem.order_id.in_(items)
+            ).order_by(OrderItem.id)
+            for item in rows:
+                items[item.order_id].append(item)
+        return items
+    
+    def serialize_orders(self, orders, fields=None):
+        """Serialize orders in a constant number of queries.
+        
+        ``fields`` limits the keys; the lines are only loaded if 'items'
+        is among them.
+        """
+        orders = list(orders)
+        if fields is None or 'items' in fields:
+            items = self.load_items(orders)
+        else:
+            items = {order.id: () for order in orders}
+        return [order.to_dict(items=items[order.id], fields=fields) for order in orders]
+    
+    def serialize_order(self, order, fields=None):
+        return self.serialize_orders([order], fields)[0]
+    
+    def ingest(self, user_id, lines, chunk_size):
+        """Create orders from NDJSON lines, one transaction per chunk.
+
+        ``lines`` may be any iterable (e.g. the request stream); only one
+        chunk is held at a time. Yields one result dict per order, after
+        the chunk containing it has been committed.
+        """
+        chunk = []
+        for line_no, raw in enumerate(lines, start=1):
+            raw = raw.strip()
+            if not raw:
+                continue
+            chunk.append((line_no, raw))
+            if len(chunk) >= chunk_size:
+                yield from self._ingest_chunk(user_id, chunk)
+                chunk = []
+        if chunk:
+            yield from self._ingest_chunk(user_id, chunk)
+
+    def _ingest_chunk(self, user_id, chunk):
+        results = []
+        numbers = order_numbers.take(len(chunk))
+        try:
+            for (line_no, raw), order_number in zip(chunk, numbers):
+                result = {'line': line_no}
+                try:
+                    payload = json.loads(raw)
+                    if not isinstance(payload, dict):
+                        raise OrderError('Each line must be a JSON object')
+                    if 'reference' in payload:
+                        result['reference'] = payload['reference']
+                    order = self.create_order(
+                        user_id, payload.get('items', []),
+                        commit=False, order_number=order_number
+                    )
+                except OrderError as e:
+                    result.update(status=e.status_code, **e.to_dict())
+                except json.JSONDecodeError:
+                    result.update(status=400, error='Invalid JSON')
+                else:
+                    result.update(status=201, order={
+                        'id': order.id,
+                        'order_number': order.order_number,
+                        'total_amount': float(order.total_amount)
+                    })
+                results.append(result)
+            db.session.commit()
+        except SQLAlchemyError:
+            db.session.rollback()
+            for result in results:
+                if result['status'] == 201:
+                    del result['order']
+                    result.update(status=500, error='Chunk failed, order not created')
+            # The failing line and the rest of the chunk were never processed
+            results.extend(
+                {'line': line_no, 'status': 500, 'error': 'Chunk failed, order not created'}
+                for line_no, raw in chunk[len(results):]
+            )
+        return results
+
+
+# Global instance
+order_service = OrderService()
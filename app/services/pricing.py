@@ -0,0 +1,50 @@
+"""Order pricing in integer cents.
+
+All arithmetic runs on ints; values are converted from Decimal/str on the
+way in and back to 2-place Decimals on the way out, so totals are exact
+and never pass through float.
+"""
+from collections import namedtuple
+from decimal import Decimal, ROUND_HALF_UP
+
+TAX_RATE = Decimal('0.19')
+CENT = Decimal('0.01')
+
+OrderTotals = namedtuple('OrderTotals', 'subtotal tax_amount shipping_cost discount_amount total_amount')
+
+
+def to_cents(value):
+    """Convert a money value to integer cents, rounding half up."""
+    if value is None:
+        return 0
+    if not isinstance(value, Decimal):
+        # str() keeps floats like 9.99 from turning into 9.9900000000000002
+        value = Decimal(str(value))
+    return int(value.quantize(CENT, rounding=ROUND_HALF_UP).scaleb(2))
+
+
+def from_cents(cents):
+    return Decimal(cents).scaleb(-2)
+
+
+def line_cents(unit_price, quantity, discount=None):
+    """Price of one order line in cents."""
+    return to_cents(unit_price) * quantity - to_cents(discount)
+
+
+def tax_cents(subtotal_cents, rate=TAX_RATE):
+    return int((Decimal(subtotal_cents) * rate).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def price_order(items, shipping_cost=None, discount_amount=None, tax_rate=TAX_RATE):
+    """Price ``items`` (objects with unit_price, quantity, discount).
+
+    Returns OrderTotals of Decimals with two places.
+    """
+    subtotal = sum(line_cents(i.unit_price, i.quantity, i.discount) for i in items)
+    tax = tax_cents(subtotal, tax_rate)
+    shipping = to_cents(shipping_cost)
+    discount = to_cents(discount_amount)
+    return OrderTotals(*map(from_cents, (
+        subtotal, tax, shipping, discount, subtotal + tax + shipping - discount
+    )))
@@ -0,0 +1,148 @@
+import csv
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+from app.models import Product
+
+# Same header as ReportService.export_inventory_csv; Reserved, Available
+# and Value are derived there and ignored here.
+REQUIRED_COLUMNS = ('SKU', 'Name', 'Price', 'Stock')
+
+# Largest values products.price (Numeric(10, 2)) and products.stock hold
+MAX_PRICE = Decimal('99999999.99')
+MAX_STOCK = 2 ** 31 - 1
+
+MAX_REPORTED_ERRORS = 100
+
+
+class ProductImporter:
+    """Upsert products by SKU from a CSV stream, one statement per batch."""
+    
+    DIALECTS = {'sqlite': sqlite, 'postgresql': postgresql}
+    
+    def _parse(self, row):
+        """Validate one CSV row; returns column values or raises ValueError."""
+        sku = (row.get('SKU') or '').strip()
+        name = (row.get('Name') or '').strip()
+        category = (row.get('Category') or '').strip() or None
+        if not sku or len(sku) > 50:
+            raise ValueError('SKU must be 1-50 characters')
+        if not name or len(name) > 200:
+            raise ValueError('Name must be 1-200 characters')
+        if category and len(category) > 100:
+            raise ValueError('Category must be at most 100 characters')
+        try:
+            price = Decimal((row.get('Price') or '').strip())
+            stock = int((row.get('Stock') or '').strip())
+        except (InvalidOperation, ValueError):
+            raise ValueError('Price must be a number and Stock an integer')
+        if not price.is_finite() or price < 0 or stock < 0:
+            raise ValueError('Price and Stock must not be negative')
+        # Compared before quantize(), which fails on huge values
+        if price > MAX_PRICE or price.quantize(Decimal('0.01')) > MAX_PRICE or stock > MAX_STOCK:
+            raise ValueError(f'Price must be at most {MAX_PRICE} and Stock at most {MAX_STOCK}')
+        values = {
+            'sku': sku,
+            'name': name,
+            'price': price.quantize(Decimal('0.01')),
+            'stock': stock,
+        }
+        # Category is optional: a file without the column leaves it alone
+        if 'Category' in row:
+            values['category'] = category
+        return values
+    
+    def _upsert(self, batch, result):
+        """Write one batch with a single INSERT ... ON CONFLICT and commit."""
+        dialect = self.DIALECTS[db.session.get_bind().dialect.name]
+        skus = [values['sku'] for _, values in batch]
+        existing = set(db.session.execute(
+            db.select(Product.sku).where(Product.sku.in_(skus))
+        ).scalars())
+        
+        now = datetime.utcnow()
+        stmt = dialect.insert(Product).values([
+            {**values, 'created_at': now, 'updated_at': now} for _, values in batch
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Product.sku],
+            # Every row in a batch has the same keys (the file's columns)
+            set_={
+                **{key: stmt.excluded[key] for key in batch[0][1] if key != 'sku'},
+                'updated_at': now,
+            },
+            # Never set stock below what pending orders already hold
+            where=Product.reserved_stock <= stmt.excluded.stock
+        ).returning(Product.sku)
+        written = set(db.session.execute(stmt).scalars())
+        db.session.commit()
+        
+        for line_no, values in batch:
+            if values['sku'] not in written:
+                self._reject(result, line_no, values['sku'], 'Stock below reserved quantity')
+            elif values['sku'] in existing:
+                result['updated'] += 1
+            else:
+                result['inserted'] += 1
+    
+    def _reject(self, result, line_no, sku, error):
+        result['rejected'] += 1
+        if len(result['errors']) < MAX_REPORTED_ERRORS:
+            result['errors'].append({'line': line_no, 'sku': sku, 'error': error})
+    
+    def import_csv(self, lines, batch_size=500):
+        """Upsert the products in CSV ``lines`` (any iterable of text lines).
+        
+        Only one batch is held in memory. Returns counts of inserted,
+        updated and rejected rows plus the first rejected rows' errors.
+        If the stream turns out not to be UTF-8 or not to be valid CSV
+        part way through, the rows before that point are still written and
+        the result gets a ``stopped`` entry with the first line not read.
+        Raises ValueError if the header is unreadable or lacks a required
+        column; nothing is written then.
+        """
+        if db.session.get_bind().dialect.name not in self.DIALECTS:
+            raise ValueError('Bulk import needs SQLite or PostgreSQL')
+        # strict: a stray or unterminated quote is an error, not a field
+        # that silently swallows the rest of the file
+        reader = csv.DictReader(lines, strict=True)
+        try:
+            fieldnames = reader.fieldnames or []
+        except csv.Error as e:
+            raise ValueError(f'Malformed CSV: {e}')
+        missing = [c for c in REQUIRED_COLUMNS if c not in fieldnames]
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(missing)}")
+        
+        result = {'inserted': 0, 'updated': 0, 'rejected': 0, 'errors': []}
+        batch, batch_skus = [], set()
+        line_no = reader.line_num
+        try:
+            for row in reader:
+                line_no = reader.line_num
+                try:
+                    values = self._parse(row)
+                except ValueError as e:
+                    self._reject(result, line_no, row.get('SKU'), str(e))
+                    continue
+                if values['sku'] in batch_skus:
+                    # One statement cannot touch the same row twice; later rows win
+                    self._upsert(batch, result)
+                    batch, batch_skus = [], set()
+                batch.append((line_no, values))
+                batch_skus.add(values['sku'])
+                if len(batch) >= batch_size:
+                    self._upsert(batch, result)
+                    batch, batch_skus = [], set()
+        except UnicodeDecodeError:
+            result['stopped'] = {'line': line_no + 1, 'error': 'CSV must be UTF-8'}
+        except csv.Error as e:
+            result['stopped'] = {'line': line_no + 1, 'error': f'Malformed CSV: {e}'}
+        if batch:
+            self._upsert(batch, result)
+        return result
+
+
+# Global instance
+product_importer = ProductImporter()
@@ -0,0 +1,249 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import and_, or_, update
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import ReportJob
+from app.models.report_job import ACTIVE_STATUSES
+from app.services.report_service import (
+    COLUMNAR_DATASETS, COLUMNAR_FORMATS, pa, parse_end, report_service
+)
+
+
+class _Superseded(Exception):
+    """Another worker took over the job (this one stopped heartbeating)."""
+
+
+class ReportJobService:
+    """Queue reports in ``report_jobs`` and build them into files.
+    
+    Requests are stored with normalized parameters; `flask
+    run-report-jobs` claims them oldest first and writes the result to
+    REPORT_STORAGE_DIR, reporting progress as it goes.
+    """
+    
+    # kind -> (file extension, accepted parameters)
+    KINDS = {
+        'orders_csv': ('csv', ('status', 'start', 'end')),
+        'inventory_csv': ('csv', ()),
+        'sales_summary': ('json', ('start', 'end')),
+        # Columnar exports for analytics: <dataset>_<format>
+        **{
+            f'{dataset}_{fmt}': (fmt, ('status', 'start', 'end'))
+            for dataset in COLUMNAR_DATASETS for fmt in COLUMNAR_FORMATS
+        },
+    }
+    
+    def _normalize(self, kind, params):
+        """Return ``params`` with only known keys and canonical dates.
+        
+        Raises ValueError for an unknown kind or parameter, or a bad date.
+        """
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown report kind. Choose one of: {', '.join(sorted(self.KINDS))}")
+        if self.KINDS[kind][0] in COLUMNAR_FORMATS and pa is None:
+            raise ValueError(f'{kind} needs pyarrow installed on the server')
+        if not isinstance(params, dict):
+            raise ValueError('params must be an object')
+        accepted = self.KINDS[kind][1]
+        unknown = sorted(set(params) - set(accepted))
+        if unknown:
+            raise ValueError(f"Unknown parameters for {kind}: {', '.join(unknown)}")
+        
+        normalized = {}
+        for key in accepted:
+            value = params.get(key)
+            if value in (None, ''):
+                continue
+            if key in ('start', 'end'):
+                parse = parse_end if key == 'end' else datetime.fromisoformat
+                try:
+                    value = parse(value).isoformat()
+                except (TypeError, ValueError):
+                    raise ValueError(f'{key} must be an ISO date')
+            elif not isinstance(value, str):
+                raise ValueError(f'{key} must be a string')
+            normalized[key] = value
+        return normalized
+    
+    def _active(self, params_hash):
+        return ReportJob.query.filter(
+            ReportJob.params_hash == params_hash,
+            ReportJob.status.in_(ACTIVE_STATUSES)
+        ).first()
+    
+    def submit(self, kind, params, user_id):
+        """Queue a report; returns (job, created).
+        
+        If an identical request (same kind and normalized parameters) is
+        still pending or running, that job is returned instead.
+        """
+        params = json.dumps(self._normalize(kind, params or {}), sort_keys=True)
+        params_hash = hashlib.sha256(f'{kind}\n{params}'.encode('utf-8')).hexdigest()
+        
+        existing = self._active(params_hash)
+        if existing is not None:
+            return existing, False
+        
+        job = ReportJob(kind=kind, params=params, params_hash=params_hash, user_id=user_id)
+        db.session.add(job)
+        try:
+            db.session.commit()
+            return job, True
+        except IntegrityError:
+            # A concurrent request queued the same report first
+            db.session.rollback()
+            existing = self._active(params_hash)
+            if existing is None:
+                raise
+            return existing, False
+    
+    def storage_dir(self):
+        return os.path.abspath(current_app.config['REPORT_STORAGE_DIR'])
+    
+    def claim(self, now=None):
+        """Mark the oldest runnable job as running for this worker.
+        
+        Runnable means pending, or running without a heartbeat for
+        REPORT_JOB_STALE_SECONDS. Returns the job, or None. Commits.
+        """
+        now = now or datetime.utcnow()
+        stale = now - timedelta(seconds=current_app.config['REPORT_JOB_STALE_SECONDS'])
+        runnable = or_(
+            ReportJob.status == 'pending',
+            and_(ReportJob.status == 'running', ReportJob.heartbeat_at < stale)
+        )
+        candidates = db.session.execute(
+            db.select(ReportJob.id).where(runnable).order_by(ReportJob.id).limit(10)
+        ).scalars().all()
+        for job_id in candidates:
+            # The guard makes sure only one worker wins each job
+            claimed = db.session.execute(
+                update(ReportJob).where(ReportJob.id == job_id, runnable).values(
+                    status='running', started_at=now, heartbeat_at=now, progress=0
+                ).returning(ReportJob.id).execution_options(synchronize_session=False)
+            ).first()
+            db.session.commit()
+            if claimed is not None:
+                return db.session.get(ReportJob, job_id, populate_existing=True)
+        return None
+    
+    def _update(self, job, **values):
+        """Write ``values`` if this worker still owns ``job``; commits."""
+        owned = db.session.execute(
+            update(ReportJob).where(
+                ReportJob.id == job.id,
+                ReportJob.started_at == job.started_at
+            ).values(
+                heartbeat_at=datetime.utcnow(), **values
+            ).returning(ReportJob.id).execution_options(synchronize_session=False)
+        ).first()
+        db.session.commit()
+        if owned is None:
+            raise _Superseded()
+    
+    def _progress(self, job):
+        done = 0
+        
+        def on_chunk(rows):
+            nonlocal done
+            done += rows
+            self._update(job, progress=done)
+        return on_chunk
+    
+    def _order_filters(self, params):
+        """(status, start, end) arguments from normalized parameters."""
+        return (
+            params.get('status'),
+            datetime.fromisoformat(params['start']) if 'start' in params else None,
+            datetime.fromisoformat(params['end']) if 'end' in params else None
+        )
+    
+    def _write_text(self, path, chunks):
+        with open(path, 'w', encoding='utf-8', newline='') as out:
+            for chunk in chunks:
+                out.write(chunk)
+    
+    def _write_orders_csv(self, job, params, path):
+        filters = self._order_filters(params)
+        self._update(job, total=report_service.count_orders_export(*filters))
+        self._write_text(path, report_service.export_orders_csv(
+            *filters, current_app.config['REPORT_EXPORT_CHUNK_SIZE'], self._progress(job)
+        ))
+    
+    def _write_inventory_csv(self, job, params, path):
+        self._update(job, total=report_service.count_inventory_export())
+        self._write_text(path, report_service.export_inventory_csv(
+            current_app.config['REPORT_EXPORT_CHUNK_SIZE'], self._progress(job)
+        ))
+    
+    def _write_sales_summary(self, job, params, path):
+        # No chunks to report, so heartbeat around the aggregate queries
+        self._update(job)
+        summary = report_service.get_sales_summary(*self._order_filters(params)[1:])
+        self._update(job, total=summary['total_orders'], progress=summary['total_orders'])
+        self._write_text(path, [current_app.json.dumps(summary)])
+    
+    def _write_columnar(self, job, params, path):
+        dataset, fmt = job.kind.rsplit('_', 1)
+        filters = self._order_filters(params)
+        if dataset == 'orders':
+            self._update(job, total=report_service.count_orders_export(*filters))
+        report_service.export_columnar(
+            path, dataset, fmt, *filters,
+            batch_size=current_app.config['REPORT_COLUMNAR_BATCH_SIZE'],
+            on_chunk=self._progress(job)
+        )
+    
+    def run(self, job):
+        """Build ``job``'s file and record the outcome. Commits."""
+        extension = self.KINDS[job.kind][0]
+        file_name = f'report-{job.id}.{extension}'
+        directory = self.storage_dir()
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, file_name)
+        partial = f'{path}.{os.getpid()}.part'
+        
+        if extension in COLUMNAR_FORMATS:
+            write = self._write_columnar
+        else:
+            write = getattr(self, f'_write_{job.kind}')
+        
+        try:
+            write(job, json.loads(job.params), partial)
+            os.replace(partial, path)
+            self._update(job, status='done', file_name=file_name, finished_at=datetime.utcnow())
+        except _Superseded:
+            current_app.logger.warning(f'Report job {job.id} was taken over by another worker')
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.exception(f'Report job {job.id} failed')
+            try:
+                self._update(job, status='failed', error=str(e), finished_at=datetime.utcnow())
+            except _Superseded:
+                pass
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+    
+    def run_pending(self, limit=None):
+        """Claim and run jobs until none are left (or ``limit`` ran)."""
+        ran = 0
+        while limit is None or ran < limit:
+            job = self.claim()
+            if job is None:
+                break
+            self.run(job)
+            ran += 1
+        return ran
+    
+    def file_path(self, job):
+        """Absolute path of a finished job's file."""
+        return os.path.join(self.storage_dir(), job.file_name)
+
+
+# Global instance
+report_jobs = ReportJobService()
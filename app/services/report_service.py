@@ -1,10 +1,28 @@
 import csv
 import io
-from datetime import datetime, timedelta
-from sqlalchemy import func
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import func, tuple_
 from flask import current_app
 from app import db
-from app.models import Order, OrderItem, Product
+from app.models import Order, OrderItem, Product, User
+from app.models.product import STOCK_HEADROOM
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional, only the columnar exports need it
+    pa = pq = None
+
+COLUMNAR_DATASETS = ('orders', 'order_items')
+COLUMNAR_FORMATS = ('parquet', 'arrow')
+
+
+def parse_end(value):
+    """Parse an ISO ``end`` filter; a plain date includes that whole day."""
+    try:
+        return datetime.combine(date.fromisoformat(value), time.max)
+    except ValueError:
+        return datetime.fromisoformat(value)
 
 class ReportService:
     """Generate sales and inventory reports."""
@@ -40,21 +58,33 @@ class ReportService:
             'average_order_value': float(avg_order_value)
         }
     
-    def get_inventory_report(self):
-        """Get current inventory status."""
-        products = Product.query.all()
+    def get_inventory_report(self, page=1, per_page=50):
+        """Get current inventory status.
         
-        total_value = sum(
-            float(p.price) * p.stock for p in products
-        )
+        Totals are SQL aggregates; the low-stock items are paginated, most
+        depleted first.
+        """
+        total_products, total_value = db.session.execute(
+            db.select(
+                func.count(Product.id),
+                func.coalesce(func.sum(Product.price * Product.stock), 0)
+            )
+        ).one()
         
-        low_stock = [p.to_dict() for p in products if p.is_low_stock]
+        low_stock = Product.query.filter(Product.low_stock_condition()).order_by(
+            STOCK_HEADROOM, Product.id
+        ).paginate(page=page, per_page=per_page, error_out=False)
         
         return {
-            'total_products': len(products),
-            'total_inventory_value': total_value,
-            'low_stock_count': len(low_stock),
-            'low_stock_items': low_stock
+            'total_products': total_products,
+            'total_inventory_value': float(total_value),
+            'low_stock_count': low_stock.total,
+            'low_stock_items': [p.to_dict() for p in low_stock.items],
+            'pagination': {
+                'page': page,
+                'per_page': per_page,
+                'total': low_stock.total
+            }
         }
     
     def get_top_products(self, limit=10, days=30):
@@ -82,58 +112,218 @@ class ReportService:
             'revenue': float(r.revenue)
         } for r in results]
     
-    def export_orders_csv(self, orders):
-        """Export orders to CSV."""
+    def _keyset_chunks(self, query, columns, chunk_size, descending=False):
+        """Yield the rows of select ``query`` in lists of ``chunk_size``.
+        
+        Rows are ordered by ``columns`` (unique together, and selected by
+        ``query``); each chunk resumes after the last row of the previous
+        one, so no chunk costs more than the first and no rows are kept.
+        """
+        key = tuple_(*columns)
+        ordering = [c.desc() if descending else c.asc() for c in columns]
+        last = None
+        while True:
+            chunk = query
+            if last is not None:
+                chunk = chunk.where(key < tuple_(*last) if descending else key > tuple_(*last))
+            rows = db.session.execute(chunk.order_by(*ordering).limit(chunk_size)).all()
+            if rows:
+                yield rows
+            if len(rows) < chunk_size:
+                return
+            last = [rows[-1]._mapping[c] for c in columns]
+    
+    def _csv_chunks(self, header, row_chunks, format_row, on_chunk=None):
+        """Render CSV text one chunk at a time.
+        
+        ``on_chunk(rows)`` is called with each chunk's row count.
+        """
         output = io.StringIO()
         writer = csv.writer(output)
+        writer.writerow(header)
+        for rows in row_chunks:
+            writer.writerows(format_row(row) for row in rows)
+            if on_chunk is not None:
+                on_chunk(len(rows))
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+        if output.tell():
+            yield output.getvalue()
+    
+    def _filter_orders(self, query, status, start_date, end_date):
+        if status:
+            query = query.where(Order.status == status)
+        if start_date:
+            query = query.where(Order.created_at >= start_date)
+        if end_date:
+            query = query.where(Order.created_at <= end_date)
+        return query
+    
+    def count_orders_export(self, status=None, start_date=None, end_date=None):
+        """Number of rows export_orders_csv will write for these filters."""
+        query = self._filter_orders(db.select(func.count(Order.id)), status, start_date, end_date)
+        return db.session.execute(query).scalar()
+    
+    def export_orders_csv(self, status=None, start_date=None, end_date=None,
+                          chunk_size=1000, on_chunk=None):
+        """Export orders to CSV, newest first, as a generator of text chunks.
+        
+        Rows are read ``chunk_size`` at a time with the customer email
+        joined in, so memory does not grow with the number of orders.
+        """
+        query = self._filter_orders(db.select(
+            Order.order_number, Order.created_at, User.email, Order.status,
+            Order.subtotal, Order.tax_amount, Order.shipping_cost,
+            Order.discount_amount, Order.total_amount, Order.id
+        ).join(User, Order.user_id == User.id), status, start_date, end_date)
         
-        # Header
-        writer.writerow([
+        header = [
             'Order Number', 'Date', 'Customer', 'Status',
             'Subtotal', 'Tax', 'Shipping', 'Discount', 'Total'
-        ])
-        
-        # Data
-        for order in orders:
-            writer.writerow([
-                order.order_number,
-                order.created_at.isoformat(),
-                order.user.email,
-                order.status,
-                float(order.subtotal),
-                float(order.tax_amount),
-                float(order.shipping_cost),
-                float(order.discount_amount),
-                float(order.total_amount)
-            ])
-        
-        output.seek(0)
-        return output.getvalue()
+        ]
+        chunks = self._keyset_chunks(
+            query, [Order.created_at, Order.id], chunk_size, descending=True
+        )
+        return self._csv_chunks(header, chunks, lambda r: [
+            r.order_number,
+            r.created_at.isoformat(),
+            r.email,
+            r.status,
+            float(r.subtotal),
+            float(r.tax_amount),
+            float(r.shipping_cost),
+            float(r.discount_amount),
+            float(r.total_amount)
+        ], on_chunk)
     
-    def export_inventory_csv(self, products):
-        """Export inventory to CSV."""
-        output = io.StringIO()
-        writer = csv.writer(output)
+    def count_inventory_export(self):
+        """Number of rows export_inventory_csv will write."""
+        return db.session.execute(db.select(func.count(Product.id))).scalar()
+    
+    def export_inventory_csv(self, chunk_size=1000, on_chunk=None):
+        """Export inventory to CSV in id order, as a generator of text chunks."""
+        query = db.select(
+            Product.id, Product.sku, Product.name, Product.category, Product.price,
+            Product.stock, Product.reserved_stock,
+            Product.available_stock_expr().label('available')
+        )
         
-        writer.writerow([
+        header = [
             'SKU', 'Name', 'Category', 'Price',
             'Stock', 'Reserved', 'Available', 'Value'
-        ])
-        
-        for product in products:
-            writer.writerow([
-                product.sku,
-                product.name,
-                product.category or '',
-                float(product.price),
-                product.stock,
-                product.reserved_stock,
-                product.available_stock,
-                float(product.price) * product.stock
+        ]
+        chunks = self._keyset_chunks(query, [Product.id], chunk_size)
+        return self._csv_chunks(header, chunks, lambda r: [
+            r.sku,
+            r.name,
+            r.category or '',
+            float(r.price),
+            r.stock,
+            r.reserved_stock,
+            r.available,
+            float(r.price) * r.stock
+        ], on_chunk)
+    
+    def _cursor_batches(self, query, batch_size):
+        """Yield the rows of ``query`` from one cursor, ``batch_size`` at a time.
+        
+        Callers may commit the session between batches (job progress). That
+        would close a server-side cursor opened on the session's connection,
+        so where the dialect has them the rows are read on a connection of
+        their own. SQLite has none, and an open read on a second connection
+        would block those commits; its cursors survive a commit on the same
+        connection, so the session's is used there.
+        """
+        if not db.engine.dialect.supports_server_side_cursors:
+            result = db.session.execute(query, execution_options={'yield_per': batch_size})
+            yield from result.partitions()
+            return
+        with db.engine.connect() as connection:
+            result = connection.execution_options(
+                stream_results=True, yield_per=batch_size
+            ).execute(query)
+            yield from result.partitions()
+    
+    def _columnar_source(self, dataset, status, start_date, end_date):
+        """(select, arrow schema) for the 'orders' or 'order_items' dataset."""
+        money = pa.decimal128(10, 2)
+        if dataset == 'orders':
+            query = db.select(
+                Order.id, Order.order_number, Order.created_at, Order.user_id,
+                User.email, Order.status, Order.subtotal, Order.tax_amount,
+                Order.shipping_cost, Order.discount_amount, Order.total_amount
+            ).join(User, Order.user_id == User.id)
+            schema = pa.schema([
+                pa.field('id', pa.int64(), nullable=False),
+                pa.field('order_number', pa.string()),
+                pa.field('created_at', pa.timestamp('us')),
+                pa.field('user_id', pa.int64(), nullable=False),
+                pa.field('customer_email', pa.string()),
+                pa.field('status', pa.string()),
+                pa.field('subtotal', money),
+                pa.field('tax_amount', money),
+                pa.field('shipping_cost', money),
+                pa.field('discount_amount', money),
+                pa.field('total_amount', money),
+            ])
+            order_by = Order.id
+        else:
+            query = db.select(
+                OrderItem.id, OrderItem.order_id, Order.created_at, OrderItem.product_id,
+                Product.sku, OrderItem.quantity, OrderItem.unit_price, OrderItem.discount
+            ).join(Order, OrderItem.order_id == Order.id).join(
+                Product, OrderItem.product_id == Product.id
+            )
+            schema = pa.schema([
+                pa.field('id', pa.int64(), nullable=False),
+                pa.field('order_id', pa.int64(), nullable=False),
+                pa.field('order_created_at', pa.timestamp('us')),
+                pa.field('product_id', pa.int64(), nullable=False),
+                pa.field('sku', pa.string()),
+                pa.field('quantity', pa.int32(), nullable=False),
+                pa.field('unit_price', money),
+                pa.field('discount', money),
             ])
+            order_by = OrderItem.id
+        query = self._filter_orders(query, status, start_date, end_date).order_by(order_by)
+        return query, schema
+    
+    def export_columnar(self, path, dataset, fmt, status=None, start_date=None,
+                        end_date=None, batch_size=50000, on_chunk=None):
+        """Write orders or order items to ``path`` as Parquet or Arrow IPC.
+        
+        Rows stream from one cursor ``batch_size`` at a time (server-side
+        on PostgreSQL) and each batch becomes one Parquet row group or IPC
+        record batch. Money columns are decimal128(10, 2) and timestamps
+        are microsecond precision. Requires pyarrow.
+        """
+        if pa is None:
+            raise RuntimeError('Columnar exports need pyarrow installed')
+        if dataset not in COLUMNAR_DATASETS or fmt not in COLUMNAR_FORMATS:
+            raise ValueError(f'Unsupported columnar export: {dataset} as {fmt}')
+        
+        query, schema = self._columnar_source(dataset, status, start_date, end_date)
+        if fmt == 'parquet':
+            writer = pq.ParquetWriter(path, schema, compression='zstd')
+            write = lambda batch: writer.write_table(pa.Table.from_batches([batch]))
+        else:
+            writer = pa.ipc.new_file(
+                path, schema, options=pa.ipc.IpcWriteOptions(compression='zstd')
+            )
+            write = writer.write_batch
         
-        output.seek(0)
-        return output.getvalue()
+        try:
+            for rows in self._cursor_batches(query, batch_size):
+                columns = zip(*rows)
+                write(pa.record_batch([
+                    pa.array(values, type=field.type)
+                    for values, field in zip(columns, schema)
+                ], schema=schema))
+                if on_chunk is not None:
+                    on_chunk(len(rows))
+        finally:
+            writer.close()
 
 # Global instance
 report_service = ReportService()
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import update
+from app import db
+from app.models import Order, OrderItem, Product
+
+
+class ReservationSweeper:
+    """Cancel abandoned pending orders and give their stock back."""
+    
+    def _expire_batch(self, order_ids, now):
+        """Cancel still-pending ``order_ids`` and release their stock.
+        
+        Returns (orders_expired, units_released). Set-based: one UPDATE on
+        orders, one aggregate over their lines, one UPDATE on products.
+        """
+        expired = db.session.execute(
+            update(Order).where(
+                Order.id.in_(order_ids),
+                Order.status == Order.STATUS_PENDING
+            ).values(
+                status=Order.STATUS_CANCELLED,
+                cancelled_at=now
+            ).returning(Order.id).execution_options(synchronize_session=False)
+        ).scalars().all()
+        
+        quantities = OrderItem.quantities_by_product(expired)
+        Product.release_many(quantities)
+        db.session.commit()
+        return len(expired), sum(quantities.values())
+    
+    def sweep(self, hold_minutes=None, batch_size=None, now=None):
+        """Expire pending orders older than ``hold_minutes``, in batches.
+        
+        Returns {'orders': n, 'units': n} for everything freed.
+        """
+        config = current_app.config
+        hold_minutes = hold_minutes or config['RESERVATION_HOLD_MINUTES']
+        batch_size = batch_size or config['RESERVATION_SWEEP_BATCH_SIZE']
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(minutes=hold_minutes)
+        
+        totals = {'orders': 0, 'units': 0}
+        last_id = 0
+        while True:
+            # SKIP LOCKED leaves orders that are being confirmed or cancelled
+            # right now to the next run instead of blocking on them.
+            order_ids = db.session.execute(
+                db.select(Order.id).where(
+                    Order.status == Order.STATUS_PENDING,
+                    Order.created_at < cutoff,
+                    Order.id > last_id
+                ).order_by(Order.id).limit(batch_size).with_for_update(skip_locked=True)
+            ).scalars().all()
+            if not order_ids:
+                break
+            
+            orders, units = self._expire_batch(order_ids, now)
+            totals['orders'] += orders
+            totals['units'] += units
+            last_id = order_ids[-1]
+        
+        return totals
+
+
+# Global instance
+reservation_sweeper = ReservationSweeper()
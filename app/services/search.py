@@ -0,0 +1,93 @@
+import re
+from sqlalchemy import column, func, literal, literal_column, table, text
+from app import db
+from app.models import Product
+from app.models.product_search import FTS_TABLE, PG_DOCUMENT, create_search_index
+
+
+class ProductSearch:
+    """Ranked product search on the dialect's full-text index.
+    
+    Falls back to unranked ILIKE matching on databases without one.
+    """
+    
+    # bm25 column weights for name, sku, description
+    SQLITE_WEIGHTS = (10.0, 10.0, 1.0)
+    
+    def tokens(self, term):
+        return re.findall(r'\w+', term or '')
+    
+    def apply(self, query, term, sku_substring=False):
+        """Restrict a Product query to rows matching ``term``.
+        
+        Returns (query, rank); ordering by ``rank`` ascending puts the best
+        matches first. Callers should check tokens(term) is non-empty.
+        With ``sku_substring`` products whose SKU contains ``term`` match
+        as well (admin lookups by SKU fragment, e.g. "-001"); those that
+        only match that way rank after the full-text hits.
+        """
+        words = self.tokens(term)
+        dialect = db.session.get_bind().dialect.name
+        
+        if dialect == 'sqlite':
+            # Quote every word so user input is never parsed as FTS5 syntax;
+            # the last word also matches as a prefix (search-as-you-type).
+            match = ' '.join(f'"{w}"' for w in words) + '*'
+            fts = table(FTS_TABLE, column('rowid'))
+            index = literal_column(FTS_TABLE)
+            matches = db.select(
+                fts.c.rowid.label('id'),
+                func.bm25(index, *self.SQLITE_WEIGHTS).label('rank')
+            ).where(index.op('MATCH')(match))
+        elif dialect == 'postgresql':
+            document = literal_column(f'({PG_DOCUMENT})')
+            tsquery = func.to_tsquery('english', ' & '.join(words) + ':*')
+            matches = db.select(
+                Product.id,
+                (-func.ts_rank(document, tsquery)).label('rank')
+            ).where(document.op('@@')(tsquery))
+        else:
+            pattern = f'%{term}%'
+            query = query.filter(db.or_(
+                Product.name.ilike(pattern),
+                Product.sku.ilike(pattern),
+                Product.description.ilike(pattern)
+            ))
+            return query, literal(0)
+        
+        matches = matches.subquery()
+        if not sku_substring:
+            return query.join(matches, matches.c.id == Product.id), matches.c.rank
+        # Full-text ranks are negative, so SKU-only hits (rank 0) come last
+        query = query.outerjoin(matches, matches.c.id == Product.id).filter(db.or_(
+            matches.c.id.isnot(None),
+            Product.sku.icontains(term, autoescape=True)
+        ))
+        return query, func.coalesce(matches.c.rank, 0)
+    
+    def search_ids(self, term, page, per_page, category=None):
+        """Return (product_ids, total) for one page of active matches."""
+        if not self.tokens(term):
+            return [], 0
+        query = db.session.query(Product.id).filter(Product.is_active.is_(True))
+        if category:
+            query = query.filter(Product.category == category)
+        query, rank = self.apply(query, term)
+        
+        total = query.order_by(None).count()
+        ids = [row.id for row in query.order_by(rank, Product.id)
+               .offset((page - 1) * per_page).limit(per_page)]
+        return ids, total
+    
+    def rebuild(self):
+        """Create the index if missing and re-index every product."""
+        with db.engine.begin() as connection:
+            create_search_index(connection)
+            if connection.dialect.name == 'sqlite':
+                connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+            elif connection.dialect.name == 'postgresql':
+                connection.execute(text('REINDEX INDEX ix_products_search'))
+
+
+# Global instance
+product_search = ProductSearch()
@@ -0,0 +1,90 @@
+from app import db
+from app.models import Product, StockShard
+
+
+class StockService:
+    """Set-based stock changes for warehouse syncs."""
+    
+    # Products per UPDATE; keeps the CASE and IN lists within bind limits
+    CHUNK_SIZE = 1000
+    
+    def _resolve(self, lines):
+        """Map each line to a product id with one lookup per key type.
+        
+        Returns (resolved, failures) where resolved is [(index, product_id,
+        adjustment)] and failures is a list of per-line error dicts.
+        """
+        skus = {line['sku'] for line in lines if 'sku' in line}
+        ids = {line['id'] for line in lines if 'id' in line}
+        by_sku, known_ids = {}, set()
+        if skus:
+            by_sku = dict(db.session.execute(
+                db.select(Product.sku, Product.id).where(Product.sku.in_(skus))
+            ).all())
+        if ids:
+            known_ids = set(db.session.execute(
+                db.select(Product.id).where(Product.id.in_(ids))
+            ).scalars())
+        
+        resolved, failures = [], []
+        for index, line in enumerate(lines):
+            product_id = by_sku.get(line['sku']) if 'sku' in line else (
+                line['id'] if line['id'] in known_ids else None
+            )
+            if product_id is None:
+                failures.append(self._failure(index, line, 'Product not found'))
+            else:
+                resolved.append((index, product_id, line['adjustment']))
+        return resolved, failures
+    
+    def _failure(self, index, line, error):
+        key = 'sku' if 'sku' in line else 'id'
+        return {'line': index, key: line[key], 'error': error}
+    
+    def adjust(self, lines):
+        """Apply [{'sku'|'id': ..., 'adjustment': delta}] in one transaction.
+        
+        Deltas for the same product are summed. Products whose stock would
+        drop below the units their orders hold (see Product.adjust_many) are
+        left unchanged and every line for them is reported as failed.
+        Returns {'adjusted', 'failed'}.
+        """
+        resolved, failures = self._resolve(lines)
+        
+        totals = {}
+        for _, product_id, adjustment in resolved:
+            totals[product_id] = totals.get(product_id, 0) + adjustment
+        
+        rejected = set()
+        product_ids = list(totals)
+        for start in range(0, len(product_ids), self.CHUNK_SIZE):
+            chunk = product_ids[start:start + self.CHUNK_SIZE]
+            rejected.update(Product.adjust_many({pid: totals[pid] for pid in chunk}))
+        db.session.commit()
+        
+        failures.extend(
+            self._failure(index, lines[index], 'Insufficient stock for adjustment')
+            for index, product_id, _ in resolved if product_id in rejected
+        )
+        failures.sort(key=lambda f: f['line'])
+        return {'adjusted': len(totals) - len(rejected), 'failed': failures}
+    
+    def fold_shards(self):
+        """Fold every product's shard counters back into the product row.
+        
+        One transaction per product. Returns {'products', 'units'} where
+        units is the unused allotment given back.
+        """
+        product_ids = db.session.execute(
+            db.select(StockShard.product_id).where(StockShard.allotment > 0).distinct()
+        ).scalars().all()
+        
+        units = 0
+        for product_id in product_ids:
+            units += Product.fold_shards(product_id)
+            db.session.commit()
+        return {'products': len(product_ids), 'units': units}
+
+
+# Global instance
+stock_service = StockService()
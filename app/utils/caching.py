@@ -0,0 +1,30 @@
+import hashlib
+from flask import make_response, request
+
+
+def etag_for(*parts):
+    """Build an ETag value from row versions and request parameters.
+    
+    The value names the resource state, not exact bytes (the body may be
+    compressed or not), so ``not_modified`` and ``with_etag`` send it weak.
+    """
+    raw = '|'.join('' if part is None else str(part) for part in parts)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def not_modified(etag):
+    """Return a 304 response if the client already holds ``etag``, else None.
+    
+    Call it before loading or serializing anything the ETag covers.
+    """
+    if request.if_none_match.contains_weak(etag):
+        response = make_response('', 304)
+        response.set_etag(etag, weak=True)
+        return response
+    return None
+
+
+def with_etag(response, etag):
+    response = make_response(response)
+    response.set_etag(etag, weak=True)
+    return response
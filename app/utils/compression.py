@@ -0,0 +1,132 @@
+"""Response compression negotiated through Accept-Encoding.
+
+gzip is always available; zstd and brotli are offered when the
+``zstandard`` / ``brotli`` packages are installed. Buffered bodies below
+COMPRESS_MIN_SIZE go out as they are. Streamed responses are compressed
+chunk by chunk, with a sync flush after each chunk so clients can decode
+what has been sent so far.
+"""
+import zlib
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+
+
+class _Gzip:
+    def __init__(self, level):
+        self._z = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip container
+    
+    def compress(self, data):
+        return self._z.compress(data)
+    
+    def flush(self):
+        return self._z.flush(zlib.Z_SYNC_FLUSH)
+    
+    def finish(self):
+        return self._z.flush()
+
+
+class _Brotli:
+    def __init__(self, level):
+        self._c = brotli.Compressor(quality=min(level, 11))
+    
+    def compress(self, data):
+        return self._c.process(data)
+    
+    def flush(self):
+        return self._c.flush()
+    
+    def finish(self):
+        return self._c.finish()
+
+
+class _Zstd:
+    def __init__(self, level):
+        self._c = zstandard.ZstdCompressor(level=level).compressobj()
+    
+    def compress(self, data):
+        return self._c.compress(data)
+    
+    def flush(self):
+        return self._c.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+    
+    def finish(self):
+        return self._c.flush()
+
+
+def available_encoders():
+    """{coding: encoder class} in server preference order."""
+    encoders = {}
+    if zstandard is not None:
+        encoders['zstd'] = _Zstd
+    if brotli is not None:
+        encoders['br'] = _Brotli
+    encoders['gzip'] = _Gzip
+    return encoders
+
+
+ENCODERS = available_encoders()
+
+
+def _stream(chunks, encoder):
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            if chunk:
+                data = encoder.compress(chunk) + encoder.flush()
+                if data:
+                    yield data
+        yield encoder.finish()
+    finally:
+        # Closing the original iterable runs stream_with_context teardown
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+def compress_response(response):
+    """after_request hook: compress ``response`` if the client accepts it."""
+    config = current_app.config
+    if (not config['COMPRESS_ENABLED']
+            or response.mimetype not in config['COMPRESS_MIMETYPES']
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or request.method == 'HEAD'
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or 'no-transform' in response.headers.get('Cache-Control', '')):
+        return response
+    
+    # The body now depends on Accept-Encoding, compressed or not
+    response.vary.add('Accept-Encoding')
+    coding = request.accept_encodings.best_match(list(ENCODERS))
+    if coding is None:
+        return response
+    
+    if not response.is_streamed:
+        body = response.get_data()
+        if len(body) < config['COMPRESS_MIN_SIZE']:
+            return response
+    
+    encoder = ENCODERS[coding](config['COMPRESS_LEVEL'][coding])
+    if response.is_streamed:
+        response.response = _stream(response.response, encoder)
+        response.headers.pop('Content-Length', None)
+    else:
+        response.set_data(encoder.compress(body) + encoder.finish())
+    response.headers['Content-Encoding'] = coding
+    
+    # A strong ETag names exact bytes; the compressed body is a different
+    # encoding of the same resource, so it only keeps a weak one
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
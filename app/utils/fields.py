@@ -0,0 +1,63 @@
+"""Sparse fieldsets: ``?fields=id,name,price`` trims a payload and its query."""
+from flask import abort, jsonify, make_response, request
+from sqlalchemy.orm import load_only
+
+
+class FieldSet:
+    """The keys a model serializes, with the columns each one reads.
+    
+    ``fields`` maps a payload key to (column names, getter); a getter of
+    None marks a key the caller fills in itself (e.g. nested items).
+    Assigned as a class attribute it binds to its model, so ``options``
+    can restrict a query to the columns a projection needs.
+    """
+    
+    def __init__(self, fields, always=('id',)):
+        self.fields = fields
+        self.always = always
+        self.model = None
+    
+    def __set_name__(self, owner, name):
+        self.model = owner
+    
+    def parse(self, raw):
+        """Return the requested keys, or None when ``raw`` asks for all.
+        
+        Keys in ``always`` are added. Raises ValueError on unknown keys.
+        """
+        if raw is None or not raw.strip():
+            return None
+        names = {name.strip() for name in raw.split(',') if name.strip()}
+        unknown = sorted(names - self.fields.keys())
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        names.update(self.always)
+        return frozenset(names)
+    
+    def requested(self):
+        """Parse the current request's ``fields`` argument.
+        
+        Unknown keys abort the request with a 400 naming them.
+        """
+        try:
+            return self.parse(request.args.get('fields'))
+        except ValueError as e:
+            abort(make_response(jsonify({'error': str(e)}), 400))
+    
+    def options(self, keys, *columns):
+        """Loader options for ``keys`` plus any extra ``columns`` (e.g. sort keys).
+        
+        Returns no options when ``keys`` is None, so the full row loads.
+        """
+        if keys is None:
+            return []
+        names = {name for key in keys for name in self.fields[key][0]}
+        attrs = [getattr(self.model, name) for name in sorted(names)]
+        return [load_only(*attrs, *columns)]
+    
+    def dump(self, obj, keys=None):
+        """Serialize ``obj``, limited to ``keys`` when given."""
+        return {
+            key: get(obj) for key, (_, get) in self.fields.items()
+            if get is not None and (keys is None or key in keys)
+        }
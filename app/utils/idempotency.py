@@ -0,0 +1,131 @@
+import hashlib
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import current_app, jsonify, make_response, request, Response
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import IdempotencyKey
+
+POLL_INTERVAL = 0.05
+
+
+def _fingerprint():
+    digest = hashlib.sha256()
+    digest.update(f'{request.method} {request.path}\n'.encode('utf-8'))
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def _claim(user_id, key, request_hash):
+    """Insert an in-flight record for (user_id, key).
+    
+    Returns (record, True) if this request owns the key, or
+    (existing_record, False) if another request got there first.
+    """
+    now = datetime.utcnow()
+    config = current_app.config
+    for _ in range(2):
+        record = IdempotencyKey(
+            user_id=user_id,
+            key=key,
+            request_hash=request_hash,
+            created_at=now,
+            expires_at=now + timedelta(seconds=config['IDEMPOTENCY_TTL'])
+        )
+        db.session.add(record)
+        try:
+            db.session.commit()
+            return record, True
+        except IntegrityError:
+            db.session.rollback()
+        
+        existing = IdempotencyKey.query.filter_by(user_id=user_id, key=key).first()
+        if existing is None:
+            continue
+        abandoned = existing.in_flight and existing.created_at < now - timedelta(
+            seconds=config['IDEMPOTENCY_LOCK_TIMEOUT']
+        )
+        if existing.expires_at > now and not abandoned:
+            return existing, False
+        # Expired or abandoned by a crashed worker: drop it and claim again.
+        # The guard makes sure only one contender deletes it.
+        IdempotencyKey.query.filter_by(
+            id=existing.id, created_at=existing.created_at
+        ).delete()
+        db.session.commit()
+    return IdempotencyKey.query.filter_by(user_id=user_id, key=key).first(), False
+
+
+def _wait_for(record):
+    """Poll until the original request stores its response."""
+    deadline = time.monotonic() + current_app.config['IDEMPOTENCY_WAIT_SECONDS']
+    record_id = record.id
+    while record is not None and record.in_flight and time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        db.session.expire_all()
+        record = IdempotencyKey.query.get(record_id)
+    return record
+
+
+def purge_expired(now=None):
+    """Delete keys past their expiry; returns how many were removed."""
+    deleted = IdempotencyKey.query.filter(
+        IdempotencyKey.expires_at < (now or datetime.utcnow())
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+
+def idempotent(fn):
+    """Replay the first response for requests repeating an Idempotency-Key.
+    
+    Keys are scoped per user. A duplicate that arrives while the original
+    is still running waits for it instead of running in parallel. Server
+    errors are not stored, so the client may retry them.
+    Must be applied inside jwt_required().
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return fn(*args, **kwargs)
+        if len(key) > 255:
+            return jsonify({'error': 'Idempotency-Key too long'}), 400
+        
+        user_id = int(get_jwt_identity())
+        request_hash = _fingerprint()
+        record, owner = _claim(user_id, key, request_hash)
+        
+        if not owner:
+            if record is not None and record.request_hash != request_hash:
+                return jsonify({'error': 'Idempotency-Key reused with a different request'}), 422
+            record = _wait_for(record) if record is not None else None
+            if record is None:
+                return jsonify({'error': 'Original request failed, please retry'}), 409
+            if record.in_flight:
+                return jsonify({'error': 'A request with this Idempotency-Key is in progress'}), 409
+            response = Response(record.response_body, record.status_code, mimetype='application/json')
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response
+        
+        record_id = record.id
+        try:
+            response = make_response(fn(*args, **kwargs))
+        except Exception:
+            db.session.rollback()
+            IdempotencyKey.query.filter_by(id=record_id).delete()
+            db.session.commit()
+            raise
+        
+        if response.status_code >= 500:
+            IdempotencyKey.query.filter_by(id=record_id).delete()
+        else:
+            IdempotencyKey.query.filter_by(id=record_id).update({
+                'status_code': response.status_code,
+                'response_body': response.get_data(as_text=True)
+            })
+        db.session.commit()
+        return response
+    return wrapper
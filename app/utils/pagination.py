@@ -0,0 +1,61 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import tuple_
+
+
+def encode_cursor(values):
+    """Encode keyset values as an opaque, URL-safe cursor."""
+    raw = json.dumps([
+        v.isoformat() if isinstance(v, datetime) else v for v in values
+    ], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """Decode a cursor produced by encode_cursor for ``columns``.
+    
+    Raises ValueError if the cursor is malformed.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError('Invalid cursor')
+        decoded = []
+        for column, value in zip(columns, values):
+            python_type = column.type.python_type
+            if python_type is datetime:
+                value = datetime.fromisoformat(value)
+            elif not isinstance(value, python_type) or (
+                    isinstance(value, bool) and python_type is not bool):
+                raise ValueError('Invalid cursor')
+            decoded.append(value)
+        return decoded
+    except (TypeError, ValueError):
+        raise ValueError('Invalid cursor')
+
+
+def keyset_page(query, columns, cursor, per_page, descending=True):
+    """Fetch the page of ``query`` that follows ``cursor``.
+    
+    Rows are ordered by ``columns`` (which must be unique together, e.g.
+    (created_at, id)) and resumed with a row-value comparison instead of
+    OFFSET, so deep pages cost the same as the first one.
+    
+    Returns (items, next_cursor); next_cursor is None on the last page.
+    """
+    if cursor:
+        key = tuple_(*columns)
+        after = tuple_(*decode_cursor(cursor, columns))
+        query = query.filter(key < after if descending else key > after)
+    
+    ordering = [c.desc() if descending else c.asc() for c in columns]
+    rows = query.order_by(*ordering).limit(per_page + 1).all()
+    
+    items = rows[:per_page]
+    next_cursor = None
+    if len(rows) > per_page:
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, c.key) for c in columns])
+    return items, next_cursor
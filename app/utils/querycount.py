@@ -0,0 +1,40 @@
+from sqlalchemy import event
+
+
+class QueryCounter:
+    """Record SQL statements and commits issued on an engine.
+
+    Usage:
+        with QueryCounter(db.engine) as counter:
+            ...
+        counter.count, counter.commits
+    
+    ``executed`` keeps (statement, parameters) pairs, e.g. for EXPLAIN.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+        self.executed = []
+        self.commits = 0
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+        if not executemany:
+            self.executed.append((statement, parameters))
+
+    def _on_commit(self, conn):
+        self.commits += 1
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        event.listen(self.engine, 'commit', self._on_commit)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+        event.remove(self.engine, 'commit', self._on_commit)
@@ -12,6 +12,50 @@ class Config:
     # JWT Settings
     JWT_ACCESS_TOKEN_EXPIRES = 3600  # 1 hour
     JWT_REFRESH_TOKEN_EXPIRES = 604800  # 7 days
+    
+    # Orders
+    BULK_ORDER_CHUNK_SIZE = int(os.environ.get('BULK_ORDER_CHUNK_SIZE') or 100)
+    ORDER_NUMBER_BLOCK_SIZE = int(os.environ.get('ORDER_NUMBER_BLOCK_SIZE') or 100)
+    BULK_STATUS_BATCH_SIZE = 500  # orders per transaction in /orders/bulk-status
+    
+    # Product reads are served from a per-worker catalog snapshot that polls
+    # for changed products at most this often (stock figures may lag by it)
+    CATALOG_REFRESH_SECONDS = float(os.environ.get('CATALOG_REFRESH_SECONDS') or 5)
+    PRODUCT_IMPORT_BATCH_SIZE = 500  # rows per upsert statement in CSV imports
+    STOCK_ADJUST_MAX_LINES = 10000  # per request to /inventory/stock/batch
+    
+    # Hot products with reservation_shards > 0 reserve from shard rows,
+    # which borrow this many units from the product row at a time
+    STOCK_SHARD_REFILL = 50
+    STOCK_SHARD_FOLD_INTERVAL = 60  # seconds, for `flask fold-stock-shards --loop`
+    
+    # Idempotency-Key handling for order and cart mutations
+    IDEMPOTENCY_TTL = 86400  # keep first responses for 24 hours
+    IDEMPOTENCY_WAIT_SECONDS = 10  # how long a duplicate waits for the original
+    IDEMPOTENCY_LOCK_TIMEOUT = 120  # in-flight keys older than this are abandoned
+    
+    # Pending orders hold reserved stock until confirmed or swept
+    RESERVATION_HOLD_MINUTES = int(os.environ.get('RESERVATION_HOLD_MINUTES') or 30)
+    RESERVATION_SWEEP_BATCH_SIZE = 500
+    RESERVATION_SWEEP_INTERVAL = 60  # seconds, for `flask expire-reservations --loop`
+    
+    # Streamed CSV exports read this many rows per query
+    REPORT_EXPORT_CHUNK_SIZE = 1000
+    
+    # Report jobs are built by `flask run-report-jobs --loop` into this directory
+    REPORT_STORAGE_DIR = os.environ.get('REPORT_STORAGE_DIR') or 'reports'
+    REPORT_JOB_POLL_INTERVAL = 5  # seconds between polls for queued jobs
+    REPORT_JOB_STALE_SECONDS = 300  # running jobs without progress this long are retried
+    REPORT_COLUMNAR_BATCH_SIZE = 50000  # rows per Parquet row group / Arrow record batch
+    
+    # Response compression (gzip; zstd/brotli if their packages are installed)
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'true').lower() == 'true'
+    COMPRESS_MIN_SIZE = 500  # bytes; smaller buffered bodies are sent as is
+    COMPRESS_LEVEL = {'gzip': 6, 'br': 4, 'zstd': 3}
+    COMPRESS_MIMETYPES = {
+        'application/json', 'application/x-ndjson', 'text/csv',
+        'text/html', 'text/plain', 'text/css', 'application/javascript',
+    }
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -19,6 +63,7 @@ class DevelopmentConfig(Config):
 class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    CATALOG_REFRESH_SECONDS = 0
 
 class ProductionConfig(Config):
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
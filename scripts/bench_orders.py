@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+"""
+Order creation benchmark: statements, commits and latency per order size.
+Run: python scripts/bench_orders.py [--config testing] [--iterations 50]
+
+The default 'testing' config runs against an in-memory SQLite database.
+Any other config writes BENCH-* products and orders into its database.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models import User, Product
+from app.services.order_service import order_service
+from app.utils.querycount import QueryCounter
+
+SIZES = [1, 5, 10, 30, 50, 100, 200]
+
+
+def setup_fixtures(max_lines):
+    user = User.query.filter_by(email='bench@shop.com').first()
+    if not user:
+        user = User(email='bench@shop.com', role='customer', password_hash='-')
+        db.session.add(user)
+
+    products = Product.query.filter(Product.sku.like('BENCH-%')).order_by(Product.id).all()
+    for i in range(len(products), max_lines):
+        product = Product(sku=f'BENCH-{i:04d}', name=f'Bench Product {i}', price=9.99)
+        db.session.add(product)
+        products.append(product)
+    for product in products:
+        product.stock = 10 ** 9
+    db.session.commit()
+    return user.id, [p.id for p in products]
+
+
+def run(config_name, iterations):
+    app = create_app(config_name)
+    with app.app_context():
+        db.create_all()
+        user_id, product_ids = setup_fixtures(max(SIZES))
+
+        print(f"{'lines':>6} {'stmts/order':>12} {'commits':>8} {'p50 ms':>9} {'p99 ms':>9}")
+        for size in SIZES:
+            items = [{'product_id': pid, 'quantity': 1} for pid in product_ids[:size]]
+            latencies = []
+            statements = commits = 0
+            for _ in range(iterations):
+                with QueryCounter(db.engine) as counter:
+                    started = time.perf_counter()
+                    order_service.create_order(user_id, items)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                statements += counter.count
+                commits += counter.commits
+
+            cuts = statistics.quantiles(latencies, n=100)
+            print(f"{size:>6} {statements / iterations:>12.1f} {commits / iterations:>8.1f} "
+                  f"{cuts[49]:>9.2f} {cuts[98]:>9.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--config', default='testing')
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+    run(args.config, args.iterations)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""
+Order pricing benchmark: in-memory cent pipeline vs. the old float path.
+Run: python scripts/bench_pricing.py [--config testing] [--iterations 20]
+
+The old path re-queries the order's lines through the dynamic relationship,
+sums float subtotals, converts back through Decimal(str(...)) and commits.
+The default 'testing' config runs against an in-memory SQLite database.
+Any other config writes BENCH-* products and orders into its database.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from decimal import Decimal
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models import Order
+from app.services.order_service import order_service
+from app.services.pricing import price_order
+from app.utils.querycount import QueryCounter
+
+from bench_orders import setup_fixtures
+
+SIZES = [10, 100, 200]
+
+
+def legacy_totals(order):
+    """The pre-pipeline calculate_totals, kept here for comparison."""
+    subtotal = 0.0
+    for item in order.items:
+        discount = float(item.discount) if item.discount else 0
+        subtotal += float(item.unit_price) * item.quantity - discount
+    order.subtotal = Decimal(str(subtotal))
+    order.tax_amount = order.subtotal * Decimal('0.19')
+    order.total_amount = (
+        order.subtotal + order.tax_amount +
+        Decimal(order.shipping_cost or 0) - Decimal(order.discount_amount or 0)
+    )
+    db.session.commit()
+
+
+def measure(fn, iterations):
+    latencies = []
+    statements = commits = 0
+    for _ in range(iterations):
+        with QueryCounter(db.engine) as counter:
+            started = time.perf_counter()
+            fn()
+            latencies.append((time.perf_counter() - started) * 1000)
+        statements += counter.count
+        commits += counter.commits
+    return (statistics.median(latencies), statements / iterations, commits / iterations)
+
+
+def run(config_name, iterations):
+    app = create_app(config_name)
+    with app.app_context():
+        db.create_all()
+        user_id, product_ids = setup_fixtures(max(SIZES))
+        
+        print(f"{'lines':>6} {'path':>8} {'p50 ms':>9} {'stmts':>6} {'commits':>8}  total")
+        for size in SIZES:
+            items = [{'product_id': pid, 'quantity': 3} for pid in product_ids[:size]]
+            order = order_service.create_order(user_id, items)
+            
+            ms, stmts, commits = measure(lambda: legacy_totals(order), iterations)
+            legacy = order.total_amount
+            print(f"{size:>6} {'float':>8} {ms:>9.3f} {stmts:>6.1f} {commits:>8.1f}  {legacy}")
+            
+            # The pipeline prices lines already in memory, as create_order does
+            lines = order.items.all()
+            shipping, discount = order.shipping_cost, order.discount_amount
+            ms, stmts, commits = measure(lambda: price_order(lines, shipping, discount), iterations)
+            exact = price_order(lines, shipping, discount).total_amount
+            print(f"{size:>6} {'cents':>8} {ms:>9.3f} {stmts:>6.1f} {commits:>8.1f}  {exact}")
+            db.session.rollback()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--config', default='testing')
+    parser.add_argument('--iterations', type=int, default=20)
+    args = parser.parse_args()
+    run(args.config, args.iterations)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""
+Serialization benchmark: 100-item product and order pages per JSON provider.
+Run: python scripts/bench_serialization.py [--config testing] [--iterations 200]
+
+Each page is built with to_dict (raw Decimals and datetimes) and encoded by
+the stdlib provider and, if orjson is installed, the orjson provider. The
+'legacy' row converts values with float()/isoformat() first, as to_dict
+used to, and encodes with the stdlib json module.
+The default 'testing' config runs against an in-memory SQLite database.
+Any other config writes BENCH-* products and orders into its database.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import date, datetime
+from decimal import Decimal
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.json_provider import OrjsonProvider, StdlibJSONProvider, orjson
+from app.models import Order, Product
+from app.services.order_service import order_service
+
+from bench_orders import setup_fixtures
+
+PAGE_SIZE = 100
+
+
+def legacy(value):
+    """Convert raw values the way the old to_dict methods did."""
+    if isinstance(value, dict):
+        return {k: legacy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [legacy(v) for v in value]
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def measure(fn, iterations):
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        size = len(fn())
+        latencies.append((time.perf_counter() - started) * 1000)
+    return statistics.median(latencies), size
+
+
+def run(config_name, iterations):
+    app = create_app(config_name)
+    with app.app_context():
+        db.create_all()
+        user_id, product_ids = setup_fixtures(PAGE_SIZE)
+        orders = Order.query.filter_by(user_id=user_id).limit(PAGE_SIZE).all()
+        for _ in range(PAGE_SIZE - len(orders)):
+            items = [{'product_id': pid, 'quantity': 1} for pid in product_ids[:3]]
+            orders.append(order_service.create_order(user_id, items))
+        products = Product.query.filter(Product.id.in_(product_ids)).all()
+        
+        pages = {
+            'products': {'products': [p.to_dict() for p in products]},
+            'orders': {'orders': order_service.serialize_orders(orders)},
+        }
+        providers = [('stdlib', StdlibJSONProvider(app))]
+        if orjson is not None:
+            providers.append(('orjson', OrjsonProvider(app)))
+        
+        print(f"{'page':>9} {'encoder':>8} {'p50 ms':>9} {'bytes':>8}")
+        for name, page in pages.items():
+            ms, size = measure(lambda: json.dumps(legacy(page), sort_keys=True), iterations)
+            print(f"{name:>9} {'legacy':>8} {ms:>9.3f} {size:>8}")
+            for label, provider in providers:
+                ms, size = measure(lambda: provider.dumps(page), iterations)
+                print(f"{name:>9} {label:>8} {ms:>9.3f} {size:>8}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--config', default='testing')
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+    run(args.config, args.iterations)
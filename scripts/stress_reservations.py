@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+"""
+Concurrency stress test for stock reservations on a single hot SKU.
+Run: python scripts/stress_reservations.py [--workers 8] [--seconds 10] [--shards 8]
+
+Every worker process loops on Product.reserve_many for one unit of the
+same product and commits. At the end the harness reports reservations
+per second and checks the row for oversell (reserved_stock > stock) and
+for lost updates (successful reservations != reserved_stock).
+
+With --shards N the product reserves through N shard rows instead of its
+own row; the shards are folded back before the checks.
+
+Uses DATABASE_URL when set, otherwise a throwaway SQLite file.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+HOT_SKU = 'STRESS-HOT-001'
+
+
+def make_app():
+    from app import create_app
+    return create_app('development')
+
+
+def worker(product_id, shards, seconds, quantity, results):
+    from app import db
+    from app.models import Product
+    from sqlalchemy.exc import OperationalError
+
+    app = make_app()
+    reserved = rejected = errors = 0
+    with app.app_context():
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            try:
+                if Product.reserve_many({product_id: quantity}, {product_id: shards}):
+                    rejected += 1
+                else:
+                    reserved += quantity
+                db.session.commit()
+            except OperationalError:
+                db.session.rollback()
+                errors += 1
+    results.put((reserved, rejected, errors))
+
+
+def run(workers, seconds, stock, quantity, shards):
+    from app import db
+    from app.models import Product
+
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        product = Product.query.filter_by(sku=HOT_SKU).first()
+        if not product:
+            product = Product(sku=HOT_SKU, name='Stress Hot SKU', price=1)
+            db.session.add(product)
+        product.stock = stock
+        product.reserved_stock = 0
+        db.session.flush()
+        product.set_reservation_shards(shards)
+        product.reserved_stock = 0
+        db.session.commit()
+        product_id = product.id
+        db.engine.dispose()
+
+    results = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(target=worker, args=(product_id, shards, seconds, quantity, results))
+        for _ in range(workers)
+    ]
+    started = time.perf_counter()
+    for proc in procs:
+        proc.start()
+    totals = [results.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+    elapsed = time.perf_counter() - started
+
+    reserved = sum(t[0] for t in totals)
+    rejected = sum(t[1] for t in totals)
+    errors = sum(t[2] for t in totals)
+
+    with app.app_context():
+        Product.fold_shards(product_id)
+        db.session.commit()
+        product = Product.query.get(product_id)
+        oversold = max(0, product.reserved_stock - product.stock)
+        lost = reserved - product.reserved_stock
+
+    print(f"workers:           {workers}")
+    print(f"shards:            {shards}")
+    print(f"elapsed:           {elapsed:.2f}s")
+    print(f"units reserved:    {reserved} ({reserved / elapsed:.0f}/s)")
+    print(f"sold-out rejects:  {rejected}")
+    print(f"db errors:         {errors}")
+    print(f"row:               stock={product.stock} reserved={product.reserved_stock}")
+    print(f"oversold units:    {oversold}")
+    print(f"lost updates:      {lost}")
+    return 1 if oversold or lost else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--stock', type=int, default=5000)
+    parser.add_argument('--quantity', type=int, default=1)
+    parser.add_argument('--shards', type=int, default=0,
+                        help='reserve through N shard rows (0 = the product row)')
+    args = parser.parse_args()
+
+    if not os.environ.get('DATABASE_URL'):
+        path = os.path.join(tempfile.mkdtemp(), 'stress.db')
+        os.environ['DATABASE_URL'] = f'sqlite:///{path}?timeout=30'
+
+    sys.exit(run(args.workers, args.seconds, args.stock, args.quantity, args.shards))
@@ -1,6 +1,7 @@
 import pytest
 from app import create_app, db
 from app.models import User, Product
+from app.utils.querycount import QueryCounter
 
 @pytest.fixture
 def app():
@@ -58,3 +59,8 @@ def sample_product(app):
     db.session.add(product)
     db.session.commit()
     return product
+
+@pytest.fixture
+def query_counter(app):
+    """Return a factory for statement counters bound to the test engine."""
+    return lambda: QueryCounter(db.engine)
@@ -60,3 +60,46 @@ def test_get_stats(client, admin_headers):
     assert 'products' in resp.json['stats']
     assert 'total' in resp.json['stats']['users']
     assert 'by_role' in resp.json['stats']['users']
+
+def test_user_detail_query_count(client, admin_headers, auth_headers, query_counter):
+    """User detail with recent orders does not query per order or line."""
+    from app import db
+    from app.models import Product
+    
+    product = Product(sku='DETAIL-001', name='Detail', price=5.00, stock=100)
+    db.session.add(product)
+    db.session.commit()
+    for _ in range(5):
+        client.post('/api/v1/orders', headers=auth_headers,
+            json={'items': [{'product_id': product.id, 'quantity': 1}]})
+    user_id = User.query.filter_by(email='test@example.com').first().id
+    db.session.expunge_all()
+    
+    with query_counter() as counter:
+        resp = client.get(f'/api/v1/admin/users/{user_id}', headers=admin_headers)
+    
+    assert resp.status_code == 200
+    assert len(resp.json['orders']) == 5
+    assert resp.json['orders'][0]['items'][0]['product_name'] == 'Detail'
+    # user, orders, their lines, order count
+    assert counter.count == 4
+
+def test_recent_orders_query_count(client, admin_headers, auth_headers, query_counter):
+    """Dashboard recent orders load customers in the same query."""
+    from app import db
+    from app.models import Product
+    
+    product = Product(sku='RECENT-001', name='Recent', price=5.00, stock=100)
+    db.session.add(product)
+    db.session.commit()
+    for _ in range(5):
+        client.post('/api/v1/orders', headers=auth_headers,
+            json={'items': [{'product_id': product.id, 'quantity': 1}]})
+    
+    with query_counter() as counter:
+        resp = client.get('/admin/api/recent-orders', headers=admin_headers)
+    
+    assert resp.status_code == 200
+    assert resp.json['orders'][0]['customer'] == 'test@example.com'
+    # admin lookup in the decorator, then orders joined with users
+    assert counter.count == 2
@@ -53,3 +53,9 @@ def test_logout(client, auth_headers):
     """Test logout."""
     resp = client.post('/api/v1/auth/logout', headers=auth_headers)
     assert resp.status_code == 200
+
+def test_get_current_user_fields(client, auth_headers):
+    """?fields= limits the user payload."""
+    resp = client.get('/api/v1/auth/me?fields=email', headers=auth_headers)
+    assert resp.status_code == 200
+    assert set(resp.json['user']) == {'id', 'email'}
@@ -0,0 +1,61 @@
+from app.models import db
+
+def test_product_etag(client, auth_headers, admin_headers, sample_product):
+    """Unchanged products answer If-None-Match with an empty 304."""
+    url = f'/api/v1/inventory/products/{sample_product.id}'
+    resp = client.get(url, headers=auth_headers)
+    etag = resp.headers['ETag']
+    
+    resp = client.get(url, headers={**auth_headers, 'If-None-Match': etag})
+    assert resp.status_code == 304
+    assert resp.data == b''
+    
+    listing = client.get('/api/v1/inventory/products', headers=auth_headers)
+    resp = client.get('/api/v1/inventory/products',
+                      headers={**auth_headers, 'If-None-Match': listing.headers['ETag']})
+    assert resp.status_code == 304
+    
+    client.patch(f'{url}/stock', headers=admin_headers, json={'adjustment': 5})
+    resp = client.get(url, headers={**auth_headers, 'If-None-Match': etag})
+    assert resp.status_code == 200
+    assert resp.json['product']['stock'] == 105
+    assert resp.headers['ETag'] != etag
+
+def test_shipping_rates_etag(client, admin_headers):
+    """The rates ETag follows the shipping_rates change counter."""
+    etag = client.get('/api/v1/shipping/rates').headers['ETag']
+    assert client.get('/api/v1/shipping/rates', headers={'If-None-Match': etag}).status_code == 304
+    
+    client.post('/api/v1/shipping/rates', headers=admin_headers, json={'name': 'Express'})
+    resp = client.get('/api/v1/shipping/rates', headers={'If-None-Match': etag})
+    assert resp.status_code == 200
+    assert [r['name'] for r in resp.json['rates']] == ['Express']
+
+def test_reviews_etag(client, auth_headers, sample_product, query_counter):
+    """A 304 for reviews skips the review queries entirely."""
+    url = f'/api/v1/reviews/product/{sample_product.id}'
+    etag = client.get(url).headers['ETag']
+    db.session.expunge_all()
+    
+    with query_counter() as counter:
+        resp = client.get(url, headers={'If-None-Match': etag})
+    assert resp.status_code == 304
+    assert counter.count == 2  # product lookup + counter read
+    
+    client.post('/api/v1/reviews', headers=auth_headers,
+                json={'product_id': sample_product.id, 'rating': 5})
+    resp = client.get(url, headers={'If-None-Match': etag})
+    assert resp.status_code == 200
+    assert resp.json['summary']['total_reviews'] == 1
+
+def test_table_version_bump_upserts(app):
+    """A counter row created by a concurrent writer is bumped, not re-inserted."""
+    from app.models import TableVersion
+    
+    with db.engine.begin() as other:
+        TableVersion.bump(other, {'reviews'})
+    with db.engine.begin() as connection:
+        TableVersion.bump(connection, {'reviews', 'shipping_rates'})
+    
+    assert TableVersion.current('reviews') == 2
+    assert TableVersion.current('shipping_rates') == 1
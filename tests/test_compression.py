@@ -0,0 +1,71 @@
+import gzip
+import json
+import zlib
+from app.models import Product, db
+
+GZIP = {'Accept-Encoding': 'gzip'}
+
+
+def test_large_json_is_gzipped(client, auth_headers):
+    db.session.add_all(
+        Product(sku=f'GZ-{i:03d}', name=f'Compressible Product {i}', price=9.99, stock=5)
+        for i in range(50)
+    )
+    db.session.commit()
+    
+    plain = client.get('/api/v1/inventory/products?per_page=50', headers=auth_headers)
+    resp = client.get('/api/v1/inventory/products?per_page=50', headers={**auth_headers, **GZIP})
+    
+    assert 'Content-Encoding' not in plain.headers
+    assert resp.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in resp.headers['Vary']
+    assert len(resp.data) < len(plain.data)
+    assert json.loads(gzip.decompress(resp.data)) == plain.json
+    
+    # The compressed variant carries a weak ETag that still revalidates
+    etag = resp.headers['ETag']
+    assert etag.startswith('W/')
+    cached = client.get('/api/v1/inventory/products?per_page=50',
+                        headers={**auth_headers, **GZIP, 'If-None-Match': etag})
+    assert cached.status_code == 304
+
+
+def test_etag_round_trips_with_gzip(client, auth_headers):
+    """A 304 repeats the validator the 200 sent, compressed or not."""
+    db.session.add_all(
+        Product(sku=f'GZ-{i:03d}', name=f'Compressible Product {i}', price=9.99, stock=5)
+        for i in range(50)
+    )
+    db.session.commit()
+    url = '/api/v1/inventory/products?per_page=50'
+    for headers in ({**auth_headers, **GZIP}, auth_headers):
+        resp = client.get(url, headers=headers)
+        assert ('Content-Encoding' in resp.headers) == ('Accept-Encoding' in headers)
+        etag = resp.headers['ETag']
+        cached = client.get(url, headers={**headers, 'If-None-Match': etag})
+        assert cached.status_code == 304
+        assert cached.headers['ETag'] == etag
+
+
+def test_small_responses_are_not_compressed(client):
+    resp = client.get('/health', headers=GZIP)
+    assert 'Content-Encoding' not in resp.headers
+
+
+def test_streamed_response_is_compressed_per_chunk(client, auth_headers, sample_product):
+    body = '\n'.join(
+        json.dumps({'items': [{'product_id': sample_product.id, 'quantity': 1}]})
+        for _ in range(3)
+    )
+    resp = client.post('/api/v1/orders/bulk?chunk_size=1', data=body,
+                       headers={**auth_headers, **GZIP}, buffered=False)
+    
+    assert resp.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in resp.headers
+    # Every chunk is sync-flushed, so each one decodes to whole lines
+    decoder = zlib.decompressobj(31)
+    chunks = [decoder.decompress(chunk) for chunk in resp.response]
+    resp.close()
+    lines = [line for chunk in chunks for line in chunk.decode().splitlines()]
+    assert chunks[0].endswith(b'\n')
+    assert [json.loads(line)['status'] for line in lines] == [201, 201, 201]
@@ -81,3 +81,386 @@ def test_list_categories(client, auth_headers, sample_product):
     
     assert resp.status_code == 200
     assert 'categories' in resp.json
+
+def test_reserve_many_reports_failed_lines(app, sample_product):
+    """Guarded reservation skips and reports lines that would oversell."""
+    other = Product(sku='TEST-002', name='Other Product', price=5.00, stock=3)
+    db.session.add(other)
+    db.session.commit()
+    
+    failed = Product.reserve_many({sample_product.id: 10, other.id: 4})
+    db.session.commit()
+    
+    assert failed == [other.id]
+    assert sample_product.reserved_stock == 10
+    assert other.reserved_stock == 0
+
+def test_reserve_stock_insufficient(app, sample_product):
+    """Reserving beyond available stock raises and reserves nothing."""
+    with pytest.raises(ValueError):
+        sample_product.reserve_stock(101)
+    
+    sample_product.reserve_stock(100)
+    assert sample_product.available_stock == 0
+
+def test_catalog_served_from_memory(app, client, auth_headers, sample_product, query_counter):
+    """Catalog reads hit the database only when a refresh is due."""
+    db.session.add(Product(sku='TEST-002', name='Another Product', price=5.00,
+                           stock=3, category='Tools'))
+    db.session.commit()
+    client.get('/api/v1/inventory/products', headers=auth_headers)
+    
+    app.config['CATALOG_REFRESH_SECONDS'] = 3600
+    with query_counter() as counter:
+        listing = client.get('/api/v1/inventory/products?category=Tools', headers=auth_headers)
+        single = client.get(f'/api/v1/inventory/products/{sample_product.id}', headers=auth_headers)
+    
+    assert counter.count == 0
+    assert [p['sku'] for p in listing.json['products']] == ['TEST-002']
+    assert listing.json['pagination']['total'] == 1
+    assert single.json['product']['sku'] == 'TEST-001'
+
+def test_catalog_incremental_refresh(app, client, auth_headers, sample_product):
+    """Stock changes and deactivations reach the snapshot on the next poll."""
+    client.get('/api/v1/inventory/products', headers=auth_headers)
+    
+    Product.reserve_many({sample_product.id: 40})
+    db.session.commit()
+    resp = client.get('/api/v1/inventory/products', headers=auth_headers)
+    assert resp.json['products'][0]['available_stock'] == 60
+    
+    sample_product.is_active = False
+    db.session.commit()
+    resp = client.get('/api/v1/inventory/products', headers=auth_headers)
+    assert resp.json['products'] == []
+    
+    # Inactive products are still readable by id, straight from the database
+    resp = client.get(f'/api/v1/inventory/products/{sample_product.id}', headers=auth_headers)
+    assert resp.json['product']['is_active'] is False
+
+def test_catalog_snapshot_patched_in_place():
+    """Renames, category moves and removals keep every list sorted."""
+    from app.services.catalog import CatalogEntry, CatalogSnapshot
+    
+    def entry(id, name, category, version=1):
+        return CatalogEntry(id, (name, id), category, version, '{}')
+    
+    snapshot = CatalogSnapshot({
+        1: entry(1, 'Bolt', 'Tools'), 2: entry(2, 'Drill', 'Tools'),
+        3: entry(3, 'Apron', 'Garden'), 4: entry(4, 'Hose', 'Garden'),
+    })
+    entries = snapshot.entries
+    
+    snapshot.apply({
+        1: entry(1, 'Bolt', 'Tools', version=2),  # stock change
+        2: entry(2, 'Auger', 'Tools'),  # rename
+        4: entry(4, 'Hose', 'Tools'),  # category move
+        5: entry(5, 'Cart', None),
+    }, [3])
+    
+    assert snapshot.entries is entries
+    assert snapshot.entries == CatalogSnapshot(snapshot.by_id).entries
+    assert [e.id for e in snapshot.entries] == [2, 1, 5, 4]
+    assert snapshot.by_id[1].version == 2
+    assert [e.id for e in snapshot.by_category['Tools']] == [2, 1, 4]
+    assert [e.id for e in snapshot.by_category[None]] == [5]
+    assert 'Garden' not in snapshot.by_category
+
+def _search_fixture():
+    db.session.add_all([
+        Product(sku='KB-100', name='Mechanical Keyboard', price=89.00, stock=5,
+                description='Hot-swap switches, aluminium case'),
+        Product(sku='MS-200', name='Wireless Mouse', price=25.00, stock=5,
+                description='Pairs with any keyboard dongle'),
+        Product(sku='CB-300', name='USB Cable', price=5.00, stock=5,
+                description='Braided, 2m'),
+    ])
+    db.session.commit()
+
+def test_search_products_ranked(client, auth_headers):
+    """Name matches outrank description matches; the last word is a prefix."""
+    _search_fixture()
+    
+    resp = client.get('/api/v1/inventory/search?q=keyboard', headers=auth_headers)
+    assert resp.status_code == 200
+    assert [p['sku'] for p in resp.json['products']] == ['KB-100', 'MS-200']
+    assert resp.json['pagination']['total'] == 2
+    
+    resp = client.get('/api/v1/inventory/search?q=wirel', headers=auth_headers)
+    assert [p['sku'] for p in resp.json['products']] == ['MS-200']
+    
+    resp = client.get('/api/v1/inventory/search?q="*', headers=auth_headers)
+    assert resp.json['products'] == []
+
+def test_search_index_follows_writes(app, client, auth_headers, admin_headers):
+    """Renames are re-indexed and the rebuild command leaves results intact."""
+    _search_fixture()
+    cable = Product.query.filter_by(sku='CB-300').first()
+    client.put(f'/api/v1/inventory/products/{cable.id}', headers=admin_headers,
+               json={'name': 'USB Keyboard Cable'})
+    
+    resp = client.get('/api/v1/admin/products/search?search=keyboard', headers=admin_headers)
+    skus = [p['sku'] for p in resp.json['products']]
+    assert sorted(skus[:2]) == ['CB-300', 'KB-100'] and skus[2] == 'MS-200'
+    
+    result = app.test_cli_runner().invoke(args=['rebuild-search-index'])
+    assert result.exit_code == 0
+    resp = client.get('/api/v1/inventory/search?q=usb+keyboard', headers=auth_headers)
+    assert [p['sku'] for p in resp.json['products']] == ['CB-300']
+
+def test_admin_search_sku_fragments(client, admin_headers):
+    """Admin search still finds SKU fragments; a term without words finds nothing."""
+    _search_fixture()
+    
+    resp = client.get('/api/v1/admin/products/search?search=s-20', headers=admin_headers)
+    assert [p['sku'] for p in resp.json['products']] == ['MS-200']
+    
+    resp = client.get('/api/v1/admin/products/search?search=B-', headers=admin_headers)
+    assert sorted(p['sku'] for p in resp.json['products']) == ['CB-300', 'KB-100']
+    
+    resp = client.get('/api/v1/admin/products/search?search=%25', headers=admin_headers)
+    assert resp.json['products'] == []
+    assert resp.json['pagination']['total'] == 0
+    
+    resp = client.get('/api/v1/admin/products/search', headers=admin_headers)
+    assert resp.json['pagination']['total'] == 3
+
+def test_facets_follow_product_writes(app, client, auth_headers, sample_product):
+    """Facet counts move with price, stock and active changes, no recount."""
+    db.session.add_all([
+        Product(sku='F-1', name='Cheap', price=5.00, stock=2, category='Tools'),
+        Product(sku='F-2', name='Mid', price=30.00, stock=0, category='Tools'),
+    ])
+    db.session.commit()
+    
+    facets = client.get('/api/v1/inventory/facets', headers=auth_headers).json
+    assert facets['total'] == 3 and facets['in_stock'] == 2
+    assert {'name': 'Tools', 'count': 2, 'in_stock': 1} in facets['categories']
+    bands = {b['band']: b['count'] for b in facets['price_bands']}
+    assert bands == {'0-10': 1, '10-25': 0, '25-50': 2, '50-100': 0, '100-250': 0, '250+': 0}
+    
+    cheap = Product.query.filter_by(sku='F-1').first()
+    Product.reserve_many({cheap.id: 2})
+    sample_product.is_active = False
+    db.session.commit()
+    
+    facets = client.get('/api/v1/inventory/facets?category=Tools', headers=auth_headers).json
+    assert facets['categories'] == [{'name': 'Tools', 'count': 2, 'in_stock': 0}]
+    assert client.get('/api/v1/inventory/categories', headers=auth_headers).json == {
+        'categories': ['Tools']
+    }
+    
+    result = app.test_cli_runner().invoke(args=['rebuild-facets'])
+    assert result.exit_code == 0
+    assert client.get('/api/v1/inventory/facets', headers=auth_headers).json == facets
+
+def test_import_products_csv(client, admin_headers, sample_product):
+    """CSV import upserts by SKU and reports every rejected row."""
+    sample_product.reserved_stock = 20
+    db.session.commit()
+    body = (
+        'SKU,Name,Category,Price,Stock,Reserved,Available,Value\n'
+        'NEW-1,Fresh Product,Tools,12.50,7,0,7,87.5\n'
+        'TEST-001,Renamed Product,,31.00,150,,,\n'
+        'BAD-1,Broken,,abc,1,,,\n'
+        'NEW-1,Fresh Product v2,Tools,13.00,8,,,\n'
+    )
+    resp = client.post('/api/v1/inventory/products/import', headers=admin_headers,
+                       data=body, content_type='text/csv')
+    
+    assert resp.status_code == 200
+    assert resp.json['inserted'] == 1 and resp.json['updated'] == 2
+    assert resp.json['errors'] == [{'line': 4, 'sku': 'BAD-1',
+                                    'error': 'Price must be a number and Stock an integer'}]
+    
+    fresh = Product.query.filter_by(sku='NEW-1').first()
+    assert (fresh.name, fresh.stock, fresh.is_active) == ('Fresh Product v2', 8, True)
+    db.session.refresh(sample_product)
+    assert (sample_product.name, sample_product.stock) == ('Renamed Product', 150)
+    
+    resp = client.post('/api/v1/inventory/products/import', headers=admin_headers,
+                       data='SKU,Name,Price,Stock\nTEST-001,Renamed Product,31.00,5\n',
+                       content_type='text/csv')
+    assert resp.json['rejected'] == 1
+    assert resp.json['errors'][0]['error'] == 'Stock below reserved quantity'
+    
+    # Without a Category column existing categories are kept; prices that
+    # do not fit Numeric(10, 2) are rejected rows, not server errors
+    sample_product.category = 'Gadgets'
+    db.session.commit()
+    resp = client.post('/api/v1/inventory/products/import', headers=admin_headers,
+                       data='SKU,Name,Price,Stock\n'
+                            'TEST-001,Renamed Again,32.00,150\n'
+                            'HUGE-1,Huge,1e30,1\n'
+                            'HUGE-2,Huge,100000000,1\n',
+                       content_type='text/csv')
+    assert resp.status_code == 200
+    assert resp.json['updated'] == 1 and resp.json['rejected'] == 2
+    assert [e['sku'] for e in resp.json['errors']] == ['HUGE-1', 'HUGE-2']
+    db.session.refresh(sample_product)
+    assert (sample_product.name, sample_product.category) == ('Renamed Again', 'Gadgets')
+    
+    resp = client.post('/api/v1/inventory/products/import', headers=admin_headers,
+                       data='SKU,Name\n', content_type='text/csv')
+    assert resp.status_code == 400
+
+def test_import_products_stops_on_bad_input(app, client, admin_headers):
+    """Rows before an undecodable or malformed line are kept and reported."""
+    app.config['PRODUCT_IMPORT_BATCH_SIZE'] = 100
+    url = '/api/v1/inventory/products/import'
+    header = b'SKU,Name,Price,Stock\n'
+    # Past the first decoded chunk, so earlier batches are already written
+    rows = b''.join(b'IMP-%04d,Product,1.00,1\n' % i for i in range(1000))
+    
+    resp = client.post(url, headers=admin_headers, content_type='text/csv',
+                       data=header + rows + b'BAD-1,\xff,3.00,3\n')
+    assert resp.status_code == 400
+    assert resp.json['error'] == 'CSV must be UTF-8'
+    assert 0 < resp.json['inserted'] < 1000
+    assert resp.json['stopped']['line'] == resp.json['inserted'] + 2
+    assert Product.query.filter(Product.sku.like('IMP-%')).count() == resp.json['inserted']
+    
+    resp = client.post(url, headers=admin_headers, content_type='text/csv',
+                       data=header + b'QTE-1,One,1.00,1\nQTE-2,"Two,2.00,2\nQTE-3,Three,3.00,3\n')
+    assert resp.status_code == 400
+    assert resp.json['error'].startswith('Malformed CSV')
+    assert resp.json['stopped'] == {'line': 3, 'error': resp.json['error']}
+    assert resp.json['inserted'] == 1
+
+def test_adjust_stock_batch(client, admin_headers, sample_product, query_counter):
+    """Deltas apply in one UPDATE; failing lines are reported, not raised."""
+    other = Product(sku='TEST-002', name='Other Product', price=5.00, stock=3, reserved_stock=2)
+    db.session.add(other)
+    db.session.commit()
+    
+    with query_counter() as counter:
+        resp = client.post('/api/v1/inventory/stock/batch', headers=admin_headers, json={
+            'adjustments': [
+                {'sku': 'TEST-001', 'adjustment': 10},
+                {'id': sample_product.id, 'adjustment': -5},
+                {'sku': 'TEST-002', 'adjustment': -2},
+                {'sku': 'MISSING', 'adjustment': 1},
+            ]
+        })
+    
+    assert resp.status_code == 200
+    assert resp.json == {'adjusted': 1, 'failed': [
+        {'line': 2, 'sku': 'TEST-002', 'error': 'Insufficient stock for adjustment'},
+        {'line': 3, 'sku': 'MISSING', 'error': 'Product not found'},
+    ]}
+    assert sum('UPDATE products' in s for s in counter.statements) == 1
+    db.session.refresh(sample_product)
+    db.session.refresh(other)
+    assert (sample_product.stock, other.stock) == (105, 3)
+    
+    resp = client.post('/api/v1/inventory/stock/batch', headers=admin_headers, json={
+        'adjustments': [{'sku': 'TEST-001', 'id': 1, 'adjustment': 1}]
+    })
+    assert resp.status_code == 400
+
+def test_adjust_stock_sharded(app, client, admin_headers, auth_headers, sample_product):
+    """Unused shard allotments are free stock for both adjustment endpoints."""
+    app.config['STOCK_SHARD_REFILL'] = 100
+    url = f'/api/v1/inventory/products/{sample_product.id}'
+    client.put(f'{url}/shards', headers=admin_headers, json={'shards': 1})
+    resp = client.post('/api/v1/orders', headers=auth_headers,
+                       json={'items': [{'product_id': sample_product.id, 'quantity': 10}]})
+    assert resp.status_code == 201
+    
+    # All 100 units sit in the shard, 10 of them held by the order
+    resp = client.post('/api/v1/inventory/stock/batch', headers=admin_headers, json={
+        'adjustments': [{'id': sample_product.id, 'adjustment': -50}]
+    })
+    assert resp.json == {'adjusted': 1, 'failed': []}
+    db.session.refresh(sample_product)
+    assert (sample_product.stock, sample_product.reserved_stock) == (50, 10)
+    
+    resp = client.patch(f'{url}/stock', headers=admin_headers, json={'adjustment': -41})
+    assert resp.status_code == 400
+    resp = client.patch(f'{url}/stock', headers=admin_headers, json={'adjustment': -40})
+    assert resp.status_code == 200
+    assert resp.json['product']['available_stock'] == 0
+
+def test_sharded_reservations(app, client, admin_headers, auth_headers, sample_product):
+    """Hot products reserve from shard rows and fold back without drift."""
+    app.config['STOCK_SHARD_REFILL'] = 10
+    resp = client.put(f'/api/v1/inventory/products/{sample_product.id}/shards',
+                      headers=admin_headers, json={'shards': 4})
+    assert resp.status_code == 200
+    
+    for _ in range(6):
+        resp = client.post('/api/v1/orders', headers=auth_headers,
+                           json={'items': [{'product_id': sample_product.id, 'quantity': 3}]})
+        assert resp.status_code == 201
+    db.session.refresh(sample_product)
+    
+    # Shards borrowed stock in blocks of 10 but only 18 units are held
+    assert sample_product.reserved_stock > 18
+    assert sample_product.available_stock == 82
+    
+    resp = client.post('/api/v1/orders', headers=auth_headers,
+                       json={'items': [{'product_id': sample_product.id, 'quantity': 83}]})
+    assert resp.status_code == 400
+    
+    # Free stock is split between the product row and several shards
+    resp = client.post('/api/v1/orders', headers=auth_headers,
+                       json={'items': [{'product_id': sample_product.id, 'quantity': 80}]})
+    assert resp.status_code == 201
+    
+    result = app.test_cli_runner().invoke(args=['fold-stock-shards'])
+    assert result.exit_code == 0
+    db.session.refresh(sample_product)
+    assert sample_product.reserved_stock == 98
+    assert sample_product.available_stock == 2
+
+def test_sharded_reservations_refresh_reads(app, client, admin_headers, auth_headers, sample_product):
+    """Reservations that only write shard rows still reach the catalog, ETag and facets."""
+    app.config['STOCK_SHARD_REFILL'] = 100
+    url = f'/api/v1/inventory/products/{sample_product.id}'
+    client.put(f'{url}/shards', headers=admin_headers, json={'shards': 1})
+    
+    def order(quantity):
+        resp = client.post('/api/v1/orders', headers=auth_headers,
+                           json={'items': [{'product_id': sample_product.id, 'quantity': quantity}]})
+        assert resp.status_code == 201
+    
+    # The first order moves all 100 units into the shard
+    order(1)
+    resp = client.get(url, headers=auth_headers)
+    etag = resp.headers['ETag']
+    assert resp.json['product']['available_stock'] == 99
+    assert client.get('/api/v1/inventory/facets', headers=auth_headers).json['in_stock'] == 1
+    
+    # Later orders only update the shard row
+    order(2)
+    resp = client.get(url, headers={**auth_headers, 'If-None-Match': etag})
+    assert resp.status_code == 200
+    assert resp.json['product']['available_stock'] == 97
+    listing = client.get('/api/v1/inventory/products', headers=auth_headers)
+    assert listing.json['products'][0]['available_stock'] == 97
+    
+    order(97)
+    assert client.get('/api/v1/inventory/facets', headers=auth_headers).json['in_stock'] == 0
+    
+    result = app.test_cli_runner().invoke(args=['rebuild-facets'])
+    assert result.exit_code == 0
+    assert client.get('/api/v1/inventory/facets', headers=auth_headers).json['in_stock'] == 0
+
+def test_sparse_product_fields(client, auth_headers, sample_product, query_counter):
+    """?fields= projects the payload and loads only the columns it needs."""
+    with query_counter() as counter:
+        resp = client.get('/api/v1/inventory/products?fields=name,price', headers=auth_headers)
+    
+    assert resp.status_code == 200
+    assert resp.json['products'] == [{'id': sample_product.id, 'name': 'Test Product', 'price': 29.99}]
+    # The pagination count wraps the unrestricted query; SQLite flattens it
+    selects = [s for s, _ in counter.executed if 'FROM products' in s and 'count(' not in s]
+    assert selects and not any('products.description' in s for s in selects)
+    
+    resp = client.get(f'/api/v1/inventory/products/{sample_product.id}?fields=available_stock',
+                      headers=auth_headers)
+    assert resp.json['product'] == {'id': sample_product.id, 'available_stock': 100}
+    
+    resp = client.get('/api/v1/inventory/products?fields=name,colour', headers=auth_headers)
+    assert resp.status_code == 400
+    assert resp.json['error'] == 'Unknown fields: colour'
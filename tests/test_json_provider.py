@@ -0,0 +1,41 @@
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+import pytest
+from app.json_provider import OrjsonProvider, StdlibJSONProvider, orjson
+
+
+@dataclass
+class Point:
+    x: int
+    y: int
+
+
+PAYLOAD = {
+    'price': Decimal('29.99'),
+    'created_at': datetime(2024, 5, 1, 12, 30, 15, 250000),
+    'point': Point(1, 2),
+    'name': 'Käse',
+}
+
+
+def test_stdlib_provider_encodes_raw_values(app):
+    provider = StdlibJSONProvider(app)
+    assert provider.loads(provider.dumps(PAYLOAD)) == {
+        'price': 29.99,
+        'created_at': '2024-05-01T12:30:15.250000',
+        'point': {'x': 1, 'y': 2},
+        'name': 'Käse',
+    }
+
+
+@pytest.mark.skipif(orjson is None, reason='orjson not installed')
+def test_orjson_provider_matches_stdlib(app):
+    fast, slow = OrjsonProvider(app), StdlibJSONProvider(app)
+    assert fast.loads(fast.dumps(PAYLOAD)) == slow.loads(slow.dumps(PAYLOAD))
+    # json-module arguments fall back to the stdlib encoder
+    assert fast.dumps({'b': 1, 'a': 2}, indent=2) == slow.dumps({'b': 1, 'a': 2}, indent=2)
+    
+    with app.test_request_context():
+        response = fast.response({'price': Decimal('1.50')})
+    assert response.get_json() == {'price': 1.5}
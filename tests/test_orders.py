@@ -102,3 +102,426 @@ def test_confirm_order(client, auth_headers, admin_headers, sample_product):
     
     assert resp.status_code == 200
     assert resp.json['order']['status'] == 'confirmed'
+
+def test_create_order_constant_statements(app, auth_headers, query_counter):
+    """Order creation cost does not grow with the number of lines."""
+    from app.models import User
+    from app.services.order_service import order_service
+    
+    products = [
+        Product(sku=f'BULK-{i:03d}', name=f'Bulk {i}', price=2.50, stock=10)
+        for i in range(30)
+    ]
+    db.session.add_all(products)
+    db.session.commit()
+    user_id = User.query.filter_by(email='test@example.com').first().id
+    Order.generate_order_number()  # claim an order number block up front
+    
+    counts = []
+    for size in (1, 30):
+        items = [{'product_id': p.id, 'quantity': 1} for p in products[:size]]
+        with query_counter() as counter:
+            order_service.create_order(user_id, items)
+        assert counter.commits == 1
+        counts.append(counter.count)
+    
+    assert counts[0] == counts[1]
+    order = Order.query.order_by(Order.id.desc()).first()
+    assert order.items.count() == 30
+    assert float(order.subtotal) == 75.0
+    assert Product.query.get(products[0].id).reserved_stock == 2
+
+def test_create_order_merges_duplicate_lines(client, auth_headers, sample_product):
+    """Repeated product lines are reserved as one line."""
+    resp = client.post('/api/v1/orders',
+        headers=auth_headers,
+        json={
+            'items': [
+                {'product_id': sample_product.id, 'quantity': 2},
+                {'product_id': sample_product.id, 'quantity': 3}
+            ]
+        }
+    )
+    
+    assert resp.status_code == 201
+    assert len(resp.json['order']['items']) == 1
+    assert resp.json['order']['items'][0]['quantity'] == 5
+    assert Product.query.get(sample_product.id).reserved_stock == 5
+
+def test_create_order_unknown_product(client, auth_headers, sample_product):
+    """An unknown product rejects the whole order without reserving stock."""
+    resp = client.post('/api/v1/orders',
+        headers=auth_headers,
+        json={
+            'items': [
+                {'product_id': sample_product.id, 'quantity': 2},
+                {'product_id': 9999, 'quantity': 1}
+            ]
+        }
+    )
+    
+    assert resp.status_code == 404
+    assert Product.query.get(sample_product.id).reserved_stock == 0
+    assert Order.query.count() == 0
+
+def test_create_order_rejects_non_integer_fields(client, auth_headers, sample_product):
+    """Booleans are not quantities and product ids must be integers."""
+    for item in (
+        {'product_id': sample_product.id, 'quantity': True},
+        {'product_id': str(sample_product.id), 'quantity': 1},
+        {'product_id': [sample_product.id], 'quantity': 1},
+    ):
+        resp = client.post('/api/v1/orders', headers=auth_headers, json={'items': [item]})
+        assert resp.status_code == 400
+    
+    assert Product.query.get(sample_product.id).reserved_stock == 0
+    assert Order.query.count() == 0
+
+def test_bulk_create_orders(client, auth_headers, sample_product):
+    """NDJSON orders are created per line and results streamed back."""
+    import json
+    
+    lines = [
+        json.dumps({'reference': 'a', 'items': [{'product_id': sample_product.id, 'quantity': 10}]}),
+        json.dumps({'reference': 'b', 'items': [{'product_id': sample_product.id, 'quantity': 500}]}),
+        '',
+        'not json',
+        json.dumps({'reference': 'c', 'items': [{'product_id': sample_product.id, 'quantity': 5}]}),
+    ]
+    resp = client.post('/api/v1/orders/bulk?chunk_size=2',
+        headers=auth_headers,
+        data='\n'.join(lines),
+        content_type='application/x-ndjson'
+    )
+    
+    assert resp.status_code == 200
+    results = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+    assert [r['status'] for r in results] == [201, 400, 400, 201]
+    assert [r['line'] for r in results] == [1, 2, 4, 5]
+    assert results[1]['reference'] == 'b'
+    assert 'Insufficient stock' in results[1]['error']
+    assert Order.query.count() == 2
+    assert Product.query.get(sample_product.id).reserved_stock == 15
+
+def test_bulk_create_orders_database_error(client, auth_headers, sample_product, monkeypatch):
+    """A database error mid-chunk reports every line of the chunk as failed."""
+    import json
+    from sqlalchemy.exc import OperationalError
+    from app.services.order_service import order_service
+    
+    create_order = order_service.create_order
+    calls = []
+    
+    def failing_create_order(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 2:
+            raise OperationalError('INSERT', {}, Exception('disk I/O error'))
+        return create_order(*args, **kwargs)
+    
+    monkeypatch.setattr(order_service, 'create_order', failing_create_order)
+    lines = [
+        json.dumps({'items': [{'product_id': sample_product.id, 'quantity': 1}]})
+        for _ in range(3)
+    ] + ['[1, 2', json.dumps({'items': [{'product_id': sample_product.id, 'quantity': 1}]})]
+    resp = client.post('/api/v1/orders/bulk?chunk_size=3',
+        headers=auth_headers,
+        data='\n'.join(lines),
+        content_type='application/x-ndjson'
+    )
+    
+    assert resp.status_code == 200
+    results = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+    assert [r['line'] for r in results] == [1, 2, 3, 4, 5]
+    assert [r['status'] for r in results] == [500, 500, 500, 400, 201]
+    assert results[3]['error'] == 'Invalid JSON'
+    assert Order.query.count() == 1
+    assert Product.query.get(sample_product.id).reserved_stock == 1
+
+def _seed_orders(count, lines_per_order=3):
+    from app.models import User
+    from app.services.order_service import order_service
+    
+    products = [
+        Product(sku=f'PAGE-{i:03d}', name=f'Page {i}', price=1.00, stock=1000)
+        for i in range(lines_per_order)
+    ]
+    db.session.add_all(products)
+    db.session.commit()
+    user_id = User.query.filter_by(email='test@example.com').first().id
+    items = [{'product_id': p.id, 'quantity': 1} for p in products]
+    for _ in range(count):
+        order_service.create_order(user_id, items)
+
+def test_list_orders_query_count(client, auth_headers, query_counter):
+    """A page of orders with items costs a fixed number of queries."""
+    _seed_orders(20)
+    
+    with query_counter() as counter:
+        resp = client.get('/api/v1/orders?per_page=20', headers=auth_headers)
+    
+    assert resp.status_code == 200
+    assert len(resp.json['orders']) == 20
+    assert all(len(o['items']) == 3 for o in resp.json['orders'])
+    assert resp.json['orders'][0]['items'][0]['product_name'] == 'Page 0'
+    # COUNT(*), the orders page, and one query for every line on the page
+    assert counter.count == 3
+
+def test_get_order_query_count(client, auth_headers, query_counter):
+    """Order detail loads its lines and product names in one query."""
+    _seed_orders(1, lines_per_order=10)
+    order_id = Order.query.first().id
+    
+    with query_counter() as counter:
+        resp = client.get(f'/api/v1/orders/{order_id}', headers=auth_headers)
+    
+    assert resp.status_code == 200
+    assert len(resp.json['order']['items']) == 10
+    assert counter.count == 2
+
+def test_list_orders_cursor_pagination(client, auth_headers):
+    """Cursor mode walks every order exactly once, newest first."""
+    from datetime import datetime
+    
+    _seed_orders(5, lines_per_order=1)
+    # Force a created_at tie so ordering falls back to id
+    same = datetime(2024, 1, 1)
+    for order in Order.query.all():
+        order.created_at = same
+    db.session.commit()
+    
+    seen = []
+    cursor = ''
+    while cursor is not None:
+        resp = client.get(f'/api/v1/orders?per_page=2&cursor={cursor}', headers=auth_headers)
+        assert resp.status_code == 200
+        assert 'total' not in resp.json['pagination']
+        seen.extend(o['id'] for o in resp.json['orders'])
+        cursor = resp.json['pagination']['next_cursor']
+    
+    assert seen == sorted((o.id for o in Order.query.all()), reverse=True)
+
+def test_list_orders_cursor_total_and_invalid(client, auth_headers):
+    """Totals are opt-in and malformed cursors are rejected."""
+    _seed_orders(3, lines_per_order=1)
+    
+    resp = client.get('/api/v1/orders?cursor=&include_total=true', headers=auth_headers)
+    assert resp.json['pagination']['total'] == 3
+    assert resp.json['pagination']['next_cursor'] is None
+    
+    resp = client.get('/api/v1/orders?cursor=not-a-cursor', headers=auth_headers)
+    assert resp.status_code == 400
+    
+    # Well-formed JSON with a non-integer id is rejected too
+    from app.utils.pagination import encode_cursor
+    cursor = encode_cursor(['2024-01-01T00:00:00', 'abc'])
+    resp = client.get(f'/api/v1/orders?cursor={cursor}', headers=auth_headers)
+    assert resp.status_code == 400
+    
+    resp = client.get('/api/v1/orders?cursor=&per_page=0', headers=auth_headers)
+    assert resp.status_code == 200
+    assert len(resp.json['orders']) == 1
+    assert resp.json['pagination']['per_page'] == 1
+
+def test_order_number_blocks(app):
+    """Numbers come from non-overlapping blocks and map back to the counter."""
+    from app.models import OrderNumberSequence
+    from app.services.order_numbers import OrderNumberAllocator
+    
+    app.config['ORDER_NUMBER_BLOCK_SIZE'] = 100
+    first, second = OrderNumberAllocator(), OrderNumberAllocator()
+    numbers = first.take(150) + second.take(20)
+    
+    assert len(set(numbers)) == 170
+    assert all(len(n) == len('ORD-XXXXXXX') for n in numbers)
+    # first claimed 150 (one oversized block), second claimed 100
+    assert OrderNumberSequence.query.get(1).next_value == 250
+    
+    key = OrderNumberSequence.query.get(1).key
+    assert [first.parse(n, key) for n in numbers[:3]] == [0, 1, 2]
+    assert second.parse(numbers[150], key) == 150
+
+def test_create_order_idempotency_key(client, auth_headers, sample_product):
+    """A retried order with the same key replays the first response."""
+    headers = dict(auth_headers, **{'Idempotency-Key': 'retry-1'})
+    body = {'items': [{'product_id': sample_product.id, 'quantity': 4}]}
+    
+    first = client.post('/api/v1/orders', headers=headers, json=body)
+    second = client.post('/api/v1/orders', headers=headers, json=body)
+    
+    assert first.status_code == second.status_code == 201
+    assert second.json == first.json
+    assert second.headers['Idempotent-Replayed'] == 'true'
+    assert Order.query.count() == 1
+    assert Product.query.get(sample_product.id).reserved_stock == 4
+    
+    other = dict(body, items=[{'product_id': sample_product.id, 'quantity': 1}])
+    resp = client.post('/api/v1/orders', headers=headers, json=other)
+    assert resp.status_code == 422
+
+def test_idempotency_key_in_flight(app, client, auth_headers, sample_product):
+    """A duplicate of a request still running waits, then gives up with 409."""
+    from datetime import datetime, timedelta
+    from app.models import IdempotencyKey, User
+    from app.utils import idempotency
+    
+    app.config['IDEMPOTENCY_WAIT_SECONDS'] = 0.1
+    body = {'items': [{'product_id': sample_product.id, 'quantity': 1}]}
+    headers = dict(auth_headers, **{'Idempotency-Key': 'busy'})
+    with app.test_request_context('/api/v1/orders', method='POST', json=body):
+        request_hash = idempotency._fingerprint()
+    user = User.query.filter_by(email='test@example.com').first()
+    db.session.add(IdempotencyKey(
+        user_id=user.id, key='busy', request_hash=request_hash,
+        expires_at=datetime.utcnow() + timedelta(hours=1)
+    ))
+    db.session.commit()
+    
+    resp = client.post('/api/v1/orders', headers=headers, json=body)
+    
+    assert resp.status_code == 409
+    assert Order.query.count() == 0
+
+def test_expire_stale_reservations(app, auth_headers, sample_product):
+    """The sweeper cancels stale pending orders and frees their stock."""
+    from datetime import datetime, timedelta
+    from app.services.reservation_sweeper import reservation_sweeper
+    
+    _seed_orders(3, lines_per_order=2)
+    stale = Order.query.order_by(Order.id).limit(2).all()
+    for order in stale:
+        order.created_at = datetime.utcnow() - timedelta(hours=2)
+    db.session.commit()
+    
+    freed = reservation_sweeper.sweep(hold_minutes=30, batch_size=1)
+    
+    assert freed == {'orders': 2, 'units': 4}
+    statuses = [o.status for o in Order.query.order_by(Order.id)]
+    assert statuses == ['cancelled', 'cancelled', 'pending']
+    assert all(p.reserved_stock == 1 for p in Product.query.filter(Product.sku.like('PAGE-%')))
+    assert reservation_sweeper.sweep(hold_minutes=30) == {'orders': 0, 'units': 0}
+
+def test_expire_reservations_command(app, sample_product):
+    """The CLI command reports what it freed."""
+    result = app.test_cli_runner().invoke(args=['expire-reservations'])
+    
+    assert result.exit_code == 0
+    assert 'Expired 0 orders' in result.output
+
+def test_expire_reservations_purges_idempotency_keys(app, auth_headers):
+    """Expired idempotency keys are deleted by the sweeper command."""
+    from datetime import datetime, timedelta
+    from app.models import IdempotencyKey, User
+    
+    user = User.query.filter_by(email='test@example.com').first()
+    now = datetime.utcnow()
+    db.session.add_all([
+        IdempotencyKey(user_id=user.id, key='old', request_hash='-',
+                       expires_at=now - timedelta(minutes=1)),
+        IdempotencyKey(user_id=user.id, key='live', request_hash='-',
+                       expires_at=now + timedelta(hours=1)),
+    ])
+    db.session.commit()
+    
+    result = app.test_cli_runner().invoke(args=['expire-reservations'])
+    
+    assert result.exit_code == 0
+    assert 'Purged 1 expired idempotency keys' in result.output
+    assert [k.key for k in IdempotencyKey.query.all()] == ['live']
+
+def test_bulk_status_transitions(client, auth_headers, admin_headers):
+    """Bulk confirm and cancel move stock once per batch and skip ineligible orders."""
+    _seed_orders(3, lines_per_order=2)
+    ids = [o.id for o in Order.query.order_by(Order.id)]
+    
+    response = client.post('/api/v1/orders/bulk-status', headers=admin_headers, json={
+        'action': 'confirm', 'order_ids': ids[:2]
+    })
+    assert response.status_code == 200
+    assert response.get_json() == {'action': 'confirm', 'updated': 2, 'units': 4, 'skipped': []}
+    
+    response = client.post('/api/v1/orders/bulk-status', headers=admin_headers, json={
+        'action': 'ship', 'order_ids': ids + [999999]
+    })
+    assert response.get_json()['skipped'] == [ids[2], 999999]
+    
+    response = client.post('/api/v1/orders/bulk-status', headers=admin_headers, json={
+        'action': 'cancel', 'filter': {'status': 'pending'}
+    })
+    assert response.get_json() == {'action': 'cancel', 'updated': 1, 'units': 2}
+    
+    statuses = [o.status for o in Order.query.order_by(Order.id)]
+    assert statuses == ['shipped', 'shipped', 'cancelled']
+    for product in Product.query.filter(Product.sku.like('PAGE-%')):
+        assert (product.stock, product.reserved_stock) == (998, 0)
+
+def test_cancel_confirmed_orders_restocks(client, auth_headers, admin_headers):
+    """Cancelling confirmed orders puts units back without touching reservations."""
+    _seed_orders(4, lines_per_order=2)
+    ids = [o.id for o in Order.query.order_by(Order.id)]
+    client.post('/api/v1/orders/bulk-status', headers=admin_headers, json={
+        'action': 'confirm', 'order_ids': ids[:2]
+    })
+    
+    response = client.post('/api/v1/orders/bulk-status', headers=admin_headers, json={
+        'action': 'cancel', 'order_ids': ids[:3]
+    })
+    assert response.get_json() == {'action': 'cancel', 'updated': 3, 'units': 6, 'skipped': []}
+    for product in Product.query.filter(Product.sku.like('PAGE-%')):
+        # The remaining pending order keeps its reservation
+        assert (product.stock, product.reserved_stock) == (1000, 1)
+    
+    client.post(f'/api/v1/orders/{ids[3]}/confirm', headers=admin_headers)
+    response = client.post(f'/api/v1/orders/{ids[3]}/cancel', headers=auth_headers)
+    assert response.status_code == 200
+    for product in Product.query.filter(Product.sku.like('PAGE-%')):
+        assert (product.stock, product.reserved_stock) == (1000, 0)
+
+def test_bulk_status_validation(client, auth_headers, admin_headers):
+    response = client.post('/api/v1/orders/bulk-status', headers=admin_headers, json={
+        'action': 'explode', 'order_ids': [1]
+    })
+    assert response.status_code == 400
+    
+    response = client.post('/api/v1/orders/bulk-status', headers=admin_headers, json={
+        'action': 'cancel'
+    })
+    assert response.status_code == 400
+    
+    response = client.post('/api/v1/orders/bulk-status', headers=auth_headers, json={
+        'action': 'cancel', 'order_ids': [1]
+    })
+    assert response.status_code == 403
+
+def test_order_pricing_is_exact():
+    """Totals are summed in cents; tax rounds half up once on the subtotal."""
+    from decimal import Decimal
+    from app.models import OrderItem
+    from app.services.pricing import price_order
+    
+    lines = [OrderItem(unit_price=Decimal('0.10'), quantity=1) for _ in range(3)]
+    lines.append(OrderItem(unit_price=Decimal('19.99'), quantity=3, discount=Decimal('0.97')))
+    totals = price_order(lines, shipping_cost=Decimal('4.90'), discount_amount=5)
+    
+    assert totals.subtotal == Decimal('59.30')
+    assert totals.tax_amount == Decimal('11.27')  # 11.267
+    assert totals.total_amount == Decimal('70.47')
+    assert lines[0].subtotal == Decimal('0.10')
+
+def test_sparse_order_fields(client, auth_headers, sample_product, query_counter):
+    """Orders listed without 'items' do not load their lines."""
+    for _ in range(3):
+        client.post('/api/v1/orders', headers=auth_headers,
+                    json={'items': [{'product_id': sample_product.id, 'quantity': 1}]})
+    
+    with query_counter() as counter:
+        resp = client.get('/api/v1/orders?cursor=&per_page=2&fields=status,total_amount',
+                          headers=auth_headers)
+    
+    assert resp.status_code == 200
+    assert [set(o) for o in resp.json['orders']] == [{'id', 'status', 'total_amount'}] * 2
+    assert not any('order_items' in s for s, _ in counter.executed)
+    
+    cursor = resp.json['pagination']['next_cursor']
+    resp = client.get(f'/api/v1/orders?cursor={cursor}&fields=items', headers=auth_headers)
+    assert len(resp.json['orders']) == 1
+    assert resp.json['orders'][0]['items'][0]['product_id'] == sample_product.id
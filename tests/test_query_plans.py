@@ -0,0 +1,136 @@
+"""Query-plan regression suite.
+
+Each test drives an endpoint against a seeded database, records the
+SELECTs it issues and runs EXPLAIN QUERY PLAN on every one of them. A
+plan step that walks a whole table ("SCAN <table>", or "SCAN TABLE
+<table>" before SQLite 3.36), even in index order, fails the test.
+"""
+import re
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import text
+from app.models import CartItem, Order, Product, Review, User, db
+from app.services.order_service import order_service
+
+FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)')
+
+# Summary tables with a bounded row count are meant to be read whole
+SUMMARY_TABLES = {'product_facets'}
+
+
+def _full_scans(executed):
+    tables = set(db.metadata.tables) - SUMMARY_TABLES
+    scans = []
+    for statement, parameters in executed:
+        if not statement.lstrip().upper().startswith('SELECT'):
+            continue
+        connection = db.session.connection().connection.driver_connection
+        for row in connection.execute('EXPLAIN QUERY PLAN ' + statement, parameters):
+            match = FULL_SCAN.match(row[-1])
+            if match and match.group(1) in tables:
+                scans.append(f'{row[-1]}  <-  {statement}')
+    return scans
+
+
+@pytest.fixture
+def seeded(app, auth_headers):
+    customer = User.query.filter_by(email='test@example.com').first()
+    products = [
+        Product(sku=f'PLAN-{i:03d}', name=f'Plan Product {i}', price=10 + i,
+                stock=1000, category=f'Cat {i % 5}', description='Seeded for plans')
+        for i in range(50)
+    ]
+    db.session.add_all(products)
+    db.session.commit()
+    for i in range(30):
+        order_service.create_order(customer.id, [
+            {'product_id': products[i].id, 'quantity': 1},
+            {'product_id': products[i + 1].id, 'quantity': 2},
+        ])
+    db.session.add_all(
+        Review(product_id=products[0].id, user_id=customer.id, rating=1 + i % 5)
+        for i in range(5)
+    )
+    db.session.add_all(
+        CartItem(user_id=customer.id, product_id=p.id, quantity=1) for p in products[:3]
+    )
+    db.session.commit()
+    return products
+
+
+def _assert_no_full_scans(query_counter, calls):
+    with query_counter() as counter:
+        for call in calls:
+            response = call()
+            assert response.status_code < 400, response.get_data(as_text=True)
+    assert counter.executed
+    assert _full_scans(counter.executed) == []
+
+
+def test_catalog_query_plans(client, auth_headers, seeded, query_counter):
+    product_id = seeded[0].id
+    _assert_no_full_scans(query_counter, [
+        lambda: client.get('/api/v1/inventory/products?category=Cat%201', headers=auth_headers),
+        lambda: client.get(f'/api/v1/inventory/products/{product_id}', headers=auth_headers),
+        lambda: client.get('/api/v1/inventory/search?q=plan', headers=auth_headers),
+        lambda: client.get('/api/v1/inventory/facets', headers=auth_headers),
+        lambda: client.get(f'/api/v1/reviews/product/{product_id}'),
+    ])
+
+
+def test_order_query_plans(client, auth_headers, seeded, query_counter):
+    order_id = Order.query.first().id
+    first_page = client.get('/api/v1/orders?cursor=&per_page=10', headers=auth_headers)
+    cursor = first_page.json['pagination']['next_cursor']
+    _assert_no_full_scans(query_counter, [
+        lambda: client.get('/api/v1/orders', headers=auth_headers),
+        lambda: client.get(f'/api/v1/orders?cursor={cursor}', headers=auth_headers),
+        lambda: client.get(f'/api/v1/orders/{order_id}', headers=auth_headers),
+        lambda: client.get('/api/v1/cart', headers=auth_headers),
+    ])
+
+
+def test_background_job_query_plans(app, seeded, query_counter):
+    from app.services.reservation_sweeper import reservation_sweeper
+    
+    with query_counter() as counter:
+        reservation_sweeper.sweep(now=datetime.utcnow() + timedelta(days=1), batch_size=10)
+    assert _full_scans(counter.executed) == []
+
+
+def test_low_stock_query_plan(app, seeded, query_counter):
+    """The low-stock page uses the headroom index; only the totals scan."""
+    from app.services.report_service import report_service
+    
+    with query_counter() as counter:
+        report_service.get_inventory_report(per_page=10)
+    low_stock = [(s, p) for s, p in counter.executed if 'low_stock_threshold <=' in s]
+    assert low_stock
+    assert _full_scans(low_stock) == []
+
+
+def test_create_indexes_command(app):
+    """The command creates indexes missing from an existing database."""
+    db.session.execute(text('DROP INDEX ix_orders_status_id'))
+    db.session.commit()
+    
+    result = app.test_cli_runner().invoke(args=['create-indexes'])
+    
+    assert result.exit_code == 0
+    assert 'Created ix_orders_status_id' in result.output
+    assert '1 indexes created' in result.output
+
+
+def test_create_indexes_adds_missing_columns(app):
+    """Tables created by an older release get the columns added since."""
+    db.session.execute(text('ALTER TABLE products DROP COLUMN reservation_shards'))
+    db.session.commit()
+    
+    result = app.test_cli_runner().invoke(args=['create-indexes'])
+    
+    assert result.exit_code == 0, result.output
+    assert 'Added products.reservation_shards' in result.output
+    product = Product(sku='OLD-1', name='Old', price=1)
+    db.session.add(product)
+    db.session.commit()
+    assert db.session.execute(text('SELECT reservation_shards FROM products')).scalar() == 0
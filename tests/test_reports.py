@@ -0,0 +1,243 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+import pyarrow as pa
+import pyarrow.parquet as pq
+from app.models import Product, ReportJob, db
+
+def test_inventory_report(client, admin_headers, sample_product):
+    """Totals cover every product; only low-stock ones are listed."""
+    db.session.add_all([
+        Product(sku='LOW-001', name='Nearly Gone', price=5, stock=3, low_stock_threshold=10),
+        Product(sku='LOW-002', name='Held Back', price=2, stock=20, reserved_stock=15,
+                low_stock_threshold=10),
+        Product(sku='LOW-003', name='Sold Out', price=1, stock=0, low_stock_threshold=10),
+    ])
+    db.session.commit()
+    
+    resp = client.get('/api/v1/reports/inventory?per_page=2', headers=admin_headers)
+    
+    assert resp.status_code == 200
+    assert resp.json['total_products'] == 4
+    assert resp.json['total_inventory_value'] == 29.99 * 100 + 5 * 3 + 2 * 20
+    assert resp.json['low_stock_count'] == 3
+    # Most depleted first
+    assert [p['sku'] for p in resp.json['low_stock_items']] == ['LOW-003', 'LOW-001']
+    
+    resp = client.get('/api/v1/reports/inventory?per_page=2&page=2', headers=admin_headers)
+    assert [p['sku'] for p in resp.json['low_stock_items']] == ['LOW-002']
+    
+    # Out-of-range paging is clamped like the other listings
+    resp = client.get('/api/v1/reports/inventory?per_page=0&page=-1', headers=admin_headers)
+    assert resp.status_code == 200
+    assert [p['sku'] for p in resp.json['low_stock_items']] == ['LOW-003']
+
+def test_inventory_report_counts_unused_shard_stock(client, admin_headers):
+    """Stock parked in reservation shards is still available."""
+    product = Product(sku='HOT-001', name='Hot Item', price=10, stock=30, low_stock_threshold=10)
+    db.session.add(product)
+    db.session.commit()
+    product.set_reservation_shards(4)
+    db.session.commit()
+    product.reserve_stock(1)
+    
+    resp = client.get('/api/v1/reports/inventory', headers=admin_headers)
+    
+    assert resp.json['low_stock_count'] == 0
+    
+    product.reserve_stock(20)
+    resp = client.get('/api/v1/reports/inventory', headers=admin_headers)
+    assert [p['sku'] for p in resp.json['low_stock_items']] == ['HOT-001']
+
+def test_export_orders_streams_in_chunks(app, client, admin_headers, auth_headers,
+                                         sample_product, query_counter):
+    """Orders are read in keyset chunks with the email joined, not per row."""
+    app.config['REPORT_EXPORT_CHUNK_SIZE'] = 2
+    for _ in range(5):
+        client.post('/api/v1/orders', headers=auth_headers,
+                    json={'items': [{'product_id': sample_product.id, 'quantity': 1}]})
+    
+    with query_counter() as counter:
+        resp = client.get('/api/v1/reports/export/orders', headers=admin_headers)
+        rows = resp.get_data(as_text=True).splitlines()
+    
+    assert resp.status_code == 200
+    assert rows[0].startswith('Order Number,Date,Customer')
+    assert len(rows) == 6
+    assert all(',test@example.com,pending,' in row for row in rows[1:])
+    # Three chunks of orders, none of them lazy-loading users
+    order_selects = [s for s, _ in counter.executed if 'FROM orders' in s]
+    assert len(order_selects) == 3
+    
+    resp = client.get('/api/v1/reports/export/orders?start=2000-01-01&end=2000-12-31',
+                      headers=admin_headers)
+    assert resp.get_data(as_text=True).splitlines() == rows[:1]
+    
+    resp = client.get('/api/v1/reports/export/orders?start=yesterday', headers=admin_headers)
+    assert resp.status_code == 400
+
+def test_export_orders_end_date_includes_that_day(client, admin_headers, auth_headers,
+                                                  sample_product):
+    """A date-only end covers orders placed later that same day."""
+    client.post('/api/v1/orders', headers=auth_headers,
+                json={'items': [{'product_id': sample_product.id, 'quantity': 1}]})
+    today = datetime.utcnow().date().isoformat()
+    
+    resp = client.get(f'/api/v1/reports/export/orders?start={today}&end={today}',
+                      headers=admin_headers)
+    assert len(resp.get_data(as_text=True).splitlines()) == 2
+    
+    resp = client.post('/api/v1/reports/jobs', headers=admin_headers,
+                       json={'kind': 'orders_csv', 'params': {'end': today}})
+    job = db.session.get(ReportJob, resp.json['job']['id'])
+    assert json.loads(job.params) == {'end': f'{today}T23:59:59.999999'}
+
+def test_export_inventory(client, admin_headers, sample_product):
+    resp = client.get('/api/v1/reports/export/inventory', headers=admin_headers)
+    
+    assert resp.get_data(as_text=True).splitlines() == [
+        'SKU,Name,Category,Price,Stock,Reserved,Available,Value',
+        'TEST-001,Test Product,,29.99,100,0,100,2999.0',
+    ]
+
+def test_report_job_lifecycle(app, client, admin_headers, auth_headers, sample_product, tmp_path):
+    """Jobs are queued, deduplicated while in flight, built by the worker and downloaded."""
+    app.config['REPORT_STORAGE_DIR'] = str(tmp_path)
+    app.config['REPORT_EXPORT_CHUNK_SIZE'] = 2
+    for _ in range(3):
+        client.post('/api/v1/orders', headers=auth_headers,
+                    json={'items': [{'product_id': sample_product.id, 'quantity': 1}]})
+    
+    request = {'kind': 'orders_csv', 'params': {'status': 'pending', 'start': '2000-01-01'}}
+    resp = client.post('/api/v1/reports/jobs', headers=admin_headers, json=request)
+    assert resp.status_code == 202
+    job = resp.json['job']
+    assert job['status'] == 'pending'
+    
+    # Same report, equivalent parameters: the queued job is reused
+    request['params']['start'] = '2000-01-01T00:00:00'
+    resp = client.post('/api/v1/reports/jobs', headers=admin_headers, json=request)
+    assert resp.status_code == 200
+    assert resp.json['job']['id'] == job['id']
+    
+    resp = client.get(f"/api/v1/reports/jobs/{job['id']}/download", headers=admin_headers)
+    assert resp.status_code == 409
+    
+    result = app.test_cli_runner().invoke(args=['run-report-jobs'])
+    assert result.exit_code == 0
+    assert 'Ran 1 report jobs' in result.output
+    
+    resp = client.get(job['status_url'], headers=admin_headers)
+    done = resp.json['job']
+    assert (done['status'], done['progress'], done['total']) == ('done', 3, 3)
+    
+    resp = client.get(done['download_url'], headers=admin_headers)
+    assert resp.status_code == 200
+    lines = resp.get_data(as_text=True).splitlines()
+    resp.close()
+    assert lines[0].startswith('Order Number')
+    assert len(lines) == 4
+    
+    # Finished jobs no longer absorb new requests
+    resp = client.post('/api/v1/reports/jobs', headers=admin_headers, json=request)
+    assert resp.status_code == 202
+
+def test_sales_summary_job_heartbeats(app, client, admin_headers, auth_headers, sample_product,
+                                      tmp_path, monkeypatch):
+    """The summary job heartbeats around its aggregates and records its row count."""
+    from datetime import timedelta
+    from app.services.report_jobs import report_jobs
+    from app.services.report_service import report_service
+    app.config['REPORT_STORAGE_DIR'] = str(tmp_path)
+    client.post('/api/v1/orders', headers=auth_headers,
+                json={'items': [{'product_id': sample_product.id, 'quantity': 1}]})
+    resp = client.post('/api/v1/reports/jobs', headers=admin_headers, json={'kind': 'sales_summary'})
+    job_id = resp.json['job']['id']
+    
+    claimed_at = datetime.utcnow() - timedelta(minutes=5)
+    heartbeats = []
+    get_sales_summary = report_service.get_sales_summary
+    
+    def recording(*args):
+        job = db.session.get(ReportJob, job_id, populate_existing=True)
+        heartbeats.append(job.heartbeat_at)
+        return get_sales_summary(*args)
+    monkeypatch.setattr(report_service, 'get_sales_summary', recording)
+    
+    report_jobs.run(report_jobs.claim(now=claimed_at))
+    
+    assert heartbeats[0] > claimed_at
+    job = db.session.get(ReportJob, job_id, populate_existing=True)
+    assert (job.status, job.progress, job.total) == ('done', 1, 1)
+
+def test_report_job_validation(client, admin_headers):
+    resp = client.post('/api/v1/reports/jobs', headers=admin_headers, json={'kind': 'everything'})
+    assert resp.status_code == 400
+    
+    resp = client.post('/api/v1/reports/jobs', headers=admin_headers,
+                       json={'kind': 'sales_summary', 'params': {'start': 'last year'}})
+    assert resp.status_code == 400
+    assert resp.json['error'] == 'start must be an ISO date'
+
+def test_columnar_export_job(app, client, admin_headers, auth_headers, sample_product, tmp_path):
+    """Orders and their lines come out as typed Parquet/Arrow columns."""
+    app.config['REPORT_STORAGE_DIR'] = str(tmp_path)
+    app.config['REPORT_COLUMNAR_BATCH_SIZE'] = 2
+    for _ in range(3):
+        client.post('/api/v1/orders', headers=auth_headers,
+                    json={'items': [{'product_id': sample_product.id, 'quantity': 2}]})
+    
+    jobs = {}
+    for kind in ('orders_parquet', 'order_items_arrow'):
+        resp = client.post('/api/v1/reports/jobs', headers=admin_headers, json={'kind': kind})
+        assert resp.status_code == 202
+        jobs[kind] = resp.json['job']['id']
+    app.test_cli_runner().invoke(args=['run-report-jobs'])
+    
+    orders = pq.ParquetFile(tmp_path / f"report-{jobs['orders_parquet']}.parquet")
+    assert orders.metadata.num_row_groups == 2
+    table = orders.read()
+    assert table.schema.field('total_amount').type == pa.decimal128(10, 2)
+    assert table.schema.field('created_at').type == pa.timestamp('us')
+    assert table.column('customer_email').to_pylist() == ['test@example.com'] * 3
+    
+    with pa.ipc.open_file(tmp_path / f"report-{jobs['order_items_arrow']}.arrow") as reader:
+        items = reader.read_all()
+    assert items.column('unit_price').to_pylist() == [Decimal('29.99')] * 3
+    assert items.column('quantity').to_pylist() == [2, 2, 2]
+
+def test_columnar_export_survives_commits(app, client, admin_headers, auth_headers, sample_product,
+                                          tmp_path):
+    """Writes committed between batches (job progress) do not cut the export short."""
+    from app.models import User
+    from app.services.report_service import report_service
+    for _ in range(5):
+        client.post('/api/v1/orders', headers=auth_headers,
+                    json={'items': [{'product_id': sample_product.id, 'quantity': 1}]})
+    user = User.query.filter_by(email='test@example.com').first()
+    job = ReportJob(kind='orders_parquet', params='{}', params_hash='-', user_id=user.id)
+    db.session.add(job)
+    db.session.commit()
+    
+    batches = []
+    
+    def on_chunk(rows):
+        batches.append(rows)
+        job.progress = sum(batches)
+        db.session.commit()
+    
+    path = tmp_path / 'orders.parquet'
+    report_service.export_columnar(str(path), 'orders', 'parquet', batch_size=2, on_chunk=on_chunk)
+    
+    assert batches == [2, 2, 1]
+    assert pq.read_table(path).num_rows == 5
+    assert db.session.get(ReportJob, job.id).progress == 5
+
+def test_columnar_export_needs_pyarrow(client, admin_headers, monkeypatch):
+    """Servers without pyarrow refuse columnar jobs up front."""
+    monkeypatch.setattr('app.services.report_jobs.pa', None)
+    
+    resp = client.post('/api/v1/reports/jobs', headers=admin_headers,
+                       json={'kind': 'orders_parquet'})
+    assert resp.status_code == 400
+    assert 'pyarrow' in resp.json['error']